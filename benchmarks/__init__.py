@@ -0,0 +1,23 @@
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+Written by: Justin Israel
+			justinisrael@gmail.com
+			justinfx.com
+
+"""
\ No newline at end of file
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+Written by: Justin Israel
+			justinisrael@gmail.com
+			justinfx.com
+
+
+Benchmark of the Flame .action writer on a large camera.
+
+Compares the original channel writer, which split every line of the
+.chan file again for each of the seven channels, against the current
+columnar ChanToAction, reading either the .chan file or an already
+parsed ChanFile.
+
+Usage:
+	python -m benchmarks.actionwriter [frames] [repeats]
+"""
+
+import os, sys, tempfile
+
+from core import ChanFile
+from templates import chan2action
+from benchmarks.chanparse import timeIt
+from benchmarks.synthetic import writeChan
+
+
+def legacyChannels(filename):
+	""" The original per-channel loops of ChanToAction.convert(), for reference """
+	sourceFileLines = open(filename, 'r').readlines()
+	result = []
+	prefix = "\t\t"
+	
+	channels = [('tx', 100), ('ty', 100), ('tz', 100), ('rx', -1), ('ry', -1), ('rz', -1), ('fov', 1)]
+	for Attr, globalScale in channels:
+		if (Attr == "tx") :
+			attributeToRead = 1
+		if (Attr == "ty") :
+			attributeToRead = 2
+		if (Attr == "tz") : 
+			attributeToRead = 3
+		if (Attr == "rx") : 
+			attributeToRead = 4
+		if (Attr == "ry") : 
+			attributeToRead = 5
+		if (Attr == "rz") : 
+			attributeToRead = 6
+		if (Attr == "fov") : 
+			attributeToRead = 7
+		
+		tempS = sourceFileLines[(len(sourceFileLines)-1)].split()
+		result.append( prefix+"\tValue "+ str(float(tempS[attributeToRead]) * globalScale) +"\n" ) 
+		key = 0
+		for line in sourceFileLines:
+			tempS = line.split()
+			result.append( prefix+"\tKey "+str(key)+"\n" )
+			result.append( prefix+"\t\tFrame "+tempS[0]+"\n" )	
+			result.append( prefix+"\t\tValue "+(str(float(tempS[attributeToRead]) * globalScale))+"\n")
+			result.append( prefix+"\t\tInterpolation hermite\n" )
+			result.append( prefix+"\t\tEnd\n" )
+			key = key + 1
+	
+	return ''.join(result)
+
+
+def convertFile(filename):
+	""" The current writer, reading the .chan file itself """
+	return chan2action.ChanToAction(filename).convert()
+
+
+def convertParsed(filename):
+	""" The current writer, given a parsed ChanFile as ChanConvert does """
+	return chan2action.ChanToAction(ChanFile(filename)).convert()
+
+
+def main(frames=50000, repeats=3):
+	fd, filename = tempfile.mkstemp(suffix='.chan')
+	os.close(fd)
+	
+	try:
+		writeChan(filename, frames)
+		
+		print "%d frame camera, best of %d" % (frames, repeats)
+		
+		legacy = None
+		for name, func in (('legacy channels', legacyChannels), 
+						   ('columnar (file)', convertFile), 
+						   ('columnar (parsed)', convertParsed)):
+			elapsed = timeIt(func, filename, repeats)
+			if legacy is None:
+				legacy = elapsed
+			print "  %-18s %8.3f s  %6.2fx" % (name, elapsed, legacy / elapsed)
+	finally:
+		os.remove(filename)
+
+
+if __name__ == "__main__":
+	main(*[int(a) for a in sys.argv[1:3]])
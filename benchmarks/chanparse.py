@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+Written by: Justin Israel
+			justinisrael@gmail.com
+			justinfx.com
+
+
+Benchmark of .chan parsing throughput, in MB/s.
+
+Compares the original line-by-line parser against the bulk
+ChanFile.parse, with and without numpy.
+
+Usage:
+	python -m benchmarks.chanparse [frames] [repeats]
+"""
+
+import os, sys, time, tempfile
+
+from core import chanfile
+from benchmarks.synthetic import writeChan
+
+
+def legacyParse(filename):
+	""" The original readline()-based ChanFile.parse, for reference """
+	fh = open(filename, 'r')
+	keyData = {}
+	
+	while True:
+		line = fh.readline()
+		if not line: break
+		if not line.strip(): continue
+		
+		columns = line.strip().split()
+		if len(columns) == 7:
+			chanType = 'null'
+			frame, tx, ty, tz, rx, ry, rz = columns
+		else:
+			chanType = 'camera'
+			frame, tx, ty, tz, rx, ry, rz, fov = columns
+		
+		keyData[int(frame)] = dict( frame = int(frame),
+									tx	= float(tx),
+									ty	= float(ty),
+									tz	= float(tz),
+									rx	= float(rx),
+									ry	= float(ry),
+									rz	= float(rz),
+									)
+		if chanType == 'camera':
+			keyData[int(frame)]['fov'] = float(fov)
+	
+	fh.close()
+	return keyData
+
+
+def bulkParse(filename):
+	""" The current ChanFile.parse """
+	chan = chanfile.ChanFile(filename)
+	chan.parse()
+	return chan
+
+
+def bulkParsePython(filename):
+	""" The current ChanFile.parse, forcing the pure python path """
+	numpy = chanfile.numpy
+	chanfile.numpy = None
+	try:
+		return bulkParse(filename)
+	finally:
+		chanfile.numpy = numpy
+
+
+def timeIt(func, filename, repeats):
+	""" Returns the best wall time of several calls """
+	best = None
+	for i in xrange(repeats):
+		start = time.time()
+		func(filename)
+		elapsed = time.time() - start
+		if best is None or elapsed < best:
+			best = elapsed
+	return best
+
+
+def main(frames=100000, repeats=3):
+	fd, filename = tempfile.mkstemp(suffix='.chan')
+	os.close(fd)
+	
+	try:
+		writeChan(filename, frames)
+		megabytes = os.path.getsize(filename) / (1024.0 * 1024.0)
+		
+		print "%d frames, %.2f MB, best of %d" % (frames, megabytes, repeats)
+		
+		runs = [('legacy', legacyParse), ('bulk (python)', bulkParsePython)]
+		if chanfile.numpy is not None:
+			runs.append(('bulk (numpy)', bulkParse))
+		
+		legacy = None
+		for name, func in runs:
+			elapsed = timeIt(func, filename, repeats)
+			if legacy is None:
+				legacy = elapsed
+			print "  %-15s %8.3f s  %8.2f MB/s  %6.2fx" % (name, elapsed, megabytes / elapsed, legacy / elapsed)
+	finally:
+		os.remove(filename)
+
+
+if __name__ == "__main__":
+	main(*[int(a) for a in sys.argv[1:3]])
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+Written by: Justin Israel
+			justinisrael@gmail.com
+			justinfx.com
+
+
+Scaling benchmark of FBX template assembly with point cloud locators.
+
+Times the original getTemplate loop, which re-copied the whole
+template for every locator, against the current getTemplate and
+the streaming iterTemplate. The time per point of the current
+versions should stay flat as the point count grows.
+
+The original loop is quadratic, and is skipped above 10k points
+unless a larger limit is given.
+
+Usage:
+	python -m benchmarks.fbxtemplate [points,points,...] [legacyLimit]
+"""
+
+import sys, time
+from collections import defaultdict
+from random import uniform
+
+from core import PointCloudFbxData
+from templates import fbx_template
+
+
+def legacyGetTemplate(objectType='null', objectData=[]):
+	""" The original quadratic getTemplate object loop, for reference """
+	objectdata = fbx_template.nullType()
+	
+	connectionList = []
+	for thisData in objectData:
+		objectdata = "%s\n%s" % (objectdata, thisData['data'])
+		connectionList.append('\tConnect: "OO", "Model::%(name)s", "Model::%(parent)s"' % \
+								{'name' : thisData['name'], 
+								 'parent' : thisData.get('parent', 'Scene')})
+	
+	return objectdata + '\n'.join(connectionList)
+
+
+def streamTemplate(objectType='null', objectData=[]):
+	""" Renders iterTemplate, counting the bytes instead of writing them """
+	data = defaultdict(int)
+	size = 0
+	for chunk in fbx_template.iterTemplate(data, objectType, objectData):
+		size += len(chunk)
+	return size
+
+
+def timeIt(func, objectData):
+	start = time.time()
+	func('null', objectData)
+	return time.time() - start
+
+
+def main(sizes=(1000, 10000, 100000), legacyLimit=10000):
+	runs = [('legacy', legacyGetTemplate), 
+			('getTemplate', fbx_template.getTemplate), 
+			('iterTemplate', streamTemplate)]
+	
+	print "%8s  %-13s %10s  %10s" % ('points', 'version', 'seconds', 'us/point')
+	
+	for numPoints in sizes:
+		points = [uniform(-10, 10) for i in xrange(numPoints * 3)]
+		
+		# rendered up front, so only template assembly is timed
+		objectData = list(PointCloudFbxData(points))
+		
+		for name, func in runs:
+			if func is legacyGetTemplate and numPoints > legacyLimit:
+				print "%8d  %-13s %10s" % (numPoints, name, 'skipped')
+				continue
+			
+			elapsed = timeIt(func, objectData)
+			print "%8d  %-13s %10.3f  %10.2f" % (numPoints, name, elapsed, elapsed / numPoints * 1e6)
+		
+		del objectData
+
+
+if __name__ == "__main__":
+	args = sys.argv[1:]
+	sizes = args and [int(n) for n in args[0].split(',')] or (1000, 10000, 100000)
+	main(sizes, *[int(a) for a in args[1:2]])
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+Written by: Justin Israel
+			justinisrael@gmail.com
+			justinfx.com
+
+
+Benchmark of interpreter start-up and import cost.
+
+Each case runs in a fresh interpreter, so nothing is shared
+between runs. The command line path of AtomSplitter should cost
+about the same as importing the core package, and must never
+pull in PyQt4.
+
+Usage:
+	python -m benchmarks.importtime [repeats]
+"""
+
+import os, sys, time, subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = [
+	('python',       "pass"),
+	('core',         "import core"),
+	('cli',          "import AtomSplitter, sys; "
+					 "assert 'PyQt4' not in sys.modules, 'PyQt4 imported by the cli'"),
+	('gui',          "import ui.chanConvertGUI"),
+]
+
+
+def hasQt():
+	""" Returns True if PyQt4 can be imported by a child interpreter """
+	return subprocess.call([sys.executable, '-c', 'import PyQt4.QtGui'], cwd=ROOT,
+							stdout=open(os.devnull, 'w'), stderr=subprocess.STDOUT) == 0
+
+
+def timeIt(code, repeats):
+	""" Returns the best wall time of running code in a new interpreter """
+	best = None
+	for i in xrange(repeats):
+		start = time.time()
+		ret = subprocess.call([sys.executable, '-c', code], cwd=ROOT)
+		elapsed = time.time() - start
+		if ret:
+			raise RuntimeError("Failed to run: %s" % code)
+		if best is None or elapsed < best:
+			best = elapsed
+	return best
+
+
+def main(repeats=10):
+	print "Start-up time, best of %d" % repeats
+	
+	baseline = None
+	for name, code in CASES:
+		if name == 'gui' and not hasQt():
+			print "  %-8s skipped, PyQt4 not available" % name
+			continue
+		
+		elapsed = timeIt(code, repeats)
+		if baseline is None:
+			baseline = elapsed
+		print "  %-8s %8.1f ms  %+8.1f ms" % (name, elapsed * 1000, (elapsed - baseline) * 1000)
+
+
+if __name__ == "__main__":
+	main(*[int(a) for a in sys.argv[1:2]])
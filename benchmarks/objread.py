@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+Written by: Justin Israel
+			justinisrael@gmail.com
+			justinfx.com
+
+Benchmark of Nuke .obj point cloud reading throughput, in MB/s.
+
+Compares the original readlines()-based reader of the .action
+writer against readObjPoints, with and without numpy.
+
+Usage:
+	python -m benchmarks.objread [points] [repeats]
+"""
+
+import os, sys, tempfile
+
+from core import objfile
+from benchmarks.synthetic import writeObj
+from benchmarks.chanparse import timeIt
+
+
+def legacyRead(filename):
+	""" The original ChanToAction._readObjPoints, for reference """
+	data = open(filename).readlines()
+	if not data or data[0] != '## OBJ file generated by Nuke ##\n':
+		raise Exception("%s is not a nuke-generated obj" % filename)
+	
+	filtered = [line.strip() for line in data if line.startswith('v ')]
+	
+	pointData = []
+	for line in filtered:
+		try:
+			x,y,z = line.split()[1:]
+		except:
+			continue
+		pointData.append((x,y,z))
+	
+	return [(float(x), float(y), float(z)) for x,y,z in pointData]
+
+
+def bulkRead(filename):
+	""" The current readObjPoints """
+	return objfile.readObjPoints(filename)
+
+
+def bulkReadPython(filename):
+	""" The current readObjPoints, forcing the pure python path """
+	numpy = objfile.numpy
+	objfile.numpy = None
+	try:
+		return bulkRead(filename)
+	finally:
+		objfile.numpy = numpy
+
+
+def main(points=1000000, repeats=3):
+	fd, filename = tempfile.mkstemp(suffix='.obj')
+	os.close(fd)
+	
+	try:
+		writeObj(filename, points)
+		megabytes = os.path.getsize(filename) / (1024.0 * 1024.0)
+		
+		print "%d points, %.2f MB, best of %d" % (points, megabytes, repeats)
+		
+		runs = [('legacy', legacyRead), ('bulk (python)', bulkReadPython)]
+		if objfile.numpy is not None:
+			runs.append(('bulk (numpy)', bulkRead))
+		
+		legacy = None
+		for name, func in runs:
+			elapsed = timeIt(func, filename, repeats)
+			if legacy is None:
+				legacy = elapsed
+			print "  %-15s %8.3f s  %8.2f MB/s  %6.2fx" % (name, elapsed, megabytes / elapsed, legacy / elapsed)
+	finally:
+		os.remove(filename)
+
+
+if __name__ == "__main__":
+	main(*[int(a) for a in sys.argv[1:3]])
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+Written by: Justin Israel
+			justinisrael@gmail.com
+			justinfx.com
+
+
+Benchmark of the on-disk parse cache.
+
+Times a full parse of a synthetic .chan and point cloud .obj
+against loading the same data back from a ParseCache.
+
+Usage:
+	python -m benchmarks.parsecache [frames] [points] [repeats]
+"""
+
+import os, sys, shutil, tempfile
+
+from core import ChanFile, ChanConvert, ParseCache
+from benchmarks.chanparse import timeIt
+from benchmarks.synthetic import writeChan, writeObj
+
+
+def main(frames=100000, points=100000, repeats=3):
+	tempDir = tempfile.mkdtemp()
+	
+	try:
+		chanFile = os.path.join(tempDir, 'bench.chan')
+		objFile = os.path.join(tempDir, 'bench.obj')
+		writeChan(chanFile, frames)
+		writeObj(objFile, points)
+		
+		cache = ParseCache(os.path.join(tempDir, 'cache'))
+		
+		def parseChan(cache=None):
+			ChanFile(chanFile, cache=cache).parse()
+		
+		def readObj(cache=None):
+			ChanConvert(chanFile, objFile=objFile, cache=cache).getObjPoints()
+		
+		print "%d frames, %d points, best of %d" % (frames, points, repeats)
+		
+		for name, func in (('.chan', parseChan), ('.obj', readObj)):
+			# the first cached call fills the cache
+			func(cache)
+			
+			parsed = timeIt(lambda f: func(), None, repeats)
+			cached = timeIt(lambda f: func(cache), None, repeats)
+			print "  %-6s parse %8.3f s   cached %8.3f s  %6.2fx" % (name, parsed, cached, parsed / cached)
+	finally:
+		shutil.rmtree(tempDir, True)
+
+
+if __name__ == "__main__":
+	main(*[int(a) for a in sys.argv[1:4]])
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+Written by: Justin Israel
+			justinisrael@gmail.com
+			justinfx.com
+
+
+Load test client for the conversion server.
+
+Sends jobs to a server from several client threads at once, and 
+reports throughput, request latency and the server's own queue and 
+convert timing. For reference, it also times converting the same 
+file by launching AtomSplitter.py once per job.
+
+Unless an address is given, a server is started on a temporary
+unix socket for the run.
+
+Usage:
+	python -m benchmarks.serverload [requests] [clients] [frames] [address]
+"""
+
+import os, sys, time, shutil, tempfile, threading, subprocess
+
+from core import server
+from benchmarks.synthetic import writeChan
+
+
+def percentile(values, pct):
+	""" Returns the pct percentile of a sorted list """
+	if not values:
+		return 0.0
+	index = min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))
+	return values[index]
+
+
+def load(address, chanFile, outDir, requests, clients):
+	"""
+	load(str address, str chanFile, str outDir, int requests, int clients) -> dict
+	
+	Sends requests jobs from clients threads, and returns the sorted
+	latencies, the server timings, the failures and the wall time.
+	"""
+	latencies = []
+	timings = []
+	failures = []
+	lock = threading.Lock()
+	counter = iter(xrange(requests))
+	
+	def client():
+		conn = server.connect(address)
+		while True:
+			with lock:
+				try:
+					i = counter.next()
+				except StopIteration:
+					break
+			
+			outFile = os.path.join(outDir, 'load_%d.fbx' % i)
+			start = time.time()
+			try:
+				result = server.convert(chanFile, outFile, connection=conn)
+			except Exception, e:
+				with lock:
+					failures.append(str(e))
+				# the connection may be left mid-response
+				conn.close()
+				conn = server.connect(address)
+				continue
+			
+			elapsed = time.time() - start
+			with lock:
+				latencies.append(elapsed)
+				timings.append(result['timing'])
+		conn.close()
+	
+	start = time.time()
+	threads = [threading.Thread(target=client) for i in xrange(clients)]
+	for t in threads:
+		t.start()
+	for t in threads:
+		t.join()
+	
+	return {'latencies' : sorted(latencies), 'timings' : timings, 
+			'failures' : failures, 'wall' : time.time() - start}
+
+
+def timeLaunch(chanFile, outFile):
+	""" Returns the wall time of one command line conversion """
+	script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'AtomSplitter.py')
+	start = time.time()
+	subprocess.check_call([sys.executable, script, chanFile, outFile])
+	return time.time() - start
+
+
+def main(requests=200, clients=8, frames=200, address=''):
+	tempDir = tempfile.mkdtemp()
+	
+	ownServer = None
+	try:
+		chanFile = os.path.join(tempDir, 'load.chan')
+		writeChan(chanFile, frames)
+		
+		if not address:
+			address = os.path.join(tempDir, 'server.sock')
+			ownServer = server.createServer(address, quiet=True)
+			thread = threading.Thread(target=ownServer.serve_forever)
+			thread.daemon = True
+			thread.start()
+		
+		# warm up the workers before measuring
+		load(address, chanFile, tempDir, clients, clients)
+		
+		stats = load(address, chanFile, tempDir, requests, clients)
+		latencies = stats['latencies']
+		done = len(latencies)
+		
+		print "%d requests, %d clients, %d frame .chan, server %s" % (requests, clients, frames, address)
+		print "  throughput   %8.1f jobs/s  (%d ok, %d failed, %.2f s)" % \
+				(done / stats['wall'], done, len(stats['failures']), stats['wall'])
+		
+		if done:
+			print "  latency      p50 %7.1f ms  p95 %7.1f ms  p99 %7.1f ms  max %7.1f ms" % \
+					tuple([percentile(latencies, p) * 1000 for p in (50, 95, 99, 100)])
+			for name in ('queued', 'convert', 'total'):
+				mean = sum([t[name] for t in stats['timings']]) / done
+				print "  %-12s mean %7.1f ms" % (name, mean * 1000)
+		
+		for error in sorted(set(stats['failures']))[:5]:
+			print "  FAILED: %s" % error
+		
+		launch = min([timeLaunch(chanFile, os.path.join(tempDir, 'launch.fbx')) for i in xrange(3)])
+		print "  one command line conversion: %.1f ms" % (launch * 1000)
+		
+	finally:
+		if ownServer:
+			ownServer.shutdown()
+			ownServer.close()
+		shutil.rmtree(tempDir, True)
+
+
+if __name__ == "__main__":
+	args = sys.argv[1:]
+	main(*([int(a) for a in args[:3]] + args[3:4]))
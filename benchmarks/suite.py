@@ -0,0 +1,269 @@
+#!/usr/bin/env python
+
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+Written by: Justin Israel
+			justinisrael@gmail.com
+			justinfx.com
+
+
+Scaling benchmark suite of the output formats.
+
+Converts synthetic camera and null shots (see benchmarks.synthetic)
+across a sweep of frame and point counts, to every output format,
+and records the wall time, cpu time, peak memory and output size of 
+each. Each conversion runs in a fresh process, so its peak memory is
+its own. Peak memory needs the resource module, so it is only
+recorded on unix.
+
+Results can be written as JSON with --json, and compared against an
+earlier results file with --compare.
+
+Usage:
+	python -m benchmarks.suite [--frames 1000,10000] [--points 0,10000] 
+		[--formats fbx,fbxbin,action,terragen] [--types camera,null]
+		[--repeats 1] [--json results.json] [--compare old.json]
+"""
+
+import os, sys, time, json, shutil, platform, tempfile, optparse
+import multiprocessing
+
+try:
+	import resource
+except ImportError:
+	resource = None
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+from core import ChanConvert
+from benchmarks.synthetic import makeShot
+
+RESULTS_VERSION = 1
+
+FORMATS = ('fbx', 'fbxbin', 'action', 'terragen')
+
+# formats that only convert cameras
+CAMERA_FORMATS = ('action', 'terragen')
+
+
+def peakMemory():
+	""" Returns the peak resident memory of this process in bytes, or None """
+	if resource is None:
+		return None
+	
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	# kilobytes, except on osx
+	if sys.platform != 'darwin':
+		peak *= 1024
+	return peak
+
+
+def cpuTime():
+	""" Returns the user and system cpu time of this process """
+	times = os.times()
+	return times[0] + times[1]
+
+
+def _runCase(chanFile, objFile, outFormat, outFile, results):
+	""" Child process of runCase() """
+	try:
+		startCpu = cpuTime()
+		start = time.time()
+		
+		ChanConvert(chanFile, objFile=objFile, format=outFormat).writeFbx(outFile)
+		
+		wall = time.time() - start
+		cpu = cpuTime() - startCpu
+		results.put({'wall' : wall, 'cpu' : cpu, 'peakMemory' : peakMemory(), 
+					 'outputBytes' : os.path.getsize(outFile)})
+	except Exception, e:
+		results.put({'error' : str(e) or e.__class__.__name__})
+
+
+def runCase(chanFile, objFile, outFormat, outFile):
+	"""
+	runCase(str chanFile, str objFile, str outFormat, str outFile) -> dict
+	
+	Converts a file in a new process, and returns its wall, cpu, 
+	peakMemory and outputBytes, or an error.
+	"""
+	results = multiprocessing.Queue()
+	proc = multiprocessing.Process(target=_runCase, args=(chanFile, objFile, outFormat, outFile, results))
+	proc.start()
+	
+	try:
+		result = results.get()
+	finally:
+		proc.join()
+	
+	if os.path.exists(outFile):
+		os.remove(outFile)
+	
+	return result
+
+
+def sweep(frames, points, formats=FORMATS, types=('camera', 'null'), repeats=1, callback=None):
+	"""
+	sweep(list frames, list points, list formats=FORMATS, list types=('camera', 'null'), 
+		  int repeats=1, callback=None) -> list
+	
+	Runs every combination of the given sizes, formats and chan types,
+	returning a result dict for each. With repeats, the fastest wall and
+	cpu times and the largest peak memory are kept. Null shots are 
+	skipped for the formats that only convert cameras.
+	"""
+	tempDir = tempfile.mkdtemp(prefix='atomsplitter_bench')
+	results = []
+	
+	try:
+		for chanType in types:
+			for numFrames in frames:
+				for numPoints in points:
+					chanFile, objFile = makeShot(tempDir, numFrames, numPoints, chanType)
+					
+					inputBytes = os.path.getsize(chanFile)
+					if objFile:
+						inputBytes += os.path.getsize(objFile)
+					
+					for outFormat in formats:
+						if chanType != 'camera' and outFormat in CAMERA_FORMATS:
+							continue
+						
+						result = {'type' : chanType, 'frames' : numFrames, 'points' : numPoints, 
+								  'format' : outFormat, 'inputBytes' : inputBytes}
+						
+						outFile = os.path.join(tempDir, 'out.%s' % ChanConvert.EXTENSIONS.get(outFormat, 'fbx'))
+						runs = [runCase(chanFile, objFile, outFormat, outFile) for i in xrange(repeats)]
+						
+						errors = [run['error'] for run in runs if 'error' in run]
+						if errors:
+							result['error'] = errors[0]
+						else:
+							peaks = [run['peakMemory'] for run in runs if run['peakMemory'] is not None]
+							result.update(wall = min(run['wall'] for run in runs),
+										  cpu = min(run['cpu'] for run in runs),
+										  peakMemory = peaks and max(peaks) or None,
+										  outputBytes = runs[0]['outputBytes'])
+						
+						results.append(result)
+						if callback:
+							callback(result)
+	finally:
+		shutil.rmtree(tempDir, True)
+	
+	return results
+
+
+def caseKey(result):
+	return (result['type'], result['frames'], result['points'], result['format'])
+
+
+def loadResults(filename):
+	""" Returns {caseKey : result} from a results JSON file """
+	fh = open(filename, 'r')
+	try:
+		data = json.load(fh)
+	finally:
+		fh.close()
+	
+	return dict((caseKey(r), r) for r in data['results'])
+
+
+def writeResults(filename, results):
+	""" Writes results as JSON, with a description of the machine and version """
+	data = {'version' : RESULTS_VERSION,
+			'atomsplitter' : ChanConvert.VERSION,
+			'date' : time.strftime('%Y-%m-%dT%H:%M:%S'),
+			'python' : platform.python_version(),
+			'numpy' : numpy and numpy.__version__ or None,
+			'platform' : platform.platform(),
+			'cpus' : multiprocessing.cpu_count(),
+			'results' : results}
+	
+	fh = open(filename, 'w')
+	try:
+		json.dump(data, fh, indent=1, sort_keys=True)
+	finally:
+		fh.close()
+
+
+def printResult(result, previous=None):
+	MB = 1024.0 * 1024.0
+	
+	line = "%-6s  %8d  %8d  %-8s" % caseKey(result)
+	if 'error' in result:
+		print "%s  FAILED: %s" % (line, result['error'])
+		return
+	
+	peak = result['peakMemory'] is not None and "%8.1f" % (result['peakMemory'] / MB) or "%8s" % '-'
+	line = "%s  %8.3f  %8.3f  %s  %9.2f" % (line, result['wall'], result['cpu'], peak, result['outputBytes'] / MB)
+	
+	if previous and 'wall' in previous:
+		line = "%s  %6.2fx" % (line, previous['wall'] / max(result['wall'], 1e-9))
+	
+	print line
+	sys.stdout.flush()
+
+
+def main(args=None):
+	parser = optparse.OptionParser(usage="python -m benchmarks.suite [options]")
+	parser.add_option("--frames", default='1000,10000,100000', 
+						help="Comma separated frame counts (default 1000,10000,100000)")
+	parser.add_option("--points", default='0,10000,100000', 
+						help="Comma separated point cloud sizes (default 0,10000,100000)")
+	parser.add_option("--formats", default=','.join(FORMATS), 
+						help="Comma separated output formats (default %s)" % ','.join(FORMATS))
+	parser.add_option("--types", default='camera,null', 
+						help="Comma separated chan types (default camera,null)")
+	parser.add_option("--repeats", type='int', default=1, 
+						help="Runs of each case, keeping the fastest (default 1)")
+	parser.add_option("--json", default='', 
+						help="Write the results to this JSON file")
+	parser.add_option("--compare", default='', 
+						help="Show the speedup against the results in this JSON file")
+	
+	options, args = parser.parse_args(args)
+	
+	previous = {}
+	if options.compare:
+		previous = loadResults(options.compare)
+	
+	header = "%-6s  %8s  %8s  %-8s  %8s  %8s  %8s  %9s" % \
+				('type', 'frames', 'points', 'format', 'wall s', 'cpu s', 'peak MB', 'output MB')
+	if previous:
+		header += '  speedup'
+	print header
+	
+	results = sweep([int(n) for n in options.frames.split(',')],
+					[int(n) for n in options.points.split(',')],
+					[f.strip() for f in options.formats.split(',')],
+					[t.strip() for t in options.types.split(',')],
+					options.repeats,
+					lambda result: printResult(result, previous.get(caseKey(result))))
+	
+	if options.json:
+		writeResults(options.json, results)
+		print "\nWrote %s" % options.json
+
+
+if __name__ == "__main__":
+	main()
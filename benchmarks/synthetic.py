@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+Written by: Justin Israel
+			justinisrael@gmail.com
+			justinfx.com
+
+
+Deterministic synthetic shots for the benchmarks.
+
+Writes .chan camera or null paths and Nuke-style .obj point clouds 
+of any size. The same arguments always write the same files, so 
+results from different runs and machines are comparable.
+"""
+
+import os
+from math import sin, cos
+from random import Random
+
+
+def writeChan(filename, frames, chanType='camera', seed=0):
+	""" 
+	writeChan(str filename, int frames, str chanType='camera', int seed=0)
+	
+	Writes a synthetic .chan file with the given number of frames. 
+	'camera' files have a fov column, and 'null' files don't. The seed
+	offsets the path, and 0 gives the path the benchmarks have always used.
+	"""
+	fh = open(filename, 'w')
+	for f in xrange(1, frames+1):
+		t = f * 0.01 + seed
+		row = (f, sin(t)*10, 1.5+cos(t), -t*5, sin(t*0.5), t*3, 0.0)
+		if chanType == 'camera':
+			fh.write("%d\t%f\t%f\t%f\t%f\t%f\t%f\t%f\n" % (row + (40+sin(t),)))
+		else:
+			fh.write("%d\t%f\t%f\t%f\t%f\t%f\t%f\n" % row)
+	fh.close()
+
+
+def writeObj(filename, points, seed=0, extent=10.0):
+	""" 
+	writeObj(str filename, int points, int seed=0, float extent=10.0)
+	
+	Writes a synthetic Nuke point cloud .obj file, of points spread 
+	uniformly within extent of the origin.
+	"""
+	rand = Random(seed)
+	uniform = rand.uniform
+	
+	fh = open(filename, 'w')
+	fh.write('## OBJ file generated by Nuke ##\n')
+	for i in xrange(points):
+		fh.write('v %f %f %f\n' % (uniform(-extent, extent), uniform(-extent, extent), uniform(-extent, extent)))
+	fh.close()
+
+
+def makeShot(directory, frames, points=0, chanType='camera', seed=0):
+	"""
+	makeShot(str directory, int frames, int points=0, str chanType='camera', int seed=0) 
+		-> (str chanFile, str objFile)
+	
+	Writes a .chan file, and a point cloud if points is given, into
+	directory, reusing files already written with the same arguments.
+	objFile is an empty string without points.
+	"""
+	chanFile = os.path.join(directory, '%s_%d_%d.chan' % (chanType, frames, seed))
+	if not os.path.isfile(chanFile):
+		writeChan(chanFile, frames, chanType, seed)
+	
+	objFile = ''
+	if points:
+		objFile = os.path.join(directory, 'cloud_%d_%d.obj' % (points, seed))
+		if not os.path.isfile(objFile):
+			writeObj(objFile, points, seed)
+	
+	return chanFile, objFile
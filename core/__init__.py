@@ -0,0 +1,34 @@
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+Written by: Justin Israel
+			justinisrael@gmail.com
+			justinfx.com
+
+The conversion engine of AtomSplitter: parsing .chan files and
+rendering them to the output formats. Nothing in this package
+depends on PyQt4, so it can be used on machines without Qt.
+
+"""
+
+from core.cache import ParseCache
+from core.chanfile import ChanFile, ChanKeyData
+from core.chanconvert import ChanConvert, ConvertCancelled, PointCloudFbxData
+from core.batch import expandChanFiles, batchConvert
+from core.watch import ChanWatcher
+from core.stats import ConvertStats
@@ -0,0 +1,232 @@
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+Written by: Justin Israel
+			justinisrael@gmail.com
+			justinfx.com
+
+"""
+
+import os, glob, time, signal
+import multiprocessing
+from os import path
+
+from core.chanconvert import ChanConvert, ConvertCancelled
+
+# seconds between checks for an interrupt, while waiting on the pool
+RESULT_WAIT = 0.5
+
+# the message queue and cancel flag of a _queueConvert() worker
+_messages = None
+_cancelFlag = None
+
+############################################################# 
+#############################################################
+######## Batch
+############################################################# 
+############################################################# 
+def expandChanFiles(paths=(), manifest=None):
+	"""
+	expandChanFiles(list paths=(), str manifest=None) -> list
+	
+	Returns the list of .chan files named by a mix of file paths,
+	glob patterns and directories (searched recursively for .chan files),
+	plus the paths listed in an optional manifest file, one per line.
+	Blank lines and lines starting with # are skipped in the manifest.
+	Duplicates are removed, keeping the first occurrence.
+	"""
+	paths = list(paths)
+	
+	if manifest:
+		fh = open(manifest, 'r')
+		for line in fh:
+			line = line.strip()
+			if line and not line.startswith('#'):
+				paths.append(line)
+		fh.close()
+	
+	chanFiles = []
+	for item in paths:
+		if path.isdir(item):
+			for root, dirs, files in os.walk(item):
+				dirs.sort()
+				for name in sorted(files):
+					if name.lower().endswith('.chan'):
+						chanFiles.append(path.join(root, name))
+		elif glob.has_magic(item):
+			chanFiles.extend(sorted(glob.glob(item)))
+		else:
+			chanFiles.append(item)
+	
+	seen = set()
+	unique = []
+	for chan in chanFiles:
+		if chan not in seen:
+			seen.add(chan)
+			unique.append(chan)
+	
+	return unique
+
+
+def _initWorker():
+	# long running pools are closed by their owner on an interrupt,
+	# rather than each worker raising KeyboardInterrupt
+	signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _batchConvert(job):
+	"""
+	_batchConvert(tuple job) -> tuple
+	
+	Pool worker for batchConvert(). Converts one (chanFile, options, outFile) 
+	job, returning (chanFile, writtenFiles, error, seconds). Failures are 
+	returned rather than raised, so one bad file doesn't stop the batch.
+	"""
+	chanFile, options, outFile = job
+	start = time.time()
+	
+	try:
+		written = ChanConvert(chanFile, **options).writeAll(outFile)
+	except Exception, e:
+		return (chanFile, None, str(e) or e.__class__.__name__, time.time() - start)
+		
+	return (chanFile, written, None, time.time() - start)
+
+
+def _initQueueWorker(messages, cancelFlag):
+	"""
+	_initQueueWorker(multiprocessing.Queue messages, cancelFlag)
+	
+	Pool initializer for _queueConvert(). cancelFlag is a shared 
+	multiprocessing.RawValue, which cancels the running conversions
+	while it is set.
+	"""
+	global _messages, _cancelFlag
+	
+	_initWorker()
+	_messages = messages
+	_cancelFlag = cancelFlag
+
+
+def _queueConvert(job):
+	"""
+	_queueConvert(tuple job) -> None
+	
+	Pool worker for a queue that follows each conversion, such as the
+	GUI's batch queue. Converts one (key, chanFile, options, outFile) 
+	job with ChanConvert.writeFbx(), putting these messages on the 
+	queue given to _initQueueWorker():
+	
+		('progress', key, str stage, float fraction) - as the 
+						ChanConvert progress callback, when the 
+						percent through a stage changes
+		('converted', key, str writtenFile)
+		('failed', key, str error)
+		('cancelled', key)
+	"""
+	key, chanFile, options, outFile = job
+	
+	last = [None]
+	def progress(stage, fraction):
+		# only changes are sent, rather than flooding the queue
+		percent = fraction
+		if fraction is not None:
+			percent = int(fraction * 100)
+		if (stage, percent) != last[0]:
+			last[0] = (stage, percent)
+			_messages.put(('progress', key, stage, fraction))
+	
+	def cancelled():
+		return bool(_cancelFlag.value)
+	
+	try:
+		written = ChanConvert(chanFile, **options).writeFbx(outFile, progress=progress, cancelled=cancelled)
+	except ConvertCancelled:
+		_messages.put(('cancelled', key))
+	except Exception, e:
+		_messages.put(('failed', key, str(e) or e.__class__.__name__))
+	else:
+		_messages.put(('converted', key, written))
+
+
+def batchConvert(chanFiles, jobs=0, callback=None, **kwargs):
+	"""
+	batchConvert(list chanFiles, int jobs=0, callback=None, **kwargs) -> list
+	
+	Converts many .chan files across a pool of worker processes.
+	Each file is written next to its source, as with ChanConvert.writeAll().
+	Returns a list of (chanFile, writtenFiles, error, seconds) tuples,
+	in the order the conversions finished. writtenFiles is None and
+	error is a message for failed conversions.
+	
+		list chanFiles - .chan file paths (see expandChanFiles)
+		int jobs - number of worker processes. 0 uses one per cpu,
+				   and 1 converts in this process without a pool
+		callable callback - optional, called with each result tuple as it finishes
+		
+	Remaining keywords are passed to ChanConvert for every file.
+	"""
+	if not jobs:
+		jobs = multiprocessing.cpu_count()
+	jobs = max(1, min(jobs, len(chanFiles)))
+	
+	work = [(chanFile, kwargs, '') for chanFile in chanFiles]
+	
+	pool = None
+	if jobs > 1:
+		pool = multiprocessing.Pool(jobs, _initWorker)
+		results = _poolResults(pool.imap_unordered(_batchConvert, work), len(work))
+	else:
+		results = (_batchConvert(job) for job in work)
+	
+	finished = []
+	try:
+		for result in results:
+			finished.append(result)
+			if callback:
+				callback(result)
+	except:
+		# an interrupt, or a failing callback, stops the running workers
+		if pool:
+			pool.terminate()
+			pool.join()
+		raise
+	
+	if pool:
+		pool.close()
+		pool.join()
+	
+	return finished
+
+
+def _poolResults(results, count):
+	"""
+	_poolResults(iterator results, int count) -> generator
+	
+	Yields the count results of a Pool.imap_unordered() iterator. Each
+	result is waited on in steps of RESULT_WAIT seconds, since a wait
+	without a timeout can't be interrupted by Ctrl-C on python 2.
+	"""
+	for i in xrange(count):
+		while True:
+			try:
+				result = results.next(RESULT_WAIT)
+			except multiprocessing.TimeoutError:
+				continue
+			yield result
+			break
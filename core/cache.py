@@ -0,0 +1,255 @@
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+Written by: Justin Israel
+			justinisrael@gmail.com
+			justinfx.com
+
+"""
+
+
+import os, sys, mmap, struct, hashlib
+from os import path
+from array import array
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+############################################################# 
+#############################################################
+######## ParseCache
+############################################################# 
+############################################################# 
+class ParseCache(object):
+	"""
+	On-disk cache of parsed .chan and .obj data.
+	
+	Each entry is one binary file in the cache directory, holding
+	a small header followed by the parsed columns as raw little-endian
+	doubles. Entries are keyed by the source file's path, size, mtime 
+	and a hash of its contents, so an edited file is never served stale 
+	data. Loading an entry is a single memory-mapped read, rather than
+	a text parse.
+	
+	The directory is kept under maxSize bytes by evicting the least 
+	recently used entries (by file mtime, which is refreshed on every hit).
+	"""
+	
+	DEFAULT_DIR = path.join(path.expanduser('~'), '.atomsplitter', 'cache')
+	DEFAULT_MAX_SIZE = 512 * 1024 * 1024
+	
+	# bump when the entry layout, or the parse results, change
+	VERSION = 1
+	
+	MAGIC = 'ATSPLCH%d' % VERSION
+	HEADER = struct.Struct('<8s16sII')
+	EXTENSION = '.cache'
+	
+	def __init__(self, cacheDir=None, maxSize=None):
+		""" 
+		__init__(str cacheDir=None, int maxSize=None)
+		
+			str cacheDir - directory to store entries in. Defaults to the
+						   ATOMSPLITTER_CACHE environment variable, or
+						   ~/.atomsplitter/cache
+			int maxSize - bytes kept on disk before evicting (default 512MB)
+		"""
+		self.cacheDir = cacheDir or os.environ.get('ATOMSPLITTER_CACHE') or self.DEFAULT_DIR
+		self.maxSize = maxSize or self.DEFAULT_MAX_SIZE
+	
+	def getKey(self, filename, data=None):
+		""" 
+		getKey(str filename, str data=None) -> str
+		
+		Returns the cache key of a source file. If the file contents 
+		have already been read, pass them as data to avoid reading twice.
+		"""
+		st = os.stat(filename)
+		
+		if data is None:
+			digest = hashlib.sha1()
+			fh = open(filename, 'rb')
+			try:
+				for chunk in iter(lambda: fh.read(1024 * 1024), ''):
+					digest.update(chunk)
+			finally:
+				fh.close()
+		else:
+			digest = hashlib.sha1(data)
+		
+		key = '%d\0%s\0%d\0%r\0%s' % (self.VERSION, path.abspath(filename), 
+									   st.st_size, st.st_mtime, digest.hexdigest())
+		return hashlib.sha1(key).hexdigest()
+	
+	def load(self, key):
+		"""
+		load(str key) -> (str kind, list columns) or None
+		
+		Returns the kind and columns stored under key, or None if there 
+		is no valid entry. With numpy the columns are read-only numpy arrays
+		backed by a memory map of the entry, otherwise array.array instances.
+		"""
+		entry = self._entryPath(key)
+		try:
+			fh = open(entry, 'rb')
+		except IOError:
+			return None
+		
+		try:
+			header = fh.read(self.HEADER.size)
+			if len(header) != self.HEADER.size:
+				return None
+			
+			magic, kind, numColumns, numRows = self.HEADER.unpack(header)
+			count = numColumns * numRows
+			
+			if magic != self.MAGIC or os.fstat(fh.fileno()).st_size != self.HEADER.size + count * 8:
+				return None
+			
+			if numpy is not None and count:
+				buf = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+				table = numpy.frombuffer(buf, dtype='<f8', count=count, offset=self.HEADER.size)
+				table = table.reshape(numColumns, numRows)
+				columns = [table[i] for i in xrange(numColumns)]
+			else:
+				flat = array('d')
+				flat.fromfile(fh, count)
+				if sys.byteorder != 'little':
+					flat.byteswap()
+				columns = [flat[i*numRows:(i+1)*numRows] for i in xrange(numColumns)]
+		finally:
+			fh.close()
+		
+		self._touch(entry)
+		
+		return kind.rstrip('\0'), columns
+	
+	def store(self, key, kind, columns):
+		"""
+		store(str key, str kind, list columns) -> void
+		
+		Writes columns, a list of equal length sequences of numbers,
+		under key and evicts old entries if the cache is over its size.
+		Failing to write the cache is never an error, it just misses.
+		"""
+		numRows = len(columns) and len(columns[0])
+		entry = self._entryPath(key)
+		temp = '%s.%d.tmp' % (entry, os.getpid())
+		
+		try:
+			if not path.isdir(self.cacheDir):
+				os.makedirs(self.cacheDir)
+			
+			fh = open(temp, 'wb')
+			try:
+				fh.write(self.HEADER.pack(self.MAGIC, kind, len(columns), numRows))
+				for column in columns:
+					if numpy is not None and isinstance(column, numpy.ndarray):
+						fh.write(column.astype('<f8').tostring())
+					else:
+						column = array('d', column)
+						if sys.byteorder != 'little':
+							column.byteswap()
+						column.tofile(fh)
+			finally:
+				fh.close()
+			
+			# entries are written aside and renamed into place, so other
+			# processes sharing the cache never see a partial entry
+			if path.exists(entry):
+				os.remove(entry)
+			os.rename(temp, entry)
+			
+		except (IOError, OSError):
+			if path.exists(temp):
+				try:
+					os.remove(temp)
+				except OSError:
+					pass
+			return
+		
+		self.evict()
+	
+	def evict(self, maxSize=None):
+		"""
+		evict(int maxSize=None) -> int
+		
+		Removes the least recently used entries until the cache fits in 
+		maxSize bytes (default self.maxSize). Returns the number removed.
+		"""
+		if maxSize is None:
+			maxSize = self.maxSize
+		
+		entries = []
+		total = 0
+		for name in self._entries():
+			try:
+				st = os.stat(name)
+			except OSError:
+				continue
+			entries.append((st.st_mtime, st.st_size, name))
+			total += st.st_size
+		
+		entries.sort()
+		
+		removed = 0
+		for mtime, size, name in entries:
+			if total <= maxSize:
+				break
+			try:
+				os.remove(name)
+			except OSError:
+				# in use, ie. memory mapped on windows
+				continue
+			total -= size
+			removed += 1
+		
+		return removed
+	
+	def clear(self):
+		""" Removes every entry from the cache """
+		return self.evict(0)
+	
+	def size(self):
+		""" Returns the total bytes used by cache entries """
+		total = 0
+		for name in self._entries():
+			try:
+				total += path.getsize(name)
+			except OSError:
+				pass
+		return total
+	
+	def _entries(self):
+		""" Returns the paths of every entry in the cache directory """
+		if not path.isdir(self.cacheDir):
+			return []
+		return [path.join(self.cacheDir, name) for name in os.listdir(self.cacheDir) 
+				if name.endswith(self.EXTENSION)]
+	
+	def _entryPath(self, key):
+		return path.join(self.cacheDir, key + self.EXTENSION)
+	
+	def _touch(self, entry):
+		""" Marks an entry as recently used """
+		try:
+			os.utime(entry, None)
+		except OSError:
+			pass
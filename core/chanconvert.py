@@ -0,0 +1,1167 @@
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+Written by: Justin Israel
+			justinisrael@gmail.com
+			justinfx.com
+
+"""
+
+import os, sys, time, threading
+from os import path
+from array import array
+from datetime import datetime
+from math import tan, radians
+from collections import defaultdict
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+from templates import fbx_template, fbx_binary, chan2terragen, chan2action
+
+from core.chanfile import ChanFile
+from core.objfile import readObjPoints
+from core import keyreduce, pointcloud
+from core.stats import NULL_STATS
+
+class ConvertCancelled(Exception):
+	""" Raised by a progress callback to stop a conversion """
+
+
+############################################################# 
+#############################################################
+######## ChanConvert
+############################################################# 
+############################################################# 
+class ChanConvert(object):
+	"""
+	Given a .chan file, class will perform the conversion
+	to FBX format. Defaults assume 24 fps at 2k Full aperature
+	resolution, and can be overridden during init.
+	Also supports optional .obj file, which should be exported
+	from a nuke pointCloud.
+	"""
+	
+	DEFAULT_FPS = 24
+	DEFAULT_WIDTH = 2048
+	DEFAULT_HEIGHT = 1556
+	DEFAULT_FILMWIDTH = 24.576
+	DEFAULT_FILMHEIGHT = 18.672
+	DEFAULT_SCALEVALUE = 1.0
+	
+	VERSION = "1.6.3"
+	
+	# bytes buffered by the output file between writes to disk
+	WRITE_BUFFER_SIZE = 1024 * 1024
+	
+	# rendered chunks written between calls to a progress callback
+	PROGRESS_CHUNKS = 256
+	
+	# most points written to a single mesh, with pointCloud='mesh'
+	POINTS_PER_MESH = 250000
+	
+	# output format -> file extension
+	EXTENSIONS = {'fbx' : 'fbx', 'fbxbin' : 'fbx', 'action' : 'action', 'terragen' : 'tgd'}
+	
+	# other names accepted for an output format
+	FORMAT_ALIASES = {'tgd' : 'terragen'}
+	
+	def __init__(self, chanFile, objFile=None, **kwargs):
+		""" 
+		__init__(str chanFile, objFile=None, **kwargs)
+			
+			str chanFile - path to .chan file
+			str objFile - path to nuke exported pointcloud .obj file
+			
+		Default values can be set with the following keywords:
+			int fps		  - frames per second (default 24)
+			int width		- frame resolution width (default 2048)
+			int height	   - frame resolution height (default 1556)
+			float filmWidth  - horizontal aperature in millimeters (default 24.576)
+			float filmHeight - vertical aperature in millimenters (default 18.672)
+			bool doAction  -  If True, export a Flame .action file instead
+			float scaleValue - scales translate by given amount (default 1.0)
+			str format - output format: fbx, fbxbin, action or terragen (default fbx).
+						 Several formats can be given as a list, or comma separated
+			bool compress - zlib compress the arrays of binary FBX output (default True)
+			ParseCache cache - on-disk cache of parsed .chan and .obj data (default None)
+			str pointCloud - how FBX output writes the .obj points: 'locators', a null
+							 per point (default), or 'mesh', packed into the vertices 
+							 of meshes of up to POINTS_PER_MESH points
+			reduce - keyframe reduction tolerances, see keyreduce.getTolerances().
+					 A float, a 'translate,rotate,fov' string, a dict of channel
+					 name -> tolerance, or True for the defaults (default None, off)
+			pointOutliers - drops the .obj points that are far from their nearest
+							neighbours, like stray solve points. An int number of 
+							neighbours, a 'neighbours,stdRatio' string, or True for
+							the defaults. See pointcloud.removeOutliers() (default None, off)
+			int pointCull - keeps only the .obj points that the camera sees, inside the 
+							film back, on at least this many frames. Camera .chan
+							files only. See pointcloud.frustumCull() (default None, off)
+			float pointVoxel - decimates the .obj points to the one nearest the centroid 
+							   of each cube of this size, in .obj units before scaleValue. 
+							   See pointcloud.voxelDecimate() (default None, off)
+			int pointGroup - parents the .obj points in a balanced tree of 'pointGroupN'
+							 nulls or axes of at most this many children each, 
+							 sorted along a Morton curve so that each group holds
+							 nearby points. See pointcloud.groupHierarchy() (default None, off)
+			ConvertStats stats - records the time spent in each stage of the 
+								 conversion, see core.stats (default None, off)
+			
+		"""
+		self.__cache = kwargs.get('cache', None)
+		self.__chanFile = ChanFile(chanFile, cache=self.__cache)
+		self.__objFile  = objFile
+		
+		self.__fps = kwargs.get('fps', self.DEFAULT_FPS)
+		self.__width = kwargs.get('width', self.DEFAULT_WIDTH)
+		self.__height = kwargs.get('height', self.DEFAULT_HEIGHT)
+		self.__filmWidth = kwargs.get('filmWidth', self.DEFAULT_FILMWIDTH)
+		self.__filmHeight = kwargs.get('filmHeight', self.DEFAULT_FILMHEIGHT)
+		self.__scaleValue = kwargs.get('scaleValue', self.DEFAULT_SCALEVALUE)
+		self.__compress = kwargs.get('compress', True)
+		self.__pointCloud = kwargs.get('pointCloud', 'locators')
+		self.__pointOutliers = kwargs.get('pointOutliers')
+		self.__pointCull = kwargs.get('pointCull')
+		self.__pointVoxel = kwargs.get('pointVoxel')
+		self.__pointGroup = kwargs.get('pointGroup') or 0
+		self.__stats = kwargs.get('stats') or NULL_STATS
+		
+		if self.__pointCloud not in ('locators', 'mesh'):
+			raise ValueError("Unknown pointCloud mode %r, expected 'locators' or 'mesh'" % self.__pointCloud)
+		
+		
+		self.__objPoints = None
+		self.__pointStats = []
+		self.__keyReduction = None
+		self.__keyTimes = None
+		self.__focalLengths = None
+		self.__lock = threading.Lock()
+		
+		self.__tolerances = None
+		if kwargs.get('reduce'):
+			self.__tolerances = keyreduce.getTolerances(kwargs['reduce'])
+		
+		formats = kwargs.get('format', 'fbx')
+		if isinstance(formats, basestring):
+			formats = formats.split(',')
+		
+		self.__formats = []
+		for outFormat in formats:
+			outFormat = self.getFormatName(outFormat)
+			if outFormat and outFormat not in self.__formats:
+				self.__formats.append(outFormat)
+		
+		if not self.__formats:
+			self.__formats = ['fbx']
+			
+	
+	def getTemplate(self, data={}):
+		""" 
+		getTemplate(dict data={}) -> str
+		
+		Returns the fbx template string, optional rendered
+		using given dictionary values. The given dictionary
+		is not modified.
+		
+		"""
+		
+		dataType = self.__chanFile.getType()
+		
+		if data:
+			
+			data = data.copy()
+			
+			if self.__objFile:
+				pointData = self._objToFbxData()
+				data['totalObjCount']   += len(pointData)
+				data['totalModelCount'] += len(pointData)	
+				
+				template = fbx_template.getTemplate(objectType=dataType, 
+													objectData=pointData)
+			else:
+				template = fbx_template.getTemplate(objectType=dataType)
+			
+			return template % data
+		
+		return fbx_template.getTemplate(dataType)
+
+
+	def iterFbx(self, data):
+		""" 
+		iterFbx(dict data) -> generator
+		
+		Streaming version of getTemplate(data). Yields the rendered FBX
+		file in pieces, formatting point cloud locators and animation
+		keys only as they are consumed, so memory use does not grow
+		with the number of frames or points.
+		
+		The 'animationData' value of data is ignored, and the
+		keys from iterKeyData() are used instead.
+		"""
+		
+		data = data.copy()
+		
+		pointData = self._objToFbxData()
+		data['totalObjCount']   += len(pointData)
+		data['totalModelCount'] += len(pointData)
+		
+		return fbx_template.iterTemplate(data, 
+										 objectType=self.__chanFile.getType(), 
+										 objectData=self.__stats.iterSpan('render.points', pointData),
+										 animationData=self.__stats.iterSpan('render.keys', self.iterKeyData()))
+
+
+	def iterFbxBinary(self, data):
+		""" 
+		iterFbxBinary(dict data) -> generator
+		
+		Binary FBX 7.4 version of iterFbx(data). Yields the file in pieces.
+		Animation keys are written as packed KeyTime/KeyValueFloat arrays,
+		zlib compressed unless the converter was created with compress=False.
+		"""
+		
+		with self.__stats.span('render.keys'):
+			keyTimes, curves = self._getFbxCurves()
+		
+		meshSize = 0
+		if self.__pointCloud == 'mesh':
+			meshSize = self.POINTS_PER_MESH
+		
+		return fbx_binary.iterTemplate(data, 
+									   objectType=self.__chanFile.getType(), 
+									   keyTimes=keyTimes,
+									   curves=curves,
+									   points=self.getObjPoints(),
+									   meshSize=meshSize,
+									   groupSize=self.__pointGroup,
+									   scale=self.__scaleValue,
+									   compress=self.__compress)
+
+
+	def _getFbxCurves(self):
+		"""
+		_getFbxCurves() -> (list keyTimes, list curves)
+		
+		Returns the FBX times of every frame, and the animation curves
+		of the binary FBX template: a (nodeName, propName, channels) 
+		tuple per animated property. See fbx_binary.iterTemplate()
+		"""
+		keyTimes = self.getKeyTimes()
+		keyIndices = self.getKeyIndices()
+		
+		def channel(label, name, values):
+			# reduced channels carry their own key times
+			if keyIndices is None:
+				return (label, values)
+			indices = keyIndices[name]
+			return (label, [values[i] for i in indices], [keyTimes[i] for i in indices])
+		
+		curves = []
+		for c1, nodeName, propName in (('t', 'T', 'Lcl Translation'), ('r', 'R', 'Lcl Rotation')):
+			channels = []
+			for c2 in 'xyz':
+				values = self.__chanFile.getColumn(c1 + c2).tolist()
+				if c1 == 't':
+					values = [val * self.__scaleValue for val in values]
+				channels.append(channel(c2.upper(), c1 + c2, values))
+			curves.append((nodeName, propName, channels))
+		
+		# camera only
+		if self.__chanFile.getType() == 'camera':
+			values = self.getFocalLengths()
+			curves.append(('FocalLength', 'FocalLength', [channel('FocalLength', 'focalLength', values)]))
+		
+		return keyTimes, curves
+
+
+	def keyDataToString(self):
+		""" 
+		keyDataToString() -> str
+		
+		Returns the 'Models animation' section of the FBX format.
+		Keys from chan file are parsed and converted ot the string format.
+		"""
+		return '\n'.join(self.iterKeyData())
+	
+	
+	def iterKeyData(self):
+		""" 
+		iterKeyData() -> generator
+		
+		Yields the lines of the 'Models animation' section of the FBX format,
+		one at a time, as returned joined together by keyDataToString()
+		"""
+		
+		if self.__chanFile.getType() == 'camera':
+			objectName = 'camera1'
+		else:
+			objectName = 'null1'
+
+		keyTimes   = self.getKeyTimes()
+		allKeys	   = xrange(len(keyTimes))
+		keyIndices = self.getKeyIndices() or {}
+		
+		yield '\t\tModel: "Model::%s" {\n\t\t\tVersion: 1.1' % objectName
+		
+		yield '\t\t\tChannel: "Transform" {'
+		
+		for i, c1 in enumerate('tr'):
+			
+			yield '\t\t\t\tChannel: "%s" {' % c1.upper()
+	
+			for c2 in 'xyz':
+				key = '%s%s' % (c1, c2)
+				indices = keyIndices.get(key, allKeys)
+				last = len(indices) - 1
+				
+				yield '\t\t\t\t\tChannel: "%s" {' % c2.upper()
+				yield '\t\t\t\t\t\tDefault: 0\n\t\t\t\t\t\tKeyVer: 4005\n\t\t\t\t\t\tKeyCount: %s' % len(indices)
+				yield '\t\t\t\t\t\tKey:'
+				
+				# keys loop
+				values = self.__chanFile.getColumn(key).tolist()
+				for n, index in enumerate(indices):
+				
+					val	 = values[index]
+					if c1 == 't':
+						val *= self.__scaleValue
+					
+					if n == last:
+						lineterm = ''
+					else:
+						lineterm = ','
+					
+					yield '\t\t\t\t\t\t\t%s,%s,L%s' % (keyTimes[index], val, lineterm)
+				
+				yield '\t\t\t\t\t\tColor: 1,1,1'
+				yield '\t\t\t\t\t}'
+				
+			yield '\t\t\t\t\tLayerType: %s' % str(i+1)
+			yield '\t\t\t\t}'
+		
+		yield '\t\t\t}'
+		
+		# camera only
+		if self.__chanFile.getType() == 'camera':
+			focalLengths = self.getFocalLengths()
+			indices = keyIndices.get('focalLength', allKeys)
+			last = len(indices) - 1
+			
+			default = focalLengths[0]
+			yield '\t\t\tChannel: "FocalLength" {'
+			yield '\t\t\t\tDefault: %s\n\t\t\t\tKeyVer: 4005\n\t\t\t\tKeyCount: %s' % (default, len(indices))
+			
+			# keys loop
+			yield '\t\t\t\tKey:'
+			for n, index in enumerate(indices):
+			
+				if n == last:
+					lineterm = ''
+				else:
+					lineterm = ','
+						
+				yield '\t\t\t\t\t%s,%s,L%s' % (keyTimes[index], focalLengths[index], lineterm)			
+			
+			yield '\t\t\t\tColor: 1,1,1'
+			yield '\t\t\t}'
+		
+		yield '\t\t}'
+			
+			
+	def setFps(self, fps):
+		""" 
+		setFps(int fps) -> void
+		
+		Set the fps used in the output FBX
+		"""
+		with self.__lock:
+			self.__fps = fps
+			self.__keyTimes = None
+
+	def getFormats(self):
+		""" Return the list of output formats this converter writes """
+		return list(self.__formats)
+	
+	def getObjPoints(self):
+		""" 
+		getObjPoints() -> array
+		
+		Return the point cloud from the .obj file as a flat array of
+		x, y, z positions, or an empty list if there is no .obj file.
+		The file is only read and filtered once, and shared by every 
+		output format and thread.
+		"""
+		if self.__objPoints is None:
+			with self.__lock:
+				if self.__objPoints is None:
+					if self.__objFile and self.__cache is not None:
+						points = self._readCachedObjPoints()
+					elif self.__objFile:
+						points = readObjPoints(self.__objFile)
+					else:
+						points = []
+					
+					self.__objPoints = self._filterPoints(points)
+		
+		return self.__objPoints
+	
+	def getPointStats(self):
+		"""
+		getPointStats() -> list
+		
+		Returns a (str stage, int pointsBefore, int pointsAfter) tuple 
+		for each filter run on the .obj points, or an empty list if the
+		converter doesn't filter them.
+		"""
+		self.getObjPoints()
+		return list(self.__pointStats)
+	
+	def getKeyTimes(self):
+		"""
+		getKeyTimes() -> list
+		
+		Returns the FBX time of every frame of the .chan file, as
+		getFbxTimes(). They are only computed once, and shared by
+		every output format.
+		"""
+		keyTimes = self.__keyTimes
+		if keyTimes is None:
+			with self.__lock:
+				if self.__keyTimes is None:
+					self.__keyTimes = self.getFbxTimes(self.__chanFile.getColumn('frame'), self.__fps)
+				keyTimes = self.__keyTimes
+		
+		return keyTimes
+	
+	def getFocalLengths(self):
+		"""
+		getFocalLengths() -> list
+		
+		Returns the focal length of every frame of a camera .chan file,
+		from its fov and the film height, as getFovsToFocalLengths(). 
+		They are only computed once, and shared by every output format.
+		"""
+		if self.__focalLengths is None:
+			with self.__lock:
+				if self.__focalLengths is None:
+					self.__focalLengths = self.getFovsToFocalLengths(self.__filmHeight, 
+																	  self.__chanFile.getColumn('fov'))
+		
+		return self.__focalLengths
+	
+	def getKeyIndices(self):
+		""" 
+		getKeyIndices() -> dict
+		
+		Returns channel name -> list of the key indices to write, after
+		keyframe reduction, or None if the converter doesn't reduce keys.
+		The reduction is only run once, and shared by every output format.
+		Cameras also have a 'focalLength' channel, for the FBX formats.
+		"""
+		if not self.__tolerances:
+			return None
+		
+		if self.__keyReduction is None:
+			isCamera = self.__chanFile.getType() == 'camera'
+			if isCamera:
+				focalLengths = self.getFocalLengths()
+			
+			with self.__lock:
+				if self.__keyReduction is None:
+					columns = self.__chanFile.getColumns()
+					channels = list(keyreduce.CHANNELS)
+					tolerances = self.__tolerances
+					
+					if isCamera:
+						# fbx writes focal lengths, which are reduced on their own, 
+						# to the focal length tolerance of the fov tolerance
+						columns = dict(columns)
+						columns['focalLength'] = focalLengths
+						channels.append('focalLength')
+						
+						tolerances = dict(tolerances)
+						tolerances['focalLength'] = keyreduce.getFocalLengthTolerance(self.__filmHeight, 
+																					 columns['fov'], 
+																					 tolerances.get('fov'))
+					else:
+						channels.remove('fov')
+					
+					self.__keyReduction = keyreduce.reduceKeys(columns, tolerances, channels)
+		
+		return dict((name, indices) for name, (indices, error) in self.__keyReduction.iteritems())
+	
+	def getReductionStats(self):
+		"""
+		getReductionStats() -> list
+		
+		Returns a (str channel, int keysBefore, int keysAfter, float maxError) 
+		tuple for each reduced channel, or an empty list without reduction.
+		maxError is in .chan units, before scaleValue.
+		"""
+		if self.getKeyIndices() is None:
+			return []
+		
+		total = self.__chanFile.totalFrames()
+		
+		stats = []
+		for name in keyreduce.CHANNELS + ('focalLength',):
+			if name in self.__keyReduction:
+				indices, error = self.__keyReduction[name]
+				stats.append((name, total, len(indices), error))
+		
+		return stats
+	
+	def writeFbx(self, outfile='', outFormat=None, progress=None, cancelled=None):
+		""" 
+		writeFbx(str outfile, str outFormat=None, progress=None, cancelled=None) -> str fileWritten
+		
+		Main method which processes the chan file and writes out
+		the FBX file to the given filename. If no filename is
+		given, FBX is written with the same name in the same
+		directory as source.
+		Returns the filename that was actually written out, in-case
+		the file existed already and had to be renamed.
+		
+			str outfile - full .fbx filepath to write out
+			str outFormat - format to write. Defaults to the first format
+							the converter was created with. See writeAll()
+							to write every format.
+			callable progress - optional, called as progress(str stage, fraction)
+								through the conversion. See writeAll()
+			callable cancelled - optional, returns True to stop the conversion.
+								 See writeAll()
+		"""
+		if not outFormat:
+			outFormat = self.__formats[0]
+		
+		if not outfile:
+			outfile = self._getOutFile(self.__chanFile.getFileName(), ext=self.EXTENSIONS.get(outFormat, 'fbx'))
+		
+		self._prepare(progress)
+		
+		self._write(outFormat, outfile, self._getData(), progress, cancelled)
+		
+		return outfile
+	
+	def writeAll(self, outfile='', threaded=True, progress=None, cancelled=None):
+		""" 
+		writeAll(str outfile='', bool threaded=True, progress=None, cancelled=None) -> list filesWritten
+		
+		Writes every output format the converter was created with,
+		returning the list of written filenames in the same order.
+		The .chan and .obj files are parsed once and shared by all
+		of the formats, which are written in parallel threads if
+		threaded is True.
+		
+			str outfile - filepath to write out. With more than one format, 
+						  its extension is replaced by each format's extension.
+						  If not given, files are written next to the source.
+			callable progress - optional, called as progress(str stage, fraction)
+								through the conversion. The stages are 'parse',
+								then 'render' and 'write' for each format. fraction 
+								is from 0.0 to 1.0 through the stage. The 'write'
+								fraction is estimated from the number of objects and
+								keys. With several formats, it is called
+								from each writer thread. It may raise ConvertCancelled
+								to stop the conversion, and any partly written file 
+								is removed.
+			callable cancelled - optional, called with no arguments for each frame
+								 or object as the output is rendered. Once it returns
+								 True, ConvertCancelled is raised, as from progress.
+		"""
+		
+		# parse everything up front, so the writers only read shared data
+		self._prepare(progress)
+		data = self._getData()
+		
+		outfiles = []
+		for outFormat in self.__formats:
+			ext = self.EXTENSIONS.get(outFormat, 'fbx')
+			
+			if not outfile:
+				name = self._getOutFile(self.__chanFile.getFileName(), ext=ext, exclude=outfiles)
+			elif len(self.__formats) > 1:
+				name = '%s.%s' % (path.splitext(outfile)[0], ext)
+				if name in outfiles:
+					name = self._getOutFile(name, ext=ext, exclude=outfiles)
+			else:
+				name = outfile
+			
+			outfiles.append(name)
+		
+		jobs = zip(self.__formats, outfiles)
+		
+		if not threaded or len(jobs) < 2:
+			for outFormat, name in jobs:
+				self._write(outFormat, name, data, progress, cancelled)
+			return outfiles
+		
+		errors = []
+		
+		def run(outFormat, name):
+			try:
+				self._write(outFormat, name, data, progress, cancelled)
+			except Exception:
+				errors.append(sys.exc_info())
+		
+		threads = [threading.Thread(target=run, args=job) for job in jobs]
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+		
+		if errors:
+			raise errors[0][0], errors[0][1], errors[0][2]
+		
+		return outfiles
+	
+	def _prepare(self, progress=None):
+		"""
+		_prepare(progress=None)
+		
+		Parses the .chan and .obj files and reduces the keys, if they
+		haven't been already, reporting the 'parse' stage to progress.
+		"""
+		stats = self.__stats
+		
+		steps = (('parse.chan', self.__chanFile.getColumns), 
+				 ('parse.obj', self.getObjPoints), 
+				 ('parse.reduce', self.getKeyIndices))
+		
+		for i, (name, step) in enumerate(steps):
+			if progress:
+				progress('parse', float(i) / len(steps))
+			with stats.span(name):
+				step()
+		
+		if progress:
+			progress('parse', 1.0)
+		
+		if stats:
+			chanFile = self.__chanFile.getFileName()
+			channels = self.__chanFile.getType() == 'camera' and 7 or 6
+			stats.count('parse.chan', bytes=path.getsize(chanFile), 
+						keys=self.__chanFile.totalFrames() * channels)
+			
+			if self.__objFile:
+				# the points read, before any filters
+				pointStats = self.getPointStats()
+				points = pointStats and pointStats[0][1] or len(self.getObjPoints()) // 3
+				stats.count('parse.obj', bytes=path.getsize(self.__objFile), points=points)
+			
+			keyIndices = self.getKeyIndices()
+			if keyIndices is not None:
+				stats.count('parse.reduce', keys=sum(len(indices) for indices in keyIndices.itervalues()))
+	
+	def _iterCancel(self, chunks, checkCancel):
+		""" Yields the rendered chunks, calling checkCancel() before each """
+		for chunk in chunks:
+			checkCancel()
+			yield chunk
+	
+	def _iterProgress(self, chunks, progress, total):
+		""" Yields the rendered chunks, reporting the 'write' stage out of about total chunks """
+		for i, chunk in enumerate(chunks):
+			if not i % self.PROGRESS_CHUNKS:
+				# total is an estimate, so 1.0 is left for the end of the write
+				progress('write', min(float(i) / total, 0.99))
+			yield chunk
+	
+	def _getChunkCount(self, binary=False):
+		"""
+		_getChunkCount(bool binary=False) -> int
+		
+		Returns about how many chunks iterFbx(), or iterFbxBinary(), 
+		yields. Each point cloud object is a chunk in the Objects and
+		one or two in the Connections, and each ascii key is a line.
+		"""
+		# the header, settings, takes and footer chunks
+		count = 50
+		objects = len(self._objToFbxData())
+		
+		if binary:
+			return count + 3 * objects
+		
+		keyIndices = self.getKeyIndices()
+		if keyIndices is None:
+			channels = self.__chanFile.getType() == 'camera' and 7 or 6
+			keys = len(self.getKeyTimes()) * channels
+		else:
+			keys = sum(len(indices) for indices in keyIndices.itervalues())
+		
+		return count + 2 * objects + keys
+	
+	def _getData(self):
+		"""
+		_getData() -> dict
+		
+		Returns the values shared by all output templates. Missing keys
+		default to an empty string.
+		"""
+		
+		# setup
+		keyData = self.__chanFile.getKeyData()
+
+		now = datetime.now()		
+		start, finish = self.__chanFile.getFrameRange()
+		width, height = (self.__width, self.__height)
+		
+		# nulls have no lens
+		fov = filmWidth = filmHeight = focalLength = 0
+		if self.__chanFile.getType() == 'camera':
+			filmWidth, filmHeight = (self.__filmWidth, self.__filmHeight)
+			fov = keyData[start]['fov']
+			focalLength = self.getFovToFocalLength(filmHeight, fov)
+						
+		data = dict( date_timestamp = now.strftime('%Y-%m-%d %H:%M:%S:000'),
+					 date_ctime	 = now.ctime(),
+					 date_year		= now.year,
+					 date_month		= now.month,
+					 date_day		= now.day,
+					 date_hour		= now.hour,
+					 date_minute	= now.minute,
+					 date_second	= now.second,
+					 aspect			= float(width) / height,
+					 fps			= self.__fps,
+					 width		  = width,
+					 height		 = height,
+					 start		  = start,
+					 finish		 = finish,
+					 
+					filmWidth	= filmWidth,
+					filmHeight	= filmHeight,
+					fov			= fov,
+					focalLength	= focalLength,
+					 )
+
+		data['totalObjCount'] = 2
+		data['totalModelCount'] = 1
+		
+		
+		safeData = defaultdict(str)
+		safeData.update(data)
+		
+		return safeData
+	
+	def _write(self, outFormat, outfile, data, progress=None, cancelled=None):
+		"""
+		_write(str outFormat, str outfile, dict data, progress=None, cancelled=None) -> void
+		
+		Renders a single output format with a copy of the 
+		given template data, and streams it to outfile.
+		"""
+		stats = self.__stats
+		renderStart = time.time()
+		
+		# the writers check for a cancel as they go, for each frame or object
+		checkCancel = None
+		if cancelled:
+			def checkCancel():
+				if cancelled():
+					raise ConvertCancelled()
+		
+		if progress:
+			progress('render', 0.0)
+
+		if outFormat not in ('fbx', 'fbxbin') and self.__chanFile.getType() != 'camera':
+			raise Exception("Non-camera .chan files are only supported by the FBX output format.")
+		
+		data = data.copy()
+		start, finish = data['start'], data['finish']
+		
+		binary = False
+		chunkCount = 1
+			
+		#
+		# action
+		#
+		if outFormat == 'action':
+			converter = chan2action.ChanToAction(self.__chanFile, 
+												 objfile = self.__objFile,
+												 points = self.getObjPoints(),
+												 keyIndices = self.getKeyIndices(),
+												 groupSize = self.__pointGroup,
+												 checkCancel = checkCancel,
+												 **data)
+			rendered = [converter.convert()]
+	
+	
+		#
+		# terragen
+		#
+		elif outFormat == 'terragen':
+			# terragen interpolates its keys smoothly, so they are never reduced
+			converter = chan2terragen.ChanToTerragen(self.__chanFile, data, scale=self.__scaleValue,
+													 checkCancel=checkCancel)
+			rendered = [converter.convert()]
+	
+	
+		#
+		# fbx, ascii or binary
+		#
+		else:
+
+			# format
+			data.update( dict( fbxTime_start  = self.getFbxTime(start, self.__fps),
+							   fbxTime_end	  = self.getFbxTime(finish, self.__fps),
+							) )
+
+			if self.__chanFile.getType() == 'camera':
+				
+				data.update( dict(
+								filmWidth	= data['filmWidth'] / 25.4,
+								filmHeight	= data['filmHeight'] / 25.4,
+								rotationOrder = 4, #ZXY, nuke default
+								) )		
+						
+			if outFormat == 'fbxbin':
+				rendered = self.iterFbxBinary(data)
+				binary = True
+			else:
+				rendered = self.iterFbx(data)
+			
+			if progress:
+				chunkCount = self._getChunkCount(binary)
+			
+			if checkCancel:
+				rendered = self._iterCancel(rendered, checkCancel)
+		
+		# the fbx formats render as they are written
+		if progress:
+			progress('render', 1.0)
+			rendered = self._iterProgress(rendered, progress, chunkCount)
+		
+		# render time goes on while writing, so it is split out of the write time
+		if stats:
+			renderTime = time.time() - renderStart
+			rendered = timed = stats.iterSpan(None, rendered)
+			writeStart = time.time()
+		
+		# rendered output is an iterable of chunks, streamed through the file buffer.
+		# It is written aside and renamed into place, so a failed or cancelled
+		# render never leaves a truncated file behind that looks like a good one
+		temp = '%s.%d.%d.tmp' % (outfile, os.getpid(), threading.currentThread().ident)
+		try:
+			fh = open(temp, binary and 'wb' or 'w', self.WRITE_BUFFER_SIZE)
+			try:
+				if binary:
+					fbx_binary.writeChunks(fh, rendered)
+				else:
+					fh.writelines(rendered)
+					fh.write('\n')
+			finally:
+				fh.close()
+			
+			if path.exists(outfile):
+				os.remove(outfile)
+			os.rename(temp, outfile)
+			
+		except:
+			if path.exists(temp):
+				try:
+					os.remove(temp)
+				except OSError:
+					pass
+			raise
+		
+		if stats:
+			writeTime = time.time() - writeStart - timed.seconds
+			stats.add('render.%s' % outFormat, renderTime + timed.seconds)
+			stats.add('write.%s' % outFormat, writeTime, bytes=path.getsize(outfile))
+		
+		if progress:
+			progress('write', 1.0)
+
+
+	def _getOutFile(self, infile, ext='fbx', exclude=()):
+		"""
+		_getOutFile(str infile, str ext='fbx', list exclude=()) -> str
+		
+		Returns infile with the given extension, numbered to avoid 
+		existing files and any names in exclude.
+		"""
+		outfile = '%s.%s' % (path.splitext(infile)[0], ext)
+		
+		if path.isfile(outfile) or outfile in exclude:
+			base, ext = path.splitext(outfile)
+			i = 1
+			newFile = '%s_%s%s' % (base, i, ext)
+			
+			while path.isfile(newFile) or newFile in exclude:
+				i += 1
+				newFile = '%s_%s%s' % (base, i, ext)
+			
+			outfile = newFile
+	
+		return outfile
+
+
+	def _objToFbxData(self):
+		"""
+		_objToFbxData() -> PointCloudFbxData
+		
+		Returns the point cloud from the .obj file as FBX object data,
+		or an empty list if there is no .obj file. The per-point null
+		or mesh models are only rendered as the result is iterated.
+		"""
+		if not self.__objFile:
+			return []
+		
+		meshSize = 0
+		if self.__pointCloud == 'mesh':
+			meshSize = self.POINTS_PER_MESH
+		
+		return PointCloudFbxData(self.getObjPoints(), scale=self.__scaleValue, meshSize=meshSize, 
+								 groupSize=self.__pointGroup)
+	
+	
+	def _filterPoints(self, points):
+		"""
+		_filterPoints(array points) -> array
+		
+		Runs the point cloud filters the converter was created with,
+		recording the point counts for getPointStats(). Outliers are
+		removed first, against the density of the whole cloud, and 
+		points are culled before they are decimated, so that each kept
+		point is one the camera sees. Points that will be grouped are 
+		sorted in Morton order last.
+		"""
+		if not len(points):
+			return points
+		
+		stages = []
+		if self.__pointOutliers:
+			stages.append(('outlier', pointcloud.removeOutliers, 
+						   pointcloud.getOutlierSettings(self.__pointOutliers)))
+		if self.__pointCull:
+			if self.__chanFile.getType() != 'camera':
+				raise ValueError("Culling points needs a camera .chan file: %s" % self.__chanFile.getFileName())
+			stages.append(('cull', pointcloud.frustumCull, (self.__chanFile.getColumns(), self.__filmWidth, 
+															 self.__filmHeight, self.__pointCull)))
+		if self.__pointVoxel:
+			stages.append(('voxel', pointcloud.voxelDecimate, (self.__pointVoxel,)))
+		
+		for name, stage, args in stages:
+			before = len(points) // 3
+			with self.__stats.span('points.%s' % name):
+				points = stage(points, *args)
+			
+			self.__pointStats.append((name, before, len(points) // 3))
+			self.__stats.count('points.%s' % name, points=len(points) // 3)
+		
+		if self.__pointGroup:
+			with self.__stats.span('points.order'):
+				points = pointcloud.mortonOrder(points)
+		
+		return points
+	
+	def _readCachedObjPoints(self):
+		"""
+		_readCachedObjPoints() -> array
+		
+		As readObjPoints(), going through the parse cache.
+		"""
+		key = self.__cache.getKey(self.__objFile)
+		
+		cached = self.__cache.load(key)
+		if cached and cached[0] == 'obj' and len(cached[1]) == 1:
+			points = cached[1][0]
+			if not isinstance(points, array):
+				# the writers format points with str(), which differs for numpy floats.
+				# The buffer is copied as is, rather than through a list of floats
+				points = array('d', numpy.ascontiguousarray(points, dtype=numpy.float64).tostring())
+			return points
+		
+		points = readObjPoints(self.__objFile)
+		self.__cache.store(key, 'obj', [points])
+		
+		return points
+
+		
+			
+	@classmethod
+	def getFormatName(cls, outFormat):
+		"""
+		getFormatName(str outFormat) -> str
+		
+		Returns the name of an output format, as used by the format
+		option and EXTENSIONS, from a name or alias in any case.
+		"""
+		outFormat = outFormat.strip().lower()
+		return cls.FORMAT_ALIASES.get(outFormat, outFormat)
+	
+	@staticmethod
+	def getFbxTime(t, fps):
+		""" 
+		getFbxTime(float t, int fps) -> int 
+		
+		Gets the FBX time from a given frame and fps,
+		per FBX SDK specifications
+		
+			float t - frame time
+			int fps - frames per second
+		"""
+		frame = float(t)
+		val = int(0.5 + ((frame/fps) * 46186158000))
+		return val
+	
+	@staticmethod
+	def getFovToFocalLength(aperature, fov):
+		"""
+		getFovToFocalLength(float aperature, float fov) -> float
+		
+		Given an aperature in millimeters, and a field of view in degress,
+		returns the focal length in millimeters
+		
+			float aperature - film aperature in millimeters
+			float fov	   - field of view in degrees
+		"""
+		focalLength = aperature / (2 * tan( radians(fov / 2) ) )
+		return focalLength
+	
+	@staticmethod
+	def getFbxTimes(frames, fps):
+		"""
+		getFbxTimes(frames, int fps) -> list
+		
+		Array version of getFbxTime(). Returns the FBX time of each of 
+		the frames, identical to calling getFbxTime() on each, in one
+		pass when numpy is available.
+		"""
+		if numpy is not None:
+			times = numpy.asarray(frames, dtype=numpy.float64) / fps * 46186158000 + 0.5
+			# int64 truncates toward zero like int(), within its range
+			if numpy.isfinite(times).all() and (len(times) == 0 or abs(times).max() < 2.0 ** 62):
+				return times.astype(numpy.int64).tolist()
+		
+		return [ChanConvert.getFbxTime(t, fps) for t in frames]
+	
+	@staticmethod
+	def getFovsToFocalLengths(aperature, fovs):
+		"""
+		getFovsToFocalLengths(float aperature, fovs) -> list
+		
+		Array version of getFovToFocalLength(). Returns the focal length
+		of each of the fovs, identical to calling getFovToFocalLength() 
+		on each.
+		"""
+		# a vectorised tan isn't sure to round as math.tan does, and 
+		# one tan per frame is cheap next to writing the frame
+		return [aperature / (2 * tan(radians(fov / 2))) for fov in fovs]
+	
+	
+class PointCloudFbxData(object):
+	"""
+	Re-iterable FBX object data for a point cloud, in the form expected by
+	fbx_template.getTemplate() and fbx_template.iterTemplate(): 
+	a 'PointCloud' null parented to the scene, followed by one 
+	'locatorN' null per point parented to it.
+	
+	With a meshSize, the points are instead packed into the vertices of
+	'pointMeshN' meshes of up to meshSize points each, parented to the
+	'PointCloud' null. This is far smaller, and faster to load, than a
+	null per point.
+	
+	With a groupSize, the locators or meshes are parented to a balanced
+	tree of 'pointGroupN' nulls under the 'PointCloud' null instead, of 
+	at most groupSize children each, so that no one parent holds them 
+	all. See pointcloud.groupHierarchy()
+	
+	The models are rendered from fbx_template.nullType() and meshType() 
+	one at a time, each time the object is iterated, rather than held in memory.
+	"""
+	
+	def __init__(self, points, scale=1.0, meshSize=0, groupSize=0):
+		""" 
+		__init__(array points, float scale=1.0, int meshSize=0, int groupSize=0)
+		
+			array points - flat sequence of x, y, z point positions
+			float scale - scales the point positions by given amount
+			int meshSize - if not 0, write meshes of up to this many points
+						   instead of a locator per point
+			int groupSize - if not 0, group the locators or meshes into 
+							a tree of nulls of up to this many children
+		"""
+		self.__points = points
+		self.__scale = scale
+		self.__meshSize = meshSize
+		self.__groupSize = groupSize
+	
+	def __len__(self):
+		return self._getChildCount() + len(self._getGroups()[0]) + 1
+	
+	def _getChildCount(self):
+		""" Returns the number of locators or meshes parented to the cloud """
+		numPoints = len(self.__points) // 3
+		if self.__meshSize:
+			return -(-numPoints // self.__meshSize)
+		return numPoints
+	
+	def _getGroups(self):
+		""" Returns the pointcloud.groupHierarchy() of the locators or meshes """
+		if not self.__groupSize:
+			return [], 0
+		return pointcloud.groupHierarchy(self._getChildCount(), self.__groupSize)
+	
+	def __iter__(self):
+		template = fbx_template.nullType()
+
+		vals = {'name' : 'PointCloud', 'x' : 0, 'y' : 0, 'z' : 0}
+		nullString = template % vals
+		yield {'name' : 'PointCloud', 'parent' : 'Scene', 'data' : nullString}
+		
+		groups, first = self._getGroups()
+		for n, parent in enumerate(groups):
+			name = 'pointGroup%d' % (n+1)
+			vals = {'name' : name, 'x' : 0, 'y' : 0, 'z' : 0}
+			parent = parent is None and 'PointCloud' or 'pointGroup%d' % (parent+1)
+			yield {'name' : name, 'parent' : parent, 'data' : template % vals}
+		
+		count = self._getChildCount()
+		def getParent(i):
+			if not groups:
+				return 'PointCloud'
+			return 'pointGroup%d' % (first + i * (len(groups) - first) // count + 1)
+		
+		points = self.__points
+		scale = self.__scale
+		
+		if self.__meshSize:
+			template = fbx_template.meshType()
+			size = self.__meshSize * 3
+			end = len(points) - len(points) % 3
+			
+			for n, i in enumerate(xrange(0, end, size)):
+				name = 'pointMesh%d' % (n+1)
+				chunk = points[i:min(i + size, end)]
+				vals = {'name' : name, 
+						'vertices' : ','.join(['%s' % (val * scale) for val in chunk])}
+				yield {'name' : name, 'parent' : getParent(n), 'data' : template % vals}
+			return
+		
+		for i in xrange(len(points) // 3):
+			name = 'locator%d' % (i+1)
+			vals = {'name' : name, 
+					'x' : points[i*3] * scale, 
+					'y' : points[i*3+1] * scale, 
+					'z' : points[i*3+2] * scale}
+			nullString = template % vals
+			yield {'name' : name, 'parent' : getParent(i), 'data' : nullString}
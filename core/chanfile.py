@@ -0,0 +1,435 @@
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+Written by: Justin Israel
+			justinisrael@gmail.com
+			justinfx.com
+
+"""
+
+import re, warnings, threading
+from os import path
+from array import array
+from bisect import bisect_left
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+############################################################# 
+#############################################################
+######## ChanFile
+############################################################# 
+############################################################# 
+class ChanFile(object):
+	"""
+	Class represnting a .chan file.
+	Can parse file into usable data.
+	
+	Supports two 'types' of detected chan files: null or camera
+	A null only has Transform XYZ and Rotate XYZ, while a 
+	camera has a 7th column for FOV.
+	
+	Parsed keys are stored column-wise, as one contiguous array
+	per channel (see COLUMNS), sorted by frame. When numpy is
+	available the columns are numpy arrays, otherwise they are
+	array.array instances.
+	"""
+	
+	COLUMNS = ('frame', 'tx', 'ty', 'tz', 'rx', 'ry', 'rz', 'fov')
+	
+	def __init__(self, chanFile, cache=None):
+		""" 
+		__init__(str chanFile, ParseCache cache=None)
+		
+			str chanFile - path to .chan file
+			ParseCache cache - optional on-disk cache of parsed columns
+		"""
+		self.__chanFile = chanFile
+		self.__cache = cache
+		
+		self.__columns	  = None
+		self.__keyData	  = None
+		self.__frameRange = None
+		self.__totalKeys  = None
+		self.__parseLock  = threading.Lock()
+		
+		self.type = ""
+		
+		if not path.isfile(chanFile):
+			raise IOError("Given .chan file does not exist: %s" % chanFile)
+		
+	def getFileName(self):
+		""" Return the name of .chan file """
+		return self.__chanFile
+	
+	def getFrameRange(self):
+		""" Return the frame range parsed from file as (int start, int end) """
+		if self.__frameRange == None:
+			self._parseOnce()
+			
+		return self.__frameRange
+	
+	def getColumns(self):
+		""" 
+		getColumns() -> dict
+		
+		Return the parsed keys as a dictionary of channel name -> array,
+		one entry per name in COLUMNS. All arrays have the same length
+		and are sorted by frame.
+		"""
+		if self.__columns is None:
+			self._parseOnce()
+		
+		return self.__columns
+	
+	def getColumn(self, name):
+		""" Return the parsed array for a single channel name (ie. 'tx') """
+		return self.getColumns()[name]
+	
+	def getKeyData(self, redundant=True):
+		""" 
+		Return the keys parsed from file as a structured dictionary
+		
+		This is a lazy, read-only view over the parsed columns,
+		mapping int frame -> dict of channel values.
+		"""
+		if self.__keyData is None:
+			self.__keyData = ChanKeyData(self.getColumns(), self.getType())
+			
+		return self.__keyData
+
+	def getType(self):
+		""" Get the type of chan file data. Can either be 'null' or 'camera' """
+		if not self.type:
+			self._parseOnce()
+		
+		return self.type
+	
+	def _parseOnce(self):
+		""" 
+		Parses the chan file if it hasn't been already. Threads sharing 
+		the ChanFile wait for a single parse, rather than each parsing it.
+		"""
+		with self.__parseLock:
+			if self.__columns is None:
+				self.parse()
+	
+	def parse(self):
+		""" 
+		Parses the chan file. Run automatically if needed by other methods 
+		
+		The whole file is read at once and converted to numeric columns
+		in a single bulk pass (numpy.fromstring when numpy is available,
+		otherwise str.split and array.array). The column schema is
+		detected once, from the first row. Raises ValueError naming the
+		line number of the first malformed row.
+		
+		With a ParseCache, previously parsed columns are loaded from
+		the cache instead, and fresh parses are stored in it.
+		"""
+		try:
+			fh = open(self.__chanFile, 'rb')
+			data = fh.read()
+			fh.close()
+		except:
+			raise IOError("Failed to read .chan file: %s" % self.__chanFile)
+		
+		cacheKey = None
+		if self.__cache is not None:
+			cacheKey = self.__cache.getKey(self.__chanFile, data)
+			if self._loadCached(cacheKey):
+				return
+		
+		numColumns = 0
+		firstRow = re.search(r'\S[^\n]*', data)
+		if firstRow:
+			numColumns = len(firstRow.group().split())
+		
+		if numColumns == 7:
+			self.type = 'null'
+		elif numColumns == 8:
+			self.type = 'camera'
+		elif numColumns:
+			self._raiseMalformed(data, 8)
+		
+		if not numColumns:
+			frames, values = array('l'), [array('d') for name in self.COLUMNS[1:]]
+		elif numpy is not None:
+			frames, values = self._parseNumpy(data, numColumns)
+		else:
+			frames, values = self._parsePython(data, numColumns)
+		
+		self._setColumns(frames, values)
+		
+		if cacheKey and numColumns:
+			self.__cache.store(cacheKey, self.type, [self.__columns[n] for n in self.COLUMNS])
+	
+	def _loadCached(self, cacheKey):
+		"""
+		_loadCached(str cacheKey) -> bool
+		
+		Sets the columns from a cache entry, returning False on a miss.
+		"""
+		cached = self.__cache.load(cacheKey)
+		if not cached:
+			return False
+		
+		chanType, columns = cached
+		if chanType not in ('null', 'camera') or len(columns) != len(self.COLUMNS):
+			return False
+		
+		if numpy is not None and isinstance(columns[0], numpy.ndarray):
+			frames = columns[0].astype('l')
+		else:
+			frames = array('l', [int(f) for f in columns[0]])
+		
+		self.type = chanType
+		self._setColumns(frames, columns[1:])
+		return True
+	
+	def _parseNumpy(self, data, numColumns):
+		"""
+		_parseNumpy(str data, int numColumns) -> (array frames, list values)
+		
+		Bulk converts the file contents to numpy columns.
+		"""
+		with warnings.catch_warnings():
+			# numpy warns, and stops, when it hits text it can't convert
+			warnings.simplefilter('ignore')
+			flat = numpy.fromstring(data, dtype=numpy.float64, sep=' ')
+		
+		if flat.size % numColumns:
+			self._raiseMalformed(data, numColumns)
+		
+		table = flat.reshape(-1, numColumns)
+		
+		# a short read leaves the last row of the table out of step
+		# with the last row of the file
+		if table.size and list(table[-1]) != self._lastRow(data):
+			self._raiseMalformed(data, numColumns)
+		
+		frames = table[:, 0].astype('l')
+		if (frames != table[:, 0]).any():
+			self._raiseMalformed(data, numColumns)
+		
+		values = [table[:, i].copy() for i in xrange(1, numColumns)]
+		if numColumns == 7:
+			values.append(numpy.zeros(len(frames)))
+		
+		return frames, values
+	
+	def _parsePython(self, data, numColumns):
+		"""
+		_parsePython(str data, int numColumns) -> (array frames, list values)
+		
+		Bulk converts the file contents to array.array columns,
+		for when numpy is not available.
+		"""
+		tokens = data.split()
+		if len(tokens) % numColumns:
+			self._raiseMalformed(data, numColumns)
+		
+		try:
+			flat = array('d', map(float, tokens))
+		except ValueError:
+			self._raiseMalformed(data, numColumns)
+		del tokens
+		
+		frames = array('l', [int(f) for f in flat[0::numColumns]])
+		if frames.tolist() != flat[0::numColumns].tolist():
+			self._raiseMalformed(data, numColumns)
+			
+		values = [flat[i::numColumns] for i in xrange(1, numColumns)]
+		if numColumns == 7:
+			values.append(array('d', [0.0]) * len(frames))
+		
+		return frames, values
+	
+	def _lastRow(self, data):
+		""" 
+		Returns the values of the last non-empty line of data as floats,
+		or None if they can't be converted
+		"""
+		end = len(data)
+		while end and data[end-1].isspace():
+			end -= 1
+		start = data.rfind('\n', 0, end) + 1
+		
+		try:
+			return [float(v) for v in data[start:end].split()]
+		except ValueError:
+			return None
+	
+	def _raiseMalformed(self, data, numColumns):
+		"""
+		_raiseMalformed(str data, int numColumns) -> void
+		
+		Walks the file line by line to find the first row that does not
+		fit the detected schema, and raises a ValueError naming it.
+		Only used once the bulk parse has already failed.
+		"""
+		for lineNum, line in enumerate(data.splitlines()):
+			columns = line.split()
+			if not columns:
+				continue
+			
+			try:
+				if len(columns) != numColumns:
+					raise ValueError("expected %d columns, found %d" % (numColumns, len(columns)))
+				int(columns[0])
+				map(float, columns[1:])
+			except ValueError, e:
+				raise ValueError("Malformed row at line %d of %s: %s" % (lineNum+1, self.__chanFile, e))
+		
+		raise ValueError("Malformed .chan file: %s" % self.__chanFile)
+	
+	def _setColumns(self, frames, values):
+		"""
+		_setColumns(array frames, list values) -> void
+		
+		Store freshly parsed columns, sorting them by frame if needed. 
+		Repeated frames keep the last parsed value, as a dict would.
+		"""
+		if numpy is not None and isinstance(frames, numpy.ndarray):
+			if len(frames) > 1 and not (frames[1:] > frames[:-1]).all():
+				# unique() keeps the first occurrence, so search the reversed frames
+				reverse = frames[::-1]
+				unique, index = numpy.unique(reverse, return_index=True)
+				order = len(frames) - 1 - index
+				frames = unique
+				values = [v[order] for v in values]
+		else:
+			ordered = True
+			for i in xrange(1, len(frames)):
+				if frames[i] <= frames[i-1]:
+					ordered = False
+					break
+			
+			if not ordered:
+				lastIndex = dict((f, i) for i, f in enumerate(frames))
+				order = [lastIndex[f] for f in sorted(lastIndex)]
+				frames = array(frames.typecode, [frames[i] for i in order])
+				values = [array(v.typecode, [v[i] for i in order]) for v in values]
+		
+		self.__keyData = None
+		self.__totalKeys = len(frames)
+		
+		if self.__totalKeys:
+			self.__frameRange = (int(frames[0]), int(frames[-1]))
+		
+		# set last, as other threads take the columns to mean parsing is done
+		self.__columns = dict(zip(self.COLUMNS, [frames] + values))
+
+		
+	def totalFrames(self):
+		""" Return the total number of frames parsed from chan file as int """
+		if not self.__totalKeys:
+			self._parseOnce()
+			
+		return self.__totalKeys
+
+
+class ChanKeyData(object):
+	"""
+	Read-only compatibility view over the columns of a ChanFile.
+	
+	Behaves like the old { int frame : { str channel : float value } }
+	dictionary, but each per-frame dictionary is only built when
+	it is looked up.
+	"""
+	
+	def __init__(self, columns, chanType='camera'):
+		""" 
+		__init__(dict columns, str chanType='camera')
+		
+			dict columns - channel name -> array, as from ChanFile.getColumns()
+			str chanType - 'null' or 'camera'. Nulls have no 'fov' channel
+		"""
+		self.__columns = columns
+		self.__frames  = columns['frame']
+		
+		names = [n for n in ChanFile.COLUMNS if n != 'frame']
+		if chanType != 'camera':
+			names.remove('fov')
+		self.__names = names
+	
+	def __len__(self):
+		return len(self.__frames)
+	
+	def __iter__(self):
+		return self.iterkeys()
+	
+	def __contains__(self, frame):
+		return self._index(frame) is not None
+	
+	def __getitem__(self, frame):
+		i = self._index(frame)
+		if i is None:
+			raise KeyError(frame)
+		
+		row = dict(frame = int(self.__frames[i]))
+		for name in self.__names:
+			row[name] = float(self.__columns[name][i])
+			
+		return row
+	
+	def get(self, frame, default=None):
+		if frame in self:
+			return self[frame]
+		return default
+	
+	def iterkeys(self):
+		for frame in self.__frames:
+			yield int(frame)
+	
+	def keys(self):
+		return list(self.iterkeys())
+	
+	def itervalues(self):
+		for frame in self.iterkeys():
+			yield self[frame]
+	
+	def values(self):
+		return list(self.itervalues())
+	
+	def iteritems(self):
+		for frame in self.iterkeys():
+			yield frame, self[frame]
+	
+	def items(self):
+		return list(self.iteritems())
+	
+	def _index(self, frame):
+		""" Returns the row index of a frame, or None if it does not exist """
+		frames = self.__frames
+		total = len(frames)
+		if not total:
+			return None
+		
+		# chan files are almost always contiguous, so try the direct offset first
+		i = int(frame) - int(frames[0])
+		if 0 <= i < total and frames[i] == frame:
+			return i
+		
+		i = bisect_left(frames, frame)
+		if i < total and frames[i] == frame:
+			return i
+		
+		return None
@@ -0,0 +1,238 @@
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+Written by: Justin Israel
+			justinisrael@gmail.com
+			justinfx.com
+
+Keyframe reduction of parsed .chan channels.
+
+Nuke solves a key on every frame. Reduced channels are written with
+linear interpolation, so any key that lies within a tolerance of the
+line between the keys around it can be dropped. Each channel is 
+reduced on its own, with the Ramer-Douglas-Peucker algorithm, and 
+channels that never move more than the tolerance collapse to a
+single key.
+
+Kept keys are always original samples, so a reduction is just the 
+list of key indices to write for each channel.
+"""
+
+from math import pi, sin, radians
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+# default tolerances, in .chan units: translate, degrees, degrees of fov
+DEFAULT_TOLERANCES = {'tx' : 0.001, 'ty' : 0.001, 'tz' : 0.001, 
+					  'rx' : 0.01, 'ry' : 0.01, 'rz' : 0.01, 
+					  'fov' : 0.001}
+
+CHANNELS = ('tx', 'ty', 'tz', 'rx', 'ry', 'rz', 'fov')
+
+
+def getTolerances(tolerance):
+	"""
+	getTolerances(tolerance) -> dict
+	
+	Returns a tolerance for each channel from one of:
+		float - the same tolerance for every channel
+		str - comma separated 'translate[,rotate[,fov]]' tolerances,
+			  or True for DEFAULT_TOLERANCES
+		dict - channel name -> tolerance. Missing channels use the defaults
+	"""
+	if tolerance is True:
+		return DEFAULT_TOLERANCES.copy()
+	
+	if isinstance(tolerance, dict):
+		tolerances = DEFAULT_TOLERANCES.copy()
+		tolerances.update(tolerance)
+		return tolerances
+	
+	if isinstance(tolerance, basestring):
+		values = [float(v) for v in tolerance.split(',') if v.strip()]
+		if not 0 < len(values) <= 3:
+			raise ValueError("Expected 1 to 3 comma separated tolerances, got %r" % tolerance)
+		
+		# later groups default to the last tolerance given
+		values += values[-1:] * (3 - len(values))
+		translate, rotate, fov = values
+		return {'tx' : translate, 'ty' : translate, 'tz' : translate,
+				'rx' : rotate, 'ry' : rotate, 'rz' : rotate,
+				'fov' : fov}
+	
+	tolerance = float(tolerance)
+	return dict((name, tolerance) for name in CHANNELS)
+
+
+def getFocalLengthTolerance(aperature, fovs, tolerance):
+	"""
+	getFocalLengthTolerance(float aperature, fovs, float tolerance) -> float
+	
+	Returns the tolerance, in millimeters, of the focal lengths of 
+	the fovs, so that the fov of a focal length within it stays within 
+	tolerance degrees. A degree of fov is the fewest millimeters at 
+	the widest fov, where the tolerance is measured. Returns None
+	without a tolerance.
+	"""
+	if tolerance is None or tolerance < 0 or not len(fovs):
+		return None
+	
+	# focal length = aperature / (2 * tan(fov / 2)), and its slope 
+	# per degree of fov is aperature * pi / (720 * sin(fov / 2) ** 2)
+	widest = max([sin(radians(abs(fov) / 2)) ** 2 for fov in fovs])
+	return tolerance * aperature * pi / (720 * widest)
+
+
+def simplify(frames, values, tolerance):
+	"""
+	simplify(frames, values, float tolerance) -> list
+	
+	Returns the indices of the keys to keep, so that linear
+	interpolation between them stays within tolerance of every 
+	original value. A channel whose values all lie within tolerance
+	of the first key collapses to that single key.
+	"""
+	count = len(values)
+	if count < 3:
+		return range(count)
+	
+	if numpy is not None:
+		frames = numpy.asarray(frames, dtype=numpy.float64)
+		values = numpy.asarray(values, dtype=numpy.float64)
+		first = values[0]
+		if abs(values - first).max() <= tolerance:
+			return [0]
+		deviation = _segmentDeviationNumpy
+	else:
+		frames = [float(f) for f in frames]
+		values = [float(v) for v in values]
+		first = values[0]
+		if max([abs(v - first) for v in values]) <= tolerance:
+			return [0]
+		deviation = _segmentDeviation
+	
+	keep = [0, count - 1]
+	
+	# iterative, so long shots can't hit the recursion limit
+	stack = [(0, count - 1)]
+	while stack:
+		start, end = stack.pop()
+		if end - start < 2:
+			continue
+		
+		index, error = deviation(frames, values, start, end)
+		if error > tolerance:
+			keep.append(index)
+			stack.append((start, index))
+			stack.append((index, end))
+	
+	keep.sort()
+	return keep
+
+
+def maxError(frames, values, indices):
+	"""
+	maxError(frames, values, list indices) -> float
+	
+	Returns the largest difference between the original values and 
+	the keys at indices, interpolated linearly, with constant
+	extrapolation past the last key.
+	"""
+	if not len(indices):
+		return 0.0
+	
+	if numpy is not None:
+		frames = numpy.asarray(frames, dtype=numpy.float64)
+		values = numpy.asarray(values, dtype=numpy.float64)
+		indices = numpy.asarray(indices)
+		curve = numpy.interp(frames, frames[indices], values[indices])
+		return float(abs(curve - values).max())
+	
+	error = 0.0
+	for n in xrange(len(indices)):
+		start = indices[n]
+		if n + 1 < len(indices):
+			end = indices[n+1]
+		else:
+			end = start
+			for i in xrange(start, len(values)):
+				error = max(error, abs(values[i] - values[start]))
+			continue
+		
+		f0, f1 = float(frames[start]), float(frames[end])
+		v0, v1 = float(values[start]), float(values[end])
+		for i in xrange(start + 1, end):
+			line = v0 + (v1 - v0) * (frames[i] - f0) / (f1 - f0)
+			error = max(error, abs(values[i] - line))
+	
+	return error
+
+
+def reduceKeys(columns, tolerances, channels=CHANNELS):
+	"""
+	reduceKeys(dict columns, dict tolerances, channels=CHANNELS) -> dict
+	
+	Reduces each of the given channels of a ChanFile.getColumns() 
+	dictionary, returning channel name -> (list indices, float maxError).
+	Channels without a tolerance keep every key.
+	"""
+	frames = columns['frame']
+	
+	result = {}
+	for name in channels:
+		values = columns[name]
+		tolerance = tolerances.get(name)
+		if tolerance is None or tolerance < 0:
+			result[name] = (range(len(values)), 0.0)
+			continue
+		
+		indices = simplify(frames, values, tolerance)
+		result[name] = (indices, maxError(frames, values, indices))
+	
+	return result
+
+
+def _segmentDeviation(frames, values, start, end):
+	""" Returns (index, error) of the key furthest from the line start -> end """
+	f0, f1 = frames[start], frames[end]
+	v0, v1 = values[start], values[end]
+	slope = (v1 - v0) / (f1 - f0)
+	
+	index, error = start, -1.0
+	for i in xrange(start + 1, end):
+		e = abs(values[i] - (v0 + slope * (frames[i] - f0)))
+		if e > error:
+			index, error = i, e
+	
+	return index, error
+
+
+def _segmentDeviationNumpy(frames, values, start, end):
+	""" numpy version of _segmentDeviation() """
+	f0, f1 = frames[start], frames[end]
+	v0, v1 = values[start], values[end]
+	
+	inner = slice(start + 1, end)
+	line = v0 + (v1 - v0) / (f1 - f0) * (frames[inner] - f0)
+	errors = abs(values[inner] - line)
+	i = int(errors.argmax())
+	
+	return start + 1 + i, float(errors[i])
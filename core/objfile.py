@@ -0,0 +1,207 @@
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+Written by: Justin Israel
+			justinisrael@gmail.com
+			justinfx.com
+
+"""
+
+import re, mmap, warnings
+from array import array
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+# first line of every .obj file exported by Nuke
+NUKE_HEADER = '## OBJ file generated by Nuke ##\n'
+
+# the end of a run of vertex lines
+_RUN_END = re.compile(r'\n(?!v )')
+
+if numpy is not None:
+	# the bytes str.split() splits on
+	_SPACE = numpy.zeros(256, dtype=bool)
+	_SPACE[[ord(c) for c in ' \t\n\r\x0b\x0c']] = True
+	
+	# the bytes of vertex lines numpy converts just as float() does. 
+	# nan, inf and anything else are left to float()
+	_PLAIN = _SPACE.copy()
+	_PLAIN[[ord(c) for c in 'v0123456789.eE+-']] = True
+
+
+def readObjPoints(objFile):
+	"""
+	readObjPoints(str objFile) -> array
+	
+	Reads the vertices of a Nuke-exported .obj file, returning them
+	packed into a flat array of floats (x1, y1, z1, x2, y2, z2, ...).
+	
+	The file is memory mapped, and each run of consecutive vertex
+	lines is converted in one bulk pass (numpy.fromstring when numpy
+	is available, otherwise str.split and array.array), so no python 
+	objects are made per line. Runs that don't convert cleanly are 
+	read line by line instead. Either way the result is the same:
+	'v ' lines without exactly three values are skipped, and values
+	that aren't numbers raise a ValueError.
+	
+	Raises an Exception if the file doesn't start with the Nuke header.
+	"""
+	fh = open(objFile, 'rb')
+	try:
+		try:
+			data = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+		except (ValueError, EnvironmentError):
+			# empty files can't be mapped
+			data = fh.read()
+	finally:
+		fh.close()
+	
+	try:
+		if data[:len(NUKE_HEADER)] != NUKE_HEADER:
+			raise Exception("%s is not a nuke-generated obj" % objFile)
+		
+		points = array('d')
+		
+		start = data.find('\nv ', len(NUKE_HEADER) - 1)
+		while start != -1:
+			end = _RUN_END.search(data, start + 1)
+			end = end and end.start() or len(data)
+			
+			_readVertexRun(data[start+1:end+1], points)
+			
+			start = data.find('\nv ', end)
+	finally:
+		if isinstance(data, mmap.mmap):
+			data.close()
+	
+	return points
+
+
+def _readVertexRun(run, points):
+	"""
+	_readVertexRun(str run, array points) -> void
+	
+	Converts a run of 'v ' lines, appending their values to points.
+	"""
+	if numpy is not None:
+		values = _convertNumpy(run)
+	else:
+		values = _convertPython(run)
+	
+	if values is None:
+		values = _convertLines(run)
+	
+	points.extend(values)
+
+
+def _convertNumpy(run):
+	"""
+	_convertNumpy(str run) -> array
+	
+	Bulk converts a run of 'v ' lines with numpy, or returns None if 
+	any line doesn't hold exactly three values.
+	"""
+	chars = numpy.frombuffer(run, dtype=numpy.uint8)
+	if not _PLAIN[chars].all():
+		return None
+	
+	# every other byte below a space was rejected above
+	space = chars <= ord(' ')
+	
+	lineEnds = numpy.flatnonzero(chars == ord('\n'))
+	if not run.endswith('\n'):
+		lineEnds = numpy.append(lineEnds, len(run))
+	lineStarts = numpy.append(0, lineEnds[:-1] + 1)
+	numLines = len(lineEnds)
+	
+	# every line must be 'v' and three tokens. The runs only hold lines 
+	# starting 'v ', so with four tokens a line, each line's first token
+	# starts the line, and its fourth must end before the next line
+	tokenStarts = numpy.flatnonzero(~space[1:] & space[:-1]) + 1
+	tokenStarts = numpy.append(0, tokenStarts)
+	del chars, space
+	
+	if len(tokenStarts) != numLines * 4 \
+		or (tokenStarts[0::4] != lineStarts).any() \
+		or (tokenStarts[3::4] >= lineEnds).any():
+		return None
+	
+	with warnings.catch_warnings():
+		# numpy warns, and stops, when it hits text it can't convert
+		warnings.simplefilter('ignore')
+		values = numpy.fromstring(('\n' + run).replace('\nv ', '\n  '), dtype=numpy.float64, sep=' ')
+	
+	if len(values) != numLines * 3:
+		return None
+	
+	# a value can't be cut short without stopping the conversion, 
+	# other than the very last
+	lastLine = run[lineStarts[-1]:lineEnds[-1]]
+	try:
+		if [float(v) for v in lastLine.split()[1:]] != values[-3:].tolist():
+			return None
+	except ValueError:
+		return None
+	
+	points = array('d')
+	points.fromstring(values.tostring())
+	return points
+
+
+def _convertPython(run):
+	"""
+	_convertPython(str run) -> array
+	
+	Bulk converts a run of 'v ' lines with str.split, for when numpy
+	is not available, or returns None if any line doesn't hold exactly
+	three values.
+	"""
+	tokens = run.split()
+	numLines = run.count('\n') + (not run.endswith('\n'))
+	
+	# every line starts with a 'v' token, so if every fourth token is
+	# a 'v' and the rest are numbers, every line has three numbers
+	if len(tokens) != numLines * 4 or tokens[0::4].count('v') != numLines:
+		return None
+	del tokens[0::4]
+	
+	try:
+		return array('d', map(float, tokens))
+	except ValueError:
+		return None
+
+
+def _convertLines(run):
+	"""
+	_convertLines(str run) -> array
+	
+	Converts a run of 'v ' lines one at a time, skipping lines 
+	without three values.
+	"""
+	points = array('d')
+	for line in run.split('\n'):
+		try:
+			x,y,z = line.split()[1:]
+		except:
+			continue
+		points.extend((float(x), float(y), float(z)))
+	
+	return points
@@ -0,0 +1,751 @@
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+Written by: Justin Israel
+			justinisrael@gmail.com
+			justinfx.com
+
+Filtering of parsed .obj point clouds.
+
+Nuke point clouds from dense solves hold far more points than a 
+layout scene needs, and every point becomes a locator or an axis
+in the output. Each stage here takes the points as a flat x, y, z 
+array and returns the points to keep, as a new flat array('d'). 
+Kept points are always original points, in their original order.
+
+mortonOrder() and groupHierarchy() then lay the kept points out for 
+output, as a tree of small groups of nearby points rather than one 
+parent of every point.
+"""
+
+import heapq
+from math import floor, sqrt, sin, cos, tan, radians
+from array import array
+
+# shared with the writers, which lay the groups out
+from templates.pointgroups import groupHierarchy
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+# most frames x points projected at once, by frustumCull()
+CULL_CHUNK = 1 << 21
+
+# default neighbours and standard deviations of removeOutliers()
+DEFAULT_NEIGHBOURS = 8
+DEFAULT_STD_RATIO = 2.0
+
+# most points x neighbour candidates measured at once, by removeOutliers()
+NEIGHBOUR_CHUNK = 1 << 18
+# most points x points measured at once, once few are left unresolved
+NEIGHBOUR_BRUTE = 1 << 22
+# percent of unresolved points each grid is resized to resolve
+NEIGHBOUR_PERCENTILE = 90
+
+# bits of each axis in a mortonOrder() code
+MORTON_BITS = 21
+
+# the 27 cells around, and including, a cell
+_STENCIL = [(x, y, z) for x in (-1, 0, 1) for y in (-1, 0, 1) for z in (-1, 0, 1)]
+
+
+def voxelDecimate(points, size):
+	"""
+	voxelDecimate(points, float size) -> array
+	
+	Buckets the points into a grid of size x size x size cells, and
+	keeps the one point of each occupied cell that is nearest to the
+	centroid of the cell's points. Points that aren't finite are 
+	dropped. Runs in one sort of the occupied cells, with numpy, or
+	one pass over a dict of cells without it.
+	"""
+	size = float(size)
+	if size <= 0:
+		raise ValueError("Voxel size must be greater than 0, got %r" % size)
+	
+	if not len(points):
+		return array('d')
+	
+	if numpy is not None:
+		return _voxelDecimateNumpy(points, size)
+	
+	return _voxelDecimate(points, size)
+
+
+def frustumCull(points, columns, filmWidth, filmHeight, minFrames=1):
+	"""
+	frustumCull(points, dict columns, float filmWidth, float filmHeight, int minFrames=1) -> array
+	
+	Projects the points through the camera of every frame of a camera 
+	ChanFile.getColumns() dictionary, and keeps the points that land 
+	inside the film back, in front of the camera, on at least minFrames 
+	frames. The camera is rotated in ZXY order, as Nuke's default, and 
+	fov is the vertical field of view of the film height.
+	
+	With numpy, the points are projected through all of the frames 
+	at once, in chunks of up to CULL_CHUNK frames x points. Frames
+	with the same camera are only projected once.
+	"""
+	if not len(points):
+		return array('d')
+	
+	aspect = float(filmWidth) / filmHeight
+	minFrames = max(int(minFrames), 1)
+	
+	if numpy is not None:
+		return _frustumCullNumpy(points, columns, aspect, minFrames)
+	
+	return _frustumCull(points, columns, aspect, minFrames)
+
+
+def _frustumCullNumpy(points, columns, aspect, minFrames):
+	""" numpy version of frustumCull() """
+	xyz = _toNumpy(points)
+	
+	cameras = numpy.column_stack([numpy.asarray(columns[name], dtype=numpy.float64) 
+								  for name in ('tx', 'ty', 'tz', 'rx', 'ry', 'rz', 'fov')])
+	if not len(cameras):
+		return array('d')
+	
+	# a locked off camera, or a held frame, is projected once, counting
+	# for each of its frames
+	cameras, weights = numpy.unique(cameras, axis=0, return_counts=True)
+	
+	translate = cameras[:, 0:3]
+	rotate = _rotationsZXY(numpy.radians(cameras[:, 3:6]))
+	tanV = numpy.tan(numpy.radians(cameras[:, 6]) / 2)
+	tanH = tanV * aspect
+	
+	# camera space is (point - translate) . rotate, as one matrix
+	# product of the points with every frame's rotation
+	frames = len(cameras)
+	rotations = rotate.transpose(1, 0, 2).reshape(3, frames * 3)
+	offsets = numpy.einsum('fj,fjk->fk', translate, rotate)
+	
+	counts = numpy.zeros(len(xyz), dtype=numpy.int64)
+	chunk = max(CULL_CHUNK // frames, 1)
+	
+	with numpy.errstate(invalid='ignore'):
+		for start in xrange(0, len(xyz), chunk):
+			camera = xyz[start:start+chunk].dot(rotations).reshape(-1, frames, 3) - offsets
+			
+			depth = -camera[:, :, 2]
+			visible = (depth > 0) \
+					  & (abs(camera[:, :, 0]) <= tanH * depth) \
+					  & (abs(camera[:, :, 1]) <= tanV * depth)
+			counts[start:start+chunk] = visible.dot(weights)
+	
+	return _toArray(xyz[counts >= minFrames])
+
+
+def _rotationsZXY(angles):
+	"""
+	_rotationsZXY(array angles) -> array
+	
+	Returns the (n, 3, 3) rotation matrices of (n, 3) x, y, z radians,
+	rotating about z, then x, then y. Columns are the rotated axes.
+	"""
+	cx, cy, cz = numpy.cos(angles).T
+	sx, sy, sz = numpy.sin(angles).T
+	
+	# Ry . Rx . Rz
+	return numpy.stack([
+		numpy.stack([cy*cz + sy*sx*sz, -cy*sz + sy*sx*cz, sy*cx], axis=1),
+		numpy.stack([cx*sz, cx*cz, -sx], axis=1),
+		numpy.stack([-sy*cz + cy*sx*sz, sy*sz + cy*sx*cz, cy*cx], axis=1),
+	], axis=1)
+
+
+def _frustumCull(points, columns, aspect, minFrames):
+	""" Pure python version of frustumCull() """
+	cameras = {}
+	for camera in zip(*[columns[name] for name in ('tx', 'ty', 'tz', 'rx', 'ry', 'rz', 'fov')]):
+		cameras[camera] = cameras.get(camera, 0) + 1
+	
+	frames = []
+	for (tx, ty, tz, rx, ry, rz, fov), weight in sorted(cameras.iteritems()):
+		cx, cy, cz = cos(radians(rx)), cos(radians(ry)), cos(radians(rz))
+		sx, sy, sz = sin(radians(rx)), sin(radians(ry)), sin(radians(rz))
+		
+		# the columns of Ry . Rx . Rz are the camera's axes
+		right = (cy*cz + sy*sx*sz, cx*sz, -sy*cz + cy*sx*sz)
+		up = (-cy*sz + sy*sx*cz, cx*cz, sy*sz + cy*sx*cz)
+		back = (sy*cx, -sx, cy*cx)
+		
+		tanV = tan(radians(fov) / 2)
+		frames.append(((tx, ty, tz), right, up, back, tanV * aspect, tanV, weight))
+	
+	result = array('d')
+	for i in xrange(0, len(points) - 2, 3):
+		point = points[i:i+3]
+		
+		seen = 0
+		for translate, right, up, back, tanH, tanV, weight in frames:
+			dx, dy, dz = point[0] - translate[0], point[1] - translate[1], point[2] - translate[2]
+			
+			depth = -(dx * back[0] + dy * back[1] + dz * back[2])
+			if depth > 0 \
+				and abs(dx * right[0] + dy * right[1] + dz * right[2]) <= tanH * depth \
+				and abs(dx * up[0] + dy * up[1] + dz * up[2]) <= tanV * depth:
+				seen += weight
+				if seen >= minFrames:
+					result.extend(point)
+					break
+	
+	return result
+
+
+def getOutlierSettings(settings):
+	"""
+	getOutlierSettings(settings) -> (int neighbours, float stdRatio)
+	
+	Returns the removeOutliers() settings from one of:
+		True - DEFAULT_NEIGHBOURS and DEFAULT_STD_RATIO
+		int - the number of neighbours, with the default ratio
+		str - comma separated 'neighbours[,stdRatio]'
+		tuple - (neighbours, stdRatio)
+	"""
+	if settings is True:
+		return DEFAULT_NEIGHBOURS, DEFAULT_STD_RATIO
+	
+	if isinstance(settings, basestring):
+		values = [v for v in settings.split(',') if v.strip()]
+		if not 0 < len(values) <= 2:
+			raise ValueError("Expected 'neighbours[,stdRatio]', got %r" % settings)
+		settings = values
+	elif not isinstance(settings, (tuple, list)):
+		settings = [settings]
+	
+	neighbours = int(settings[0])
+	stdRatio = DEFAULT_STD_RATIO
+	if len(settings) > 1:
+		stdRatio = float(settings[1])
+	
+	if neighbours < 1:
+		raise ValueError("Outlier removal needs at least 1 neighbour, got %d" % neighbours)
+	
+	return neighbours, stdRatio
+
+
+def removeOutliers(points, neighbours=DEFAULT_NEIGHBOURS, stdRatio=DEFAULT_STD_RATIO):
+	"""
+	removeOutliers(points, int neighbours=DEFAULT_NEIGHBOURS, float stdRatio=DEFAULT_STD_RATIO) -> array
+	
+	Statistical outlier removal. Measures the mean distance of each
+	point to its nearest neighbours, and drops the points whose mean
+	distance is more than stdRatio standard deviations above the mean
+	of every point's. Points that aren't finite are dropped.
+	
+	The neighbours are found exactly, through a uniform grid sized from
+	the density of the cloud: each point's neighbours are searched for
+	in the cells around it, and points whose neighbours could lie 
+	further away, like the outliers themselves, are searched again on 
+	larger grids, until every point is resolved.
+	"""
+	if numpy is not None:
+		xyz = _toNumpy(points)
+		xyz = xyz[numpy.isfinite(xyz).all(axis=1)]
+		if len(xyz) <= neighbours:
+			return _toArray(xyz)
+		
+		distances = _meanNeighbourDistancesNumpy(xyz, neighbours)
+		limit = distances.mean() + stdRatio * distances.std()
+		return _toArray(xyz[distances <= limit])
+	
+	finite = lambda v: v - v == 0.0
+	xyz = [tuple(points[i:i+3]) for i in xrange(0, len(points) - 2, 3)]
+	xyz = [p for p in xyz if finite(p[0]) and finite(p[1]) and finite(p[2])]
+	
+	result = array('d')
+	if len(xyz) <= neighbours:
+		distances = [0.0] * len(xyz)
+	else:
+		distances = _meanNeighbourDistances(xyz, neighbours)
+	
+	mean = sum(distances) / max(len(distances), 1)
+	std = sqrt(sum((d - mean) ** 2 for d in distances) / max(len(distances), 1))
+	limit = mean + stdRatio * std
+	
+	for point, distance in zip(xyz, distances):
+		if distance <= limit:
+			result.extend(point)
+	
+	return result
+
+
+def _neighbourCellSize(extents, count, neighbours):
+	"""
+	_neighbourCellSize(list extents, int count, int neighbours) -> float
+	
+	Returns a grid cell size that holds about half of neighbours
+	points, given the extents of the box around the middle 80% of
+	the points on each axis, or None if every point is the same.
+	"""
+	extents = [float(e) for e in extents]
+	largest = max(extents)
+	if not largest:
+		return None
+	
+	# flat and thin clouds have little volume, but are not that dense
+	volume = 1.0
+	for extent in extents:
+		volume *= max(extent, largest * 1e-3)
+	
+	density = 0.8 ** 3 * count / volume
+	return (neighbours / (2.0 * density)) ** (1 / 3.0)
+
+
+def _meanNeighbourDistancesNumpy(xyz, neighbours):
+	""" 
+	_meanNeighbourDistancesNumpy(array xyz, int neighbours) -> array
+	
+	Returns the mean distance of each of the (n, 3) points to its 
+	nearest neighbours
+	"""
+	low, high = numpy.percentile(xyz, [10, 90], axis=0)
+	size = _neighbourCellSize(high - low, len(xyz), neighbours)
+	if size is None:
+		size = _neighbourCellSize(xyz.max(axis=0) - xyz.min(axis=0), len(xyz), neighbours)
+		if size is None:
+			return numpy.zeros(len(xyz))
+	
+	result = numpy.zeros(len(xyz))
+	pending = numpy.arange(len(xyz))
+	
+	while len(pending):
+		# few enough are left to measure against every point
+		if len(pending) * len(xyz) <= NEIGHBOUR_BRUTE:
+			_bruteNeighbours(xyz, pending, neighbours, result)
+			break
+		
+		grid = _neighbourGrid(xyz, size)
+		if grid is None:
+			size *= 2
+			continue
+		
+		resolved, distances, bounds = _gridNeighbours(xyz, pending, grid, size, neighbours)
+		if not resolved.any():
+			# the grid has stopped resolving the rest, however many are left
+			_bruteNeighbours(xyz, pending, neighbours, result)
+			break
+		
+		result[pending[resolved]] = distances[resolved]
+		pending, bounds = pending[~resolved], bounds[~resolved]
+		
+		# a grid as large as a point's furthest neighbour found resolves it
+		bounds = bounds[numpy.isfinite(bounds)]
+		if len(bounds):
+			size = numpy.sqrt(numpy.percentile(bounds, NEIGHBOUR_PERCENTILE))
+		else:
+			size *= 2
+	
+	return result
+
+
+def _bruteNeighbours(xyz, pending, neighbours, result):
+	"""
+	_bruteNeighbours(array xyz, array pending, int neighbours, array result)
+	
+	Sets the result of each of the pending points to its mean distance
+	to its nearest neighbours, measured against every point, in chunks
+	of up to NEIGHBOUR_CHUNK distances.
+	"""
+	step = max(NEIGHBOUR_CHUNK // len(xyz), 1)
+	for start in xrange(0, len(pending), step):
+		chunk = pending[start:start + step]
+		squared = numpy.zeros((len(chunk), len(xyz)))
+		for axis in xrange(3):
+			delta = xyz[chunk, axis, numpy.newaxis] - xyz[:, axis]
+			delta *= delta
+			squared += delta
+		
+		# each point is among the points, nearest of all
+		nearest = numpy.partition(squared, neighbours, axis=1)[:, :neighbours + 1]
+		result[chunk] = numpy.sqrt(nearest).sum(axis=1) / neighbours
+
+
+def _neighbourGrid(xyz, size):
+	"""
+	_neighbourGrid(array xyz, float size) -> tuple
+	
+	Buckets the (n, 3) points into a grid of size x size x size cells,
+	returning (order, cells, starts, counts, keys, coords, dims), or 
+	None if the grid's cells can't be counted in 63 bits. 
+	
+	order is the point indices sorted by cell, and cells the index of 
+	each point's cell. starts and counts are each occupied cell's points
+	in order, keys their sorted keys and coords their (x, y, z) indices, 
+	in a grid of dims cells.
+	"""
+	coords = numpy.floor((xyz - xyz.min(axis=0)) / size)
+	dims = coords.max(axis=0) + 1
+	if dims[0] * dims[1] * dims[2] >= 2.0 ** 62:
+		return None
+	
+	coords = coords.astype(numpy.int64)
+	dims = dims.astype(numpy.int64)
+	keys = (coords[:, 0] * dims[1] + coords[:, 1]) * dims[2] + coords[:, 2]
+	
+	order = keys.argsort()
+	keys = keys[order]
+	starts = numpy.append(0, numpy.flatnonzero(keys[1:] != keys[:-1]) + 1)
+	counts = numpy.diff(numpy.append(starts, len(keys)))
+	
+	cells = numpy.empty(len(order), dtype=numpy.int64)
+	cells[order] = numpy.repeat(numpy.arange(len(starts)), counts)
+	
+	return order, cells, starts, counts, keys[starts], coords[order[starts]], dims
+
+
+def _gridNeighbours(xyz, pending, grid, size, neighbours):
+	"""
+	_gridNeighbours(array xyz, array pending, tuple grid, float size, int neighbours) 
+		-> (array resolved, array distances, array bounds)
+	
+	Searches the 27 cells around each of the pending points for their
+	nearest neighbours. Returns which points were resolved, where every 
+	point nearer than the furthest neighbour found is sure to have been
+	searched, the mean distances to the neighbours found, and the squared
+	distances to the furthest, or inf where too few were found.
+	"""
+	order, cells, starts, counts, cellKeys, cellCoords, dims = grid
+	
+	# the pending points are measured in blocks, one for each cell, 
+	# against the points of the cells around it
+	byCell = cells[pending].argsort(kind='mergesort')
+	blockCells = cells[pending[byCell]]
+	firsts = numpy.flatnonzero(numpy.append(True, blockCells[1:] != blockCells[:-1]))
+	heights = numpy.diff(numpy.append(firsts, len(byCell)))
+	blockCells = blockCells[firsts]
+	
+	# the indices of the cells around each block, or -1 where empty
+	around = numpy.empty((len(_STENCIL), len(blockCells)), dtype=numpy.int32)
+	for n, (x, y, z) in enumerate(_STENCIL):
+		neighbour = cellCoords[blockCells] + (x, y, z)
+		found = ((neighbour >= 0) & (neighbour < dims)).all(axis=1)
+		
+		keys = cellKeys[blockCells] + (x * dims[1] + y) * dims[2] + z
+		cell = numpy.minimum(numpy.searchsorted(cellKeys, keys), len(cellKeys) - 1)
+		around[n] = numpy.where(found & (cellKeys[cell] == keys), cell, -1)
+	
+	widths = numpy.where(around >= 0, counts[around], 0).sum(axis=0)
+	
+	# points are read by their position sorted by cell, past the end 
+	# of which is a point that is infinitely far away
+	sortedAxes = [numpy.append(xyz[order, axis], numpy.inf) for axis in xrange(3)]
+	positions = numpy.empty(len(order), dtype=numpy.int64)
+	positions[order] = numpy.arange(len(order))
+	
+	resolved = numpy.zeros(len(pending), dtype=bool)
+	distances = numpy.zeros(len(pending))
+	bounds = numpy.zeros(len(pending))
+	
+	# blocks of similar sizes are measured together, in padded matrices
+	blocks = (heights * (widths.max() + 1) + widths).argsort()
+	padded = numpy.maximum(widths, neighbours + 1)
+	chunkStart = 0
+	while chunkStart < len(blocks):
+		window = blocks[chunkStart:chunkStart + max(NEIGHBOUR_CHUNK // padded[blocks[chunkStart]], 1)]
+		cost = numpy.maximum.accumulate(padded[window]) * numpy.maximum.accumulate(heights[window])
+		fits = numpy.arange(1, len(window) + 1) * cost <= NEIGHBOUR_CHUNK
+		chunk = window[:max(fits.sum(), 1)]
+		chunkStart += len(chunk)
+		
+		width = padded[chunk].max()
+		height = heights[chunk].max()
+		
+		# the candidates of each block, padded past the end
+		candidates = numpy.empty((len(chunk), width), dtype=numpy.int64)
+		candidates.fill(len(order))
+		column = numpy.arange(len(chunk), dtype=numpy.int64) * width
+		for cell in around[:, chunk]:
+			count = numpy.where(cell >= 0, counts[cell], 0)
+			total = count.sum()
+			if not total:
+				continue
+			
+			within = numpy.arange(total) - numpy.repeat(count.cumsum() - count, count)
+			candidates.flat[numpy.repeat(column, count) + within] = numpy.repeat(starts[cell], count) + within
+			column += count
+		
+		# the pending points of each block, padded with repeats of its last
+		rows = firsts[chunk, numpy.newaxis] + numpy.minimum(numpy.arange(height), 
+															heights[chunk, numpy.newaxis] - 1)
+		rows = byCell[rows]
+		points = positions[pending[rows]]
+		
+		squared = numpy.zeros((len(chunk), height, width))
+		for axis in sortedAxes:
+			delta = axis[candidates][:, numpy.newaxis, :] - axis[points][:, :, numpy.newaxis]
+			delta *= delta
+			squared += delta
+		
+		# each point is among its own candidates, nearest of all
+		nearest = numpy.partition(squared, neighbours, axis=2)[:, :, :neighbours + 1]
+		furthest = nearest.max(axis=2)
+		
+		rows, furthest = rows.ravel(), furthest.ravel()
+		bounds[rows] = furthest
+		resolved[rows] = (furthest <= size * size) | (widths[chunk].repeat(height) == len(xyz))
+		distances[rows] = numpy.sqrt(nearest).sum(axis=2).ravel() / neighbours
+	
+	return resolved, distances, bounds
+
+
+def _meanNeighbourDistances(xyz, neighbours):
+	""" Pure python version of _meanNeighbourDistancesNumpy(), for a list of (x, y, z) """
+	extents = []
+	for axis in xrange(3):
+		values = sorted(p[axis] for p in xyz)
+		extents.append(values[int(len(values) * 0.9)] - values[int(len(values) * 0.1)])
+	
+	size = _neighbourCellSize(extents, len(xyz), neighbours)
+	if size is None:
+		extents = [max(p[axis] for p in xyz) - min(p[axis] for p in xyz) for axis in xrange(3)]
+		size = _neighbourCellSize(extents, len(xyz), neighbours)
+		if size is None:
+			return [0.0] * len(xyz)
+	
+	result = [0.0] * len(xyz)
+	pending = range(len(xyz))
+	
+	while pending:
+		grid = {}
+		for i, (x, y, z) in enumerate(xyz):
+			grid.setdefault((floor(x / size), floor(y / size), floor(z / size)), []).append(i)
+		
+		unresolved, bounds = [], []
+		for i in pending:
+			x, y, z = xyz[i]
+			cx, cy, cz = floor(x / size), floor(y / size), floor(z / size)
+			
+			searched = 0
+			squared = []
+			for ox, oy, oz in _STENCIL:
+				for j in grid.get((cx + ox, cy + oy, cz + oz), ()):
+					searched += 1
+					if j != i:
+						px, py, pz = xyz[j]
+						squared.append((px - x) ** 2 + (py - y) ** 2 + (pz - z) ** 2)
+			
+			nearest = heapq.nsmallest(neighbours, squared)
+			if searched < len(xyz) and (len(nearest) < neighbours or nearest[-1] > size * size):
+				unresolved.append(i)
+				if len(nearest) == neighbours:
+					bounds.append(nearest[-1])
+				continue
+			
+			result[i] = sum(sqrt(d) for d in nearest) / neighbours
+		
+		stalled = len(unresolved) == len(pending)
+		pending = unresolved
+		if bounds:
+			bounds.sort()
+			newSize = sqrt(bounds[(len(bounds) - 1) * NEIGHBOUR_PERCENTILE // 100])
+		else:
+			newSize = size * 2
+		size = max(newSize, size * 2) if stalled else newSize
+	
+	return result
+
+
+def mortonOrder(points):
+	"""
+	mortonOrder(points) -> array
+	
+	Returns the points sorted along a Morton, or Z-order, curve through
+	their bounding box, so that runs of consecutive points lie close 
+	together in space. Each axis is quantized to MORTON_BITS bits, and
+	points with the same code, and points that aren't finite, which
+	go last, keep their original order.
+	"""
+	if numpy is not None:
+		xyz = _toNumpy(points)
+		finite = numpy.isfinite(xyz).all(axis=1)
+		if not finite.any():
+			return _toArray(xyz)
+		
+		low = xyz[finite].min(axis=0)
+		extent = xyz[finite].max(axis=0) - low
+		scale = numpy.where(extent > 0, (2 ** MORTON_BITS - 1) / numpy.where(extent > 0, extent, 1), 0)
+		
+		indices = numpy.flatnonzero(finite)
+		codes = numpy.zeros(len(indices), dtype=numpy.int64)
+		for axis in xrange(3):
+			cells = ((xyz[indices, axis] - low[axis]) * scale[axis]).astype(numpy.int64)
+			codes |= _spreadBits(numpy.minimum(cells, 2 ** MORTON_BITS - 1)) << axis
+		
+		order = numpy.append(indices[codes.argsort(kind='mergesort')], numpy.flatnonzero(~finite))
+		return _toArray(xyz[order])
+	
+	xyz = [tuple(points[i:i+3]) for i in xrange(0, len(points) - 2, 3)]
+	finite = [p for p in xyz if all(v - v == 0.0 for v in p)]
+	if not finite:
+		return array('d', points[:len(xyz) * 3])
+	
+	low = [min(p[axis] for p in finite) for axis in xrange(3)]
+	extent = [max(p[axis] for p in finite) - low[axis] for axis in xrange(3)]
+	scale = [e > 0 and (2 ** MORTON_BITS - 1) / e or 0.0 for e in extent]
+	
+	def code(point):
+		if not all(v - v == 0.0 for v in point):
+			return (1, 0)
+		result = 0
+		for axis in xrange(3):
+			cell = min(int((point[axis] - low[axis]) * scale[axis]), 2 ** MORTON_BITS - 1)
+			result |= _spreadBits(cell) << axis
+		return (0, result)
+	
+	result = array('d')
+	for point in sorted(xyz, key=code):
+		result.extend(point)
+	return result
+
+
+def _spreadBits(value):
+	""" Spreads the low 21 bits of an int, or of an int64 array, to every third bit """
+	value &= 0x1fffff
+	value = (value | value << 32) & 0x1f00000000ffff
+	value = (value | value << 16) & 0x1f0000ff0000ff
+	value = (value | value << 8) & 0x100f00f00f00f00f
+	value = (value | value << 4) & 0x10c30c30c30c30c3
+	value = (value | value << 2) & 0x1249249249249249
+	return value
+
+
+def _toArray(points):
+	""" Returns flat numpy points as an array('d'), which the writers format with str() """
+	result = array('d')
+	result.fromstring(numpy.ascontiguousarray(points, dtype=numpy.float64).tostring())
+	return result
+
+
+def _voxelDecimateNumpy(points, size):
+	""" numpy version of voxelDecimate() """
+	xyz = _toNumpy(points)
+	xyz = xyz[numpy.isfinite(xyz).all(axis=1)]
+	if not len(xyz):
+		return array('d')
+	
+	cell, order, starts = _voxelCells(xyz, size)
+	
+	counts = numpy.bincount(cell).astype(numpy.float64)
+	distance = numpy.zeros(len(xyz))
+	for axis in xrange(3):
+		centroid = numpy.bincount(cell, weights=xyz[:, axis]) / counts
+		distance += (xyz[:, axis] - centroid[cell]) ** 2
+	
+	# the nearest point of each cell, the earliest on a tie
+	nearest = numpy.minimum.reduceat(distance[order], starts)
+	candidates = numpy.where(distance == nearest[cell], numpy.arange(len(xyz)), len(xyz))
+	keep = numpy.minimum.reduceat(candidates[order], starts)
+	keep.sort()
+	
+	return _toArray(xyz[keep])
+
+
+def _toNumpy(points):
+	""" Returns flat points as an (n, 3) numpy array, sharing the memory of an array('d') """
+	if isinstance(points, array):
+		xyz = numpy.frombuffer(points, dtype=numpy.float64)
+	else:
+		xyz = numpy.asarray(points, dtype=numpy.float64)
+	return xyz[:len(xyz) - len(xyz) % 3].reshape(-1, 3)
+
+
+def _voxelCells(xyz, size):
+	"""
+	_voxelCells(array xyz, float size) -> (array cell, array order, array starts)
+	
+	Buckets (n, 3) finite points into a grid of size x size x size
+	cells. Returns the cell number of each point, numbered in sorted
+	cell order, the point indices sorted by cell, and the position in
+	order where each cell's points start.
+	"""
+	cells = numpy.floor(xyz / size)
+	cells -= cells.min(axis=0)
+	
+	# one integer key per cell, where the grid's cells can be counted in
+	# 63 bits, otherwise the cells are sorted as rows
+	span = [float(n) + 1 for n in cells.max(axis=0)]
+	if span[0] * span[1] * span[2] < 2.0 ** 62:
+		cells = cells.astype(numpy.int64)
+		keys = (cells[:, 0] * int(span[1]) + cells[:, 1]) * int(span[2]) + cells[:, 2]
+		order = keys.argsort()
+		keys = keys[order]
+		changed = keys[1:] != keys[:-1]
+	else:
+		order = numpy.lexsort((cells[:, 2], cells[:, 1], cells[:, 0]))
+		rows = cells[order]
+		changed = (rows[1:] != rows[:-1]).any(axis=1)
+	
+	starts = numpy.append(0, numpy.flatnonzero(changed) + 1)
+	
+	cell = numpy.empty(len(xyz), dtype=numpy.intp)
+	cell[order] = numpy.append(0, numpy.cumsum(changed))
+	
+	return cell, order, starts
+
+
+def _voxelDecimate(points, size):
+	""" Pure python version of voxelDecimate() """
+	finite = lambda v: v - v == 0.0
+	
+	sums = {}
+	cells = []
+	for i in xrange(0, len(points) - 2, 3):
+		x, y, z = points[i], points[i+1], points[i+2]
+		if not (finite(x) and finite(y) and finite(z)):
+			cells.append(None)
+			continue
+		
+		cell = (floor(x / size), floor(y / size), floor(z / size))
+		cells.append(cell)
+		
+		total = sums.get(cell)
+		if total is None:
+			sums[cell] = [x, y, z, 1]
+		else:
+			total[0] += x
+			total[1] += y
+			total[2] += z
+			total[3] += 1
+	
+	centroids = dict((cell, (sx / n, sy / n, sz / n)) for cell, (sx, sy, sz, n) in sums.iteritems())
+	del sums
+	
+	nearest = {}
+	for n, cell in enumerate(cells):
+		if cell is None:
+			continue
+		
+		i = n * 3
+		cx, cy, cz = centroids[cell]
+		distance = (points[i] - cx) ** 2 + (points[i+1] - cy) ** 2 + (points[i+2] - cz) ** 2
+		
+		best = nearest.get(cell)
+		if best is None or distance < best[0]:
+			nearest[cell] = (distance, n)
+	
+	result = array('d')
+	for n in sorted(n for distance, n in nearest.itervalues()):
+		result.extend(points[n*3:n*3+3])
+	
+	return result
@@ -0,0 +1,486 @@
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+Written by: Justin Israel
+			justinisrael@gmail.com
+			justinfx.com
+
+Local conversion server.
+
+Keeps the interpreter, templates and a pool of worker processes warm,
+and accepts conversion jobs as JSON over HTTP, on a TCP port or a
+unix socket. Pipeline tools can then convert a shot without paying
+the start-up cost of a new python process each time.
+
+	POST /convert
+		{"chanFile" : "/shots/a/cam.chan",	- required
+		 "outFile" : "/shots/a/cam.fbx",	- optional, as ChanConvert.writeAll()
+		 "stream" : false,					- return the output itself, not the path
+		 "options" : {"format" : "fbx", ...}} - ChanConvert keywords
+		
+		Replies with {"files" : [...], "timing" : {...}} as JSON, or with the 
+		converted file itself for streamed jobs, with the timing in 
+		X-AtomSplitter-* headers. Failures reply {"error" : "..."}.
+	
+	GET /status
+		Pool size, queue depth and job counts, as JSON.
+
+The "cache" option only switches the parse cache on or off. The server
+always keeps it in the ATOMSPLITTER_CACHE directory, or ~/.atomsplitter/cache,
+as jobs must not choose where entries are written and evicted.
+
+Each job's timing is reported as the seconds spent waiting for a
+worker ('queued'), converting ('convert') and in total on the server.
+"""
+
+import os, sys, json, time, shutil, socket, signal, tempfile, threading
+import httplib, SocketServer, BaseHTTPServer
+import multiprocessing
+from os import path
+
+from core.cache import ParseCache
+from core.chanconvert import ChanConvert
+from core.batch import _initWorker
+
+DEFAULT_ADDRESS = '127.0.0.1:8750'
+
+# ChanConvert keywords accepted in the "options" of a job
+OPTIONS = ('objFile', 'fps', 'width', 'height', 'filmWidth', 'filmHeight', 'scaleValue', 
+		   'format', 'compress', 'pointCloud', 'pointOutliers', 
+		   'pointCull', 'pointVoxel', 'pointGroup', 'reduce', 'cache')
+
+
+class JobError(Exception):
+	""" A job that can't be run, with the HTTP status to reply with """
+	
+	def __init__(self, message, status=400):
+		super(JobError, self).__init__(message)
+		self.status = status
+
+
+def parseAddress(address):
+	"""
+	parseAddress(str address) -> (int family, address)
+	
+	Returns (AF_UNIX, str path) for a unix socket path (anything
+	containing a /), otherwise (AF_INET, (str host, int port)) 
+	for a 'host:port' or 'port' address.
+	"""
+	if '/' in address:
+		return socket.AF_UNIX, address
+	
+	host, sep, port = address.rpartition(':')
+	return socket.AF_INET, (host or '127.0.0.1', int(port))
+
+
+#############################################################
+######## Workers
+#############################################################
+def _runJob(job):
+	"""
+	_runJob(dict job) -> dict
+	
+	Pool worker. Converts one job, returning a dict of the written
+	files, or the error, and the worker's start and finish times.
+	"""
+	started = time.time()
+	result = {'started' : started}
+	
+	try:
+		options = dict(job.get('options', {}))
+		
+		# never a directory of the job's choosing, as the cache evicts files
+		options['cache'] = options.get('cache') and ParseCache() or None
+		
+		converter = ChanConvert(job['chanFile'], **options)
+		result['files'] = converter.writeAll(job.get('outFile', ''), threaded=False)
+		
+		stats = converter.getReductionStats()
+		if stats:
+			result['reduction'] = [dict(zip(('channel', 'before', 'after', 'maxError'), s)) for s in stats]
+	
+	except Exception, e:
+		result['error'] = str(e) or e.__class__.__name__
+	
+	result['finished'] = time.time()
+	return result
+
+
+class JobPool(object):
+	"""
+	A warm pool of worker processes, with a limit on the number of
+	jobs waiting for a worker. 
+	"""
+	
+	def __init__(self, jobs=0, maxQueue=64, timeout=600):
+		"""
+		__init__(int jobs=0, int maxQueue=64, float timeout=600)
+		
+			int jobs - worker processes, the number of jobs converted at
+					   once. 0 uses one per cpu
+			int maxQueue - jobs that may wait for a worker before new
+						   jobs are turned away
+			float timeout - seconds to wait for a job before giving up on it
+		"""
+		self.jobs = jobs or multiprocessing.cpu_count()
+		self.maxQueue = maxQueue
+		self.timeout = timeout
+		
+		self.__pool = multiprocessing.Pool(self.jobs, _initWorker)
+		self.__lock = threading.Lock()
+		self.__pending = 0
+		self.__completed = 0
+		self.__failed = 0
+		self.__started = time.time()
+	
+	def run(self, job):
+		"""
+		run(dict job) -> dict
+		
+		Runs a job on the pool, blocking until it is done, and returns
+		the worker's result with a 'timing' dict added. Raises JobError
+		if the queue is full or the job times out. A timed out job keeps
+		its place in the pool until its worker actually finishes it.
+		"""
+		with self.__lock:
+			if self.__pending >= self.jobs + self.maxQueue:
+				raise JobError("Server busy, %d jobs queued" % (self.__pending - self.jobs), 503)
+			self.__pending += 1
+		
+		submitted = time.time()
+		try:
+			result = self.__pool.apply_async(_runJob, (job,), callback=self._jobDone).get(self.timeout)
+		except multiprocessing.TimeoutError:
+			raise JobError("Job timed out after %ss" % self.timeout, 504)
+		
+		started = result.pop('started')
+		finished = result.pop('finished')
+		result['timing'] = {'queued' : max(0.0, started - submitted),
+							'convert' : finished - started}
+		return result
+	
+	def _jobDone(self, result):
+		""" Pool callback, counts a job as done once its worker returns """
+		with self.__lock:
+			self.__pending -= 1
+			if 'error' in result:
+				self.__failed += 1
+			else:
+				self.__completed += 1
+	
+	def status(self):
+		""" Returns a dict of the pool size, queue depth and job counts """
+		with self.__lock:
+			return {'workers' : self.jobs,
+					'running' : min(self.__pending, self.jobs),
+					'queued' : max(0, self.__pending - self.jobs),
+					'maxQueue' : self.maxQueue,
+					'completed' : self.__completed,
+					'failed' : self.__failed,
+					'uptime' : time.time() - self.__started}
+	
+	def close(self):
+		self.__pool.terminate()
+		self.__pool.join()
+
+
+#############################################################
+######## Server
+#############################################################
+class ConvertHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+	""" HTTP handler for the job API. See the module docs """
+	
+	server_version = "AtomSplitter/%s" % ChanConvert.VERSION
+	protocol_version = "HTTP/1.1"
+	
+	# buffer each response, rather than sending every header line in 
+	# its own packet. The buffer is flushed after every request
+	wbufsize = -1
+	
+	def do_GET(self):
+		if self.path.rstrip('/') != '/status':
+			return self.sendJson({'error' : "Unknown path: %s" % self.path}, 404)
+		
+		self.sendJson(self.server.pool.status())
+	
+	def do_POST(self):
+		start = time.time()
+		
+		if self.path.rstrip('/') != '/convert':
+			return self.sendJson({'error' : "Unknown path: %s" % self.path}, 404)
+		
+		tempDir = None
+		try:
+			job = self.readJob()
+			
+			if job.get('stream'):
+				# streamed jobs are written aside, and removed once sent
+				tempDir = tempfile.mkdtemp(prefix='atomsplitter')
+				name = path.splitext(path.basename(job['chanFile']))[0]
+				ext = ChanConvert.EXTENSIONS.get(job['format'], 'fbx')
+				job['outFile'] = path.join(tempDir, '%s.%s' % (name, ext))
+			
+			result = self.server.pool.run(job)
+			
+		except JobError, e:
+			self.sendJson({'error' : str(e)}, e.status)
+		
+		else:
+			if 'error' in result:
+				self.sendJson(result, 422)
+			elif tempDir:
+				self.sendFile(result['files'][0], result['timing'], start)
+			else:
+				result['timing']['total'] = time.time() - start
+				self.sendJson(result)
+		
+		finally:
+			if tempDir:
+				shutil.rmtree(tempDir, True)
+	
+	def readJob(self):
+		""" Reads and checks the JSON job of a request """
+		try:
+			length = int(self.headers.get('Content-Length', 0))
+			job = json.loads(self.rfile.read(length))
+		except ValueError, e:
+			raise JobError("Invalid JSON job: %s" % e)
+		
+		if not isinstance(job, dict) or not isinstance(job.get('chanFile'), basestring):
+			raise JobError("A job needs a chanFile path")
+		
+		options = job.get('options', {})
+		if not isinstance(options, dict):
+			raise JobError("Job options must be an object")
+		
+		unknown = sorted(set(options) - set(OPTIONS))
+		if unknown:
+			raise JobError("Unknown options: %s" % ', '.join(unknown))
+		
+		cache = options.get('cache')
+		if cache is not None and not isinstance(cache, bool):
+			raise JobError("The cache option must be true or false")
+		
+		if job.get('stream'):
+			formats = options.get('format', 'fbx')
+			if isinstance(formats, basestring):
+				formats = formats.split(',')
+			if len(formats) != 1:
+				raise JobError("Streamed jobs must have a single output format")
+			job['format'] = ChanConvert.getFormatName(formats[0])
+		
+		# json gives unicode, the converters expect str
+		job = dict((str(k), v) for k, v in job.iteritems())
+		job['options'] = dict((str(k), isinstance(v, unicode) and str(v) or v) 
+							  for k, v in options.iteritems())
+		job['chanFile'] = str(job['chanFile'])
+		if job.get('outFile'):
+			job['outFile'] = str(job['outFile'])
+		
+		return job
+	
+	def sendJson(self, data, status=200):
+		body = json.dumps(data)
+		self.send_response(status)
+		self.send_header('Content-Type', 'application/json')
+		self.send_header('Content-Length', str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+	
+	def sendFile(self, filename, timing, start):
+		fh = open(filename, 'rb')
+		try:
+			self.send_response(200)
+			self.send_header('Content-Type', 'application/octet-stream')
+			self.send_header('Content-Length', str(os.fstat(fh.fileno()).st_size))
+			self.send_header('Content-Disposition', 'attachment; filename="%s"' % path.basename(filename))
+			self.send_header('X-AtomSplitter-Queued', '%.6f' % timing['queued'])
+			self.send_header('X-AtomSplitter-Convert', '%.6f' % timing['convert'])
+			self.send_header('X-AtomSplitter-Total', '%.6f' % (time.time() - start))
+			self.end_headers()
+			shutil.copyfileobj(fh, self.wfile, 1024 * 1024)
+		finally:
+			fh.close()
+	
+	def address_string(self):
+		# unix socket clients have no address
+		if self.server.address_family == socket.AF_UNIX:
+			return 'unix'
+		return BaseHTTPServer.BaseHTTPRequestHandler.address_string(self)
+	
+	def log_message(self, format, *args):
+		if not self.server.quiet:
+			sys.stderr.write("%s - - [%s] %s\n" % (self.address_string(), 
+								self.log_date_time_string(), format % args))
+
+
+class ConvertServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+	""" Threaded HTTP server for the job API, on a TCP port """
+	
+	daemon_threads = True
+	allow_reuse_address = True
+	request_queue_size = 128
+	
+	def __init__(self, address, pool, quiet=False):
+		self.pool = pool
+		self.quiet = quiet
+		BaseHTTPServer.HTTPServer.__init__(self, address, ConvertHandler)
+
+
+class UnixConvertServer(SocketServer.ThreadingMixIn, SocketServer.UnixStreamServer):
+	""" Threaded HTTP server for the job API, on a unix socket """
+	
+	daemon_threads = True
+	request_queue_size = 128
+	
+	def __init__(self, socketPath, pool, quiet=False):
+		self.pool = pool
+		self.quiet = quiet
+		
+		# a stale socket from a previous server would fail the bind
+		if path.exists(socketPath):
+			os.remove(socketPath)
+		
+		SocketServer.UnixStreamServer.__init__(self, socketPath, ConvertHandler)
+		
+		self.server_name = 'localhost'
+		self.server_port = 0
+	
+	def server_close(self):
+		SocketServer.UnixStreamServer.server_close(self)
+		if path.exists(self.server_address):
+			os.remove(self.server_address)
+
+
+def createServer(address=DEFAULT_ADDRESS, jobs=0, maxQueue=64, timeout=600, quiet=False):
+	"""
+	createServer(str address=DEFAULT_ADDRESS, int jobs=0, ...) -> server
+	
+	Starts the worker pool, and returns a server bound to address,
+	a 'host:port' or a unix socket path. Call serve_forever() on it
+	to handle requests, and shutdown() then close() to stop.
+	"""
+	family, address = parseAddress(address)
+	pool = JobPool(jobs, maxQueue=maxQueue, timeout=timeout)
+	
+	try:
+		if family == socket.AF_UNIX:
+			server = UnixConvertServer(address, pool, quiet)
+		else:
+			server = ConvertServer(address, pool, quiet)
+	except:
+		pool.close()
+		raise
+	
+	def close():
+		server.server_close()
+		pool.close()
+	server.close = close
+	
+	return server
+
+
+def serve(address=DEFAULT_ADDRESS, jobs=0, maxQueue=64, timeout=600, quiet=False):
+	""" Runs a server until interrupted. See createServer() """
+	server = createServer(address, jobs, maxQueue, timeout, quiet)
+	
+	def terminate(signum, frame):
+		raise KeyboardInterrupt
+	signal.signal(signal.SIGTERM, terminate)
+	
+	print "AtomSplitter server on %s, %d workers" % (address, server.pool.jobs)
+	sys.stdout.flush()
+	
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		signal.signal(signal.SIGTERM, signal.SIG_IGN)
+		server.close()
+
+
+#############################################################
+######## Client
+#############################################################
+class UnixHTTPConnection(httplib.HTTPConnection):
+	""" An HTTPConnection over a unix socket """
+	
+	def __init__(self, socketPath, timeout=None):
+		httplib.HTTPConnection.__init__(self, 'localhost')
+		self.socketPath = socketPath
+		self.timeout = timeout
+	
+	def connect(self):
+		self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+		if self.timeout is not None:
+			self.sock.settimeout(self.timeout)
+		self.sock.connect(self.socketPath)
+
+
+def connect(address=DEFAULT_ADDRESS, timeout=None):
+	""" Returns an HTTPConnection to a server at address """
+	family, address = parseAddress(address)
+	if family == socket.AF_UNIX:
+		return UnixHTTPConnection(address, timeout)
+	
+	if timeout is None:
+		return httplib.HTTPConnection(*address)
+	return httplib.HTTPConnection(*address, timeout=timeout)
+
+
+def convert(chanFile, outFile='', address=DEFAULT_ADDRESS, stream=False, connection=None, **options):
+	"""
+	convert(str chanFile, str outFile='', str address=DEFAULT_ADDRESS, 
+			bool stream=False, connection=None, **options) -> dict
+	
+	Client for a running server. Converts chanFile with the given
+	ChanConvert options, and returns the server's reply. Streamed jobs 
+	return {'data' : str output, 'timing' : {...}}. Raises JobError on failure.
+	An open connection may be given, to reuse it over many jobs.
+	"""
+	job = {'chanFile' : path.abspath(chanFile), 'options' : options, 'stream' : stream}
+	if outFile:
+		job['outFile'] = path.abspath(outFile)
+	if options.get('objFile'):
+		options['objFile'] = path.abspath(options['objFile'])
+	
+	conn = connection or connect(address)
+	try:
+		body = json.dumps(job)
+		conn.request('POST', '/convert', body, {'Content-Type' : 'application/json'})
+		response = conn.getresponse()
+		data = response.read()
+	finally:
+		if connection is None:
+			conn.close()
+	
+	if response.status == 200 and stream:
+		timing = dict((name, float(response.getheader('X-AtomSplitter-%s' % name.title())))
+					  for name in ('queued', 'convert', 'total'))
+		return {'data' : data, 'timing' : timing}
+	
+	try:
+		result = json.loads(data)
+	except ValueError:
+		result = {'error' : data}
+	
+	if response.status != 200:
+		raise JobError(result.get('error', 'Failed'), response.status)
+	
+	return result
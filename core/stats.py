@@ -0,0 +1,217 @@
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+Written by: Justin Israel
+			justinisrael@gmail.com
+			justinfx.com
+
+"""
+
+import sys, time, threading
+from contextlib import contextmanager
+
+try:
+	import resource
+except ImportError:
+	resource = None
+
+############################################################# 
+#############################################################
+######## ConvertStats
+############################################################# 
+############################################################# 
+class ConvertStats(object):
+	"""
+	Collects the time spent in each stage of conversions, as named 
+	spans, with counts such as bytes and keys. Pass an instance to
+	ChanConvert as the stats keyword.
+	
+	ChanConvert records these spans:
+		parse.chan		- reading the .chan file (bytes, keys)
+		parse.obj		- reading the .obj point cloud (bytes, points read)
+		points.<filter> - filtering the points, within parse.obj (points kept)
+		points.order	- Morton ordering points that are grouped, within parse.obj
+		parse.reduce	- keyframe reduction (keys kept)
+		render.<format> - rendering an output format, including the
+						  key and point formatting below
+		render.keys		- formatting animation keys, within render.fbx 
+						  and render.fbxbin
+		render.points	- formatting point cloud models, within render.fbx
+		write.<format>	- writing the rendered output to disk (bytes)
+	
+	Spans of the same name add up, including across threads. Hooks
+	added with addHook() are called as hook(str name, float seconds)
+	as each span ends.
+	"""
+	
+	def __init__(self):
+		self.__lock = threading.Lock()
+		self.__spans = {}
+		self.__order = []
+		self.__hooks = []
+		self.__started = time.time()
+	
+	def addHook(self, hook):
+		""" Calls hook(str name, float seconds) as each span ends """
+		self.__hooks.append(hook)
+	
+	def add(self, name, seconds=0.0, calls=1, **counts):
+		"""
+		add(str name, float seconds=0.0, int calls=1, **counts)
+		
+		Adds time and counts to a span.
+		"""
+		with self.__lock:
+			span = self.__spans.get(name)
+			if span is None:
+				span = self.__spans[name] = {'name' : name, 'calls' : 0, 'seconds' : 0.0}
+				self.__order.append(name)
+			
+			span['calls'] += calls
+			span['seconds'] += seconds
+			for key, value in counts.iteritems():
+				span[key] = span.get(key, 0) + value
+		
+		if calls:
+			for hook in self.__hooks:
+				hook(name, seconds)
+	
+	def count(self, name, **counts):
+		""" Adds counts to a span, without timing it """
+		self.add(name, calls=0, **counts)
+	
+	@contextmanager
+	def span(self, name, **counts):
+		""" Times the with block as a span """
+		start = time.time()
+		try:
+			yield
+		finally:
+			self.add(name, time.time() - start, **counts)
+	
+	def iterSpan(self, name, iterable):
+		"""
+		iterSpan(str name, iterable) -> iterable
+		
+		Returns a wrapper of iterable that times the production of 
+		its items as a span, recorded once iteration ends. The wrapper
+		can be iterated again, and has the length of iterable, and its
+		seconds attribute holds the time of its last iteration. With a
+		name of None, the time is only kept in the seconds attribute.
+		"""
+		return _TimedIterable(self, name, iterable)
+	
+	def getSpans(self):
+		""" Returns a copy of the span dicts, in the order they were first recorded """
+		with self.__lock:
+			return [dict(self.__spans[name]) for name in self.__order]
+	
+	def report(self):
+		"""
+		report() -> dict
+		
+		Returns the spans, the wall time since the stats were created,
+		and the peak memory of the process in bytes (None where it can't 
+		be measured), as a JSON-ready dict.
+		"""
+		return {'wall' : time.time() - self.__started,
+				'peakMemory' : peakMemory(),
+				'spans' : self.getSpans()}
+	
+	def format(self):
+		""" Returns the report as a printable table """
+		report = self.report()
+		
+		lines = ["%-16s %6s %10s  %s" % ('stage', 'calls', 'seconds', 'counts')]
+		for span in report['spans']:
+			counts = ', '.join('%s %d' % (key, span[key]) for key in sorted(span) 
+							   if key not in ('name', 'calls', 'seconds'))
+			lines.append("%-16s %6d %10.4f  %s" % (span['name'], span['calls'], span['seconds'], counts))
+		
+		lines.append("%-16s %6s %10.4f" % ('total', '', report['wall']))
+		if report['peakMemory'] is not None:
+			lines.append("peak memory %.1f MB" % (report['peakMemory'] / (1024.0 * 1024.0)))
+		
+		return '\n'.join(lines)
+
+
+class _TimedIterable(object):
+	""" See ConvertStats.iterSpan() """
+	
+	def __init__(self, stats, name, iterable):
+		self.__stats = stats
+		self.__name = name
+		self.__iterable = iterable
+		self.seconds = 0.0
+	
+	def __len__(self):
+		return len(self.__iterable)
+	
+	def __iter__(self):
+		clock = time.time
+		seconds = 0.0
+		iterator = iter(self.__iterable)
+		try:
+			while True:
+				start = clock()
+				try:
+					item = iterator.next()
+				finally:
+					seconds += clock() - start
+				yield item
+		except StopIteration:
+			pass
+		finally:
+			self.seconds = seconds
+			if self.__name is not None:
+				self.__stats.add(self.__name, seconds)
+
+
+class NullStats(object):
+	""" Stands in for ConvertStats when a conversion isn't measured """
+	
+	def add(self, name, seconds=0.0, calls=1, **counts):
+		pass
+	
+	def count(self, name, **counts):
+		pass
+	
+	@contextmanager
+	def span(self, name, **counts):
+		yield
+	
+	def iterSpan(self, name, iterable):
+		return iterable
+	
+	def __nonzero__(self):
+		return False
+
+
+NULL_STATS = NullStats()
+
+
+def peakMemory():
+	""" Returns the peak resident memory of this process in bytes, or None """
+	if resource is None:
+		return None
+	
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	# kilobytes, except on osx
+	if sys.platform != 'darwin':
+		peak *= 1024
+	return peak
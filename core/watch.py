@@ -0,0 +1,447 @@
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+Written by: Justin Israel
+			justinisrael@gmail.com
+			justinfx.com
+
+"""
+
+import os, sys, json, time, errno, select, hashlib
+import multiprocessing, Queue
+from os import path
+from collections import deque
+
+from core.chanconvert import ChanConvert
+from core.batch import _batchConvert, _initWorker
+
+############################################################# 
+#############################################################
+######## Watch
+############################################################# 
+############################################################# 
+class _Inotify(object):
+	"""
+	Minimal linux inotify, through ctypes. Only reports that
+	something changed in the watched directories, which are then 
+	rescanned. Raises OSError where inotify is not available.
+	"""
+	
+	# IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+	MASK = 0x002 | 0x008 | 0x040 | 0x080 | 0x100 | 0x200
+	
+	def __init__(self):
+		import ctypes, ctypes.util
+		
+		if not sys.platform.startswith('linux'):
+			raise OSError(errno.ENOSYS, "inotify is only available on linux")
+		
+		self.__libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+		self.__fd = self.__libc.inotify_init()
+		if self.__fd < 0:
+			raise OSError(ctypes.get_errno(), "inotify_init failed")
+		
+		self.__watched = set()
+	
+	def add(self, directory):
+		""" Watches a directory, once """
+		if directory in self.__watched:
+			return
+		
+		if self.__libc.inotify_add_watch(self.__fd, directory, self.MASK) >= 0:
+			self.__watched.add(directory)
+	
+	def wait(self, timeout):
+		""" Blocks until there are events or timeout seconds pass """
+		try:
+			ready = select.select([self.__fd], [], [], timeout)[0]
+		except select.error, e:
+			if e.args[0] != errno.EINTR:
+				raise
+			return
+		
+		if ready:
+			# the events themselves aren't needed, only that there were some
+			os.read(self.__fd, 64 * 1024)
+	
+	def close(self):
+		os.close(self.__fd)
+
+
+class _Poller(object):
+	""" Stands in for _Inotify where it isn't available """
+	
+	def add(self, directory):
+		pass
+	
+	def wait(self, timeout):
+		time.sleep(timeout)
+	
+	def close(self):
+		pass
+
+
+def _hashFiles(*filenames):
+	""" Returns the sha1 of the contents of one or more files """
+	digest = hashlib.sha1()
+	for filename in filenames:
+		if not filename:
+			continue
+		fh = open(filename, 'rb')
+		try:
+			for chunk in iter(lambda: fh.read(1024 * 1024), ''):
+				digest.update(chunk)
+		finally:
+			fh.close()
+		digest.update('\0')
+	return digest.hexdigest()
+
+
+def _watchConvert(job):
+	"""
+	_watchConvert(tuple job) -> tuple
+	
+	Pool worker for ChanWatcher. Hashes the inputs of a 
+	(chanFile, options, outFile, skipHashes) job, and converts them 
+	as _batchConvert() unless the hash is one of skipHashes. Returns 
+	(chanFile, digest, result), where result is the _batchConvert() 
+	tuple, or None if the file wasn't converted. digest is None if
+	the inputs couldn't be read.
+	"""
+	chanFile, options, outFile, skipHashes = job
+	
+	try:
+		digest = _hashFiles(chanFile, options.get('objFile', ''))
+	except IOError:
+		# removed since it settled
+		return (chanFile, None, None)
+	
+	if digest in skipHashes:
+		return (chanFile, digest, None)
+	
+	return (chanFile, digest, _batchConvert((chanFile, options, outFile)))
+
+
+class ChanWatcher(object):
+	"""
+	Watches directories for new or changed .chan files, and converts
+	them on a pool of worker processes as they settle.
+	
+	A point cloud .obj next to a .chan file, with the same name, is
+	converted with it, and a change to either file converts the pair 
+	again. Files are only converted once their size and modification
+	time have stayed the same for the settle time, so files that are 
+	still being written are left alone. 
+	
+	A ledger of the inputs converted so far is kept in a JSON file, 
+	so only new or changed files are converted, across restarts. 
+	A file that is touched, but whose contents didn't change, is 
+	not converted again. Files that fail to convert are not tried
+	again until they change, or the watcher is restarted.
+	"""
+	
+	LEDGER_VERSION = 1
+	
+	# with inotify, the paths are still rescanned this often when idle,
+	# in case a directory was created and written to before it was watched
+	RESCAN_INTERVAL = 30.0
+	
+	def __init__(self, paths, jobs=0, settle=2.0, interval=1.0, ledger=None, callback=None, **kwargs):
+		"""
+		__init__(list paths, int jobs=0, float settle=2.0, float interval=1.0, 
+				 str ledger=None, callback=None, **kwargs)
+		
+			list paths - directories to watch, recursively
+			int jobs - number of worker processes. 0 uses one per cpu
+			float settle - seconds a file must be unchanged before converting it
+			float interval - seconds between scans, when polling
+			str ledger - JSON ledger file. Defaults to ~/.atomsplitter/watch.json
+			callable callback - optional, called with a (chanFile, writtenFiles, error, seconds)
+								tuple as each conversion finishes, as batchConvert()
+			
+		Remaining keywords are passed to ChanConvert for every file.
+		"""
+		self.paths = [path.abspath(p) for p in paths]
+		self.jobs = jobs or multiprocessing.cpu_count()
+		self.settle = settle
+		self.interval = interval
+		self.callback = callback
+		self.options = kwargs
+		
+		# outputs are written over those of the previous conversion, 
+		# rather than numbered beside them as new files
+		formats = kwargs.get('format') or 'fbx'
+		if isinstance(formats, basestring):
+			formats = formats.split(',')
+		first = formats[0].strip().lower()
+		self.__ext = ChanConvert.EXTENSIONS.get(first == 'tgd' and 'terragen' or first, 'fbx')
+		
+		if not ledger:
+			ledger = path.join(path.expanduser('~'), '.atomsplitter', 'watch.json')
+		self.ledgerFile = ledger
+		self.ledger = self._loadLedger()
+		
+		# chanFile -> (signature, time first seen with it)
+		self.__settling = {}
+		# (chanFile, signature) waiting for a worker, and chanFile -> 
+		# signature in a worker
+		self.__queued = deque()
+		self.__queuedFiles = set()
+		self.__running = {}
+		# chanFile -> (signature, hash) of inputs that failed to convert
+		self.__failed = {}
+		self.__results = Queue.Queue()
+		
+		self.__pool = None
+		self.__notify = None
+	
+	def _loadLedger(self):
+		try:
+			fh = open(self.ledgerFile, 'r')
+		except IOError:
+			return {}
+		
+		try:
+			try:
+				data = json.load(fh)
+			except ValueError:
+				return {}
+		finally:
+			fh.close()
+		
+		if data.get('version') != self.LEDGER_VERSION:
+			return {}
+		return data.get('files', {})
+	
+	def _saveLedger(self):
+		directory = path.dirname(self.ledgerFile)
+		if directory and not path.isdir(directory):
+			os.makedirs(directory)
+		
+		temp = '%s.%d.tmp' % (self.ledgerFile, os.getpid())
+		fh = open(temp, 'w')
+		try:
+			json.dump({'version' : self.LEDGER_VERSION, 'files' : self.ledger}, fh, indent=1, sort_keys=True)
+		finally:
+			fh.close()
+		
+		if os.name == 'nt' and path.exists(self.ledgerFile):
+			os.remove(self.ledgerFile)
+		os.rename(temp, self.ledgerFile)
+	
+	def scan(self):
+		"""
+		scan() -> dict
+		
+		Returns {chanFile : signature} for every .chan file under the
+		watched paths. The signature is a list of the size and modification 
+		time of the .chan file and its paired .obj file, if any.
+		"""
+		found = {}
+		
+		for top in self.paths:
+			for root, dirs, files in os.walk(top):
+				if self.__notify:
+					self.__notify.add(root)
+				
+				objFiles = {}
+				for name in files:
+					base, ext = path.splitext(name)
+					if ext.lower() == '.obj':
+						objFiles[base] = path.join(root, name)
+				
+				for name in files:
+					base, ext = path.splitext(name)
+					if ext.lower() != '.chan':
+						continue
+					
+					chanFile = path.join(root, name)
+					objFile = objFiles.get(base, '')
+					try:
+						st = os.stat(chanFile)
+						signature = [st.st_size, st.st_mtime, objFile]
+						if objFile:
+							st = os.stat(objFile)
+							signature += [st.st_size, st.st_mtime]
+					except OSError:
+						# removed while scanning
+						continue
+					
+					found[chanFile] = signature
+		
+		return found
+	
+	def poll(self):
+		"""
+		poll() -> int
+		
+		Scans the watched paths once, dispatching the files that have
+		settled, and handles finished conversions. Returns the number
+		of files still settling, queued or converting.
+		"""
+		self._collect()
+		
+		now = time.time()
+		found = self.scan()
+		
+		for chanFile in self.__settling.keys():
+			if chanFile not in found:
+				del self.__settling[chanFile]
+		
+		for chanFile, signature in sorted(found.iteritems()):
+			entry = self.ledger.get(chanFile)
+			if entry and entry['signature'] == signature:
+				continue
+			
+			failed = self.__failed.get(chanFile)
+			if failed and failed[0] == signature:
+				continue
+			
+			if chanFile in self.__running or chanFile in self.__queuedFiles:
+				# converted again once it finishes
+				continue
+			
+			seen = self.__settling.get(chanFile)
+			if not seen or seen[0] != signature:
+				self.__settling[chanFile] = (signature, now)
+				continue
+			
+			if now - seen[1] < self.settle:
+				continue
+			
+			del self.__settling[chanFile]
+			
+			# the inputs are hashed by the workers, so large files
+			# don't hold up the scans
+			self.__queued.append((chanFile, signature))
+			self.__queuedFiles.add(chanFile)
+		
+		self._dispatch()
+		
+		return len(self.__settling) + len(self.__queued) + len(self.__running)
+	
+	def _dispatch(self):
+		""" Hands queued files to the pool, keeping at most one waiting per worker """
+		if self.__pool is None:
+			self.__pool = multiprocessing.Pool(self.jobs, _initWorker)
+		
+		while self.__queued and len(self.__running) < self.jobs * 2:
+			chanFile, signature = self.__queued.popleft()
+			self.__queuedFiles.discard(chanFile)
+			
+			options = dict(self.options)
+			if signature[2]:
+				options['objFile'] = signature[2]
+			
+			outFile = '%s.%s' % (path.splitext(chanFile)[0], self.__ext)
+			
+			# contents that were already converted, or already failed, are skipped
+			skipHashes = []
+			entry = self.ledger.get(chanFile)
+			if entry:
+				skipHashes.append(entry['hash'])
+			failed = self.__failed.get(chanFile)
+			if failed:
+				skipHashes.append(failed[1])
+			
+			self.__running[chanFile] = signature
+			self.__pool.apply_async(_watchConvert, ((chanFile, options, outFile, skipHashes),), 
+									callback=self.__results.put)
+	
+	def _collect(self):
+		""" Records the conversions that have finished since the last call """
+		changed = False
+		
+		while True:
+			try:
+				result = self.__results.get_nowait()
+			except Queue.Empty:
+				break
+			
+			chanFile, digest, result = result
+			signature = self.__running.pop(chanFile)
+			
+			if digest is None:
+				# unreadable, it is tried again if it is still there
+				continue
+			
+			if result is None:
+				# touched, but the same contents
+				entry = self.ledger.get(chanFile)
+				if entry and entry['hash'] == digest:
+					entry['signature'] = signature
+					changed = True
+				else:
+					self.__failed[chanFile] = (signature, digest)
+				continue
+			
+			error = result[2]
+			if error:
+				self.__failed[chanFile] = (signature, digest)
+			else:
+				self.__failed.pop(chanFile, None)
+				self.ledger[chanFile] = {'signature' : signature, 'hash' : digest, 
+										 'written' : result[1], 'converted' : time.time()}
+				changed = True
+			
+			if self.callback:
+				self.callback(result)
+		
+		if changed:
+			self._saveLedger()
+	
+	def watch(self, timeout=None):
+		"""
+		watch(float timeout=None)
+		
+		Watches for files until interrupted, or for timeout seconds.
+		Uses inotify where available, and polls the paths otherwise.
+		"""
+		try:
+			self.__notify = _Inotify()
+		except OSError:
+			self.__notify = _Poller()
+		
+		end = timeout and time.time() + timeout
+		try:
+			while not end or time.time() < end:
+				busy = self.poll()
+				
+				if busy or isinstance(self.__notify, _Poller):
+					wait = busy and min(self.interval, self.settle / 2.0) or self.interval
+				else:
+					# nothing to do until something changes
+					wait = self.RESCAN_INTERVAL
+				
+				if end:
+					wait = max(0, min(wait, end - time.time()))
+				self.__notify.wait(wait)
+		finally:
+			self.close()
+	
+	def close(self):
+		""" Waits for running conversions, and stops the pool """
+		if self.__pool is not None:
+			self.__pool.close()
+			self.__pool.join()
+			self.__pool = None
+			self._collect()
+		
+		if self.__notify is not None:
+			self.__notify.close()
+			self.__notify = None
@@ -23,9 +23,16 @@ Written by: Justin Israel
 """
 
 
-import sys
+import sys, copy
 from time import localtime, strftime
-from collections import deque
+from collections import deque, defaultdict
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+from templates.pointgroups import groupHierarchy
 
 class ChanToAction(object):
 	"""
@@ -43,25 +50,45 @@ class ChanToAction(object):
 	FRAME_PIXEL_FORMAT = 124
 	FRAME_ASPECT_RATIO = 1.777780175
 	
+	# chan file columns after the frame number
+	CHANNELS = ('tx', 'ty', 'tz', 'rx', 'ry', 'rz', 'fov')
+	
 	
 	def __init__(self, chanfile, objfile=None, **kwargs):
 		"""
 		Args:
-			str chanfile - .chan file for camera data
+			chanfile - .chan file for camera data, either as a path or 
+					   an already parsed ChanFile
 			str objfile - optional .obj file of pointcloud export
 			
 			int width - frame width
 			int height - frame height
 			float aspect - pixel aspect ratio		
+			points - optional, already parsed flat x,y,z positions 
+					 of the objfile points, to avoid reading it again
+			dict keyIndices - optional, channel name -> indices of the keys 
+							  to write, from keyframe reduction. Reduced channels
+							  are written with linear interpolation
+			int groupSize - optional, parent the point axes to a tree of
+							'pointGroupNAxis' axes of at most this many children,
+							see pointgroups.groupHierarchy()
+			callable checkCancel - optional, called for each channel and axis
+								   written. It raises to stop the conversion
 		"""
 		self.__result = []
 		self.__cDate = strftime("%a %b %d %H:%M:%S %Y ", localtime())
-		self.__sourceLines = []
+		self.__frames = []
+		self.__columns = {}
+		self.__keyHeads = {}
 		
 		self.__childCount = 0
 		
 		self.chanfile = chanfile
 		self.objfile  = objfile
+		self.points   = kwargs.get('points')
+		self.keyIndices = kwargs.get('keyIndices')
+		self.groupSize = kwargs.get('groupSize', 0)
+		self.checkCancel = kwargs.get('checkCancel')
 		
 		self.width = kwargs.get('width', self.WIDTH)
 		self.height = kwargs.get('height', self.HEIGHT)
@@ -73,9 +100,23 @@ class ChanToAction(object):
 		"""
 		convert() -> string 
 		Generates the .action output and returns a string
+		
+		Each call renders into its own copy of the converter, so an
+		instance can be reused, or shared by several threads, without
+		its output or memory carrying over between calls.
+		"""
+		job = copy.copy(self)
+		job.__result = []
+		
+		return job._convert()
+	
+	def _convert(self):
+		"""
+		Renders the .action output on a per-call copy. See convert()
 		"""
 		self.__cDate = strftime("%a %b %d %H:%M:%S %Y ", localtime())
-		self.__sourceLines = open(self.chanfile, 'r').readlines()
+		self.__frames, self.__columns = self._getSourceColumns()
+		self.__keyHeads = {}
 		self.__childCount = 0
 		
 		result = self.__result
@@ -174,9 +215,9 @@ class ChanToAction(object):
 		result.append( "FramePixelFormat "+str(self.framePixelFormat)+"\n")	
 		result.append( "FrameAspectRatio "+str(self.frameAspectRatio)+"\n")
 		result.append( "FrameDominance 2\n\n")	
-		result.append( "\tMinFrame " + (self.__sourceLines[0].split())[0] + "\n")
-		result.append( "\tCurrentFrame " + (self.__sourceLines[(len(self.__sourceLines)-1)].split())[0] + "\n") # i will use the last frame
-		result.append( "\tMaxFrames " + str(len(self.__sourceLines)) + "\n")
+		result.append( "\tMinFrame " + self.__frames[0] + "\n")
+		result.append( "\tCurrentFrame " + self.__frames[-1] + "\n") # i will use the last frame
+		result.append( "\tMaxFrames " + str(len(self.__frames)) + "\n")
 		result.append( "\tShadingMode no\n" )
 		result.append( "\tTextureMode yes\n" )
 		result.append( "\tWireframeMode no\n" )
@@ -324,47 +365,84 @@ class ChanToAction(object):
 		"""
 		Builds a block of info representing channel data 
 		"""
+		if self.checkCancel:
+			self.checkCancel()
+		
 		result = self.__result
-		sourceFileLines = self.__sourceLines
+		frames = self.__frames
+		column = self.__columns[Attr]
 		if globalScale == None:
 			globalScale = self.scale
 		
 		result.append( prefix+"Channel " +discAttr +"\n" )
-	
-		if (Attr == "tx") :
-			attributeToRead = 1
-		if (Attr == "ty") :
-			attributeToRead = 2
-		if (Attr == "tz") : 
-			attributeToRead = 3
-		if (Attr == "rx") : 
-			attributeToRead = 4
-		if (Attr == "ry") : 
-			attributeToRead = 5
-		if (Attr == "rz") : 
-			attributeToRead = 6
-		if (Attr == "fov") : 
-			attributeToRead = 7
-		
 		result.append( prefix+"\tExtrapolation constant\n")
-		tempS = sourceFileLines[(len(sourceFileLines)-1)].split()
 	
 		# here since i used the first frame for current frame i will use the value for the first frame
-		result.append( prefix+"\tValue "+ str(float(tempS[attributeToRead]) * globalScale) +"\n" ) 
-		result.append( prefix+"\tSize "+str(len(sourceFileLines))+"\n" )
+		result.append( prefix+"\tValue "+ str(float(column[-1]) * globalScale) +"\n" ) 
+		
+		interpolation = "hermite"
+		keyHeads = None
+		
+		if self.keyIndices is not None and Attr in self.keyIndices:
+			indices = self.keyIndices[Attr]
+			frames = [frames[i] for i in indices]
+			column = [float(column[i]) for i in indices]
+			interpolation = "linear"
+		else:
+			# the key and frame lines are the same for every full channel
+			keyHeads = self.__keyHeads.get(prefix)
+		
+		values = self._scaleColumn(column, globalScale)
+		
+		result.append( prefix+"\tSize "+str(len(frames))+"\n" )
 		result.append( prefix+"\tKeyVersion 1\n" )
-		key = 0
-		#loop that goes through all lines and parses specified text
-		for line in sourceFileLines:
-			tempS = line.split()
-			result.append( prefix+"\tKey "+str(key)+"\n" )
-			result.append( prefix+"\t\tFrame "+tempS[0]+"\n" )	
-			result.append( prefix+"\t\tValue "+(str(float(tempS[attributeToRead]) * globalScale))+"\n")
-			result.append( prefix+"\t\tInterpolation hermite\n" )
-			result.append( prefix+"\t\tEnd\n" )
-			key = key + 1
+		
+		if keyHeads is None:
+			keyHead = prefix + "\tKey %d\n" + prefix + "\t\tFrame %s\n" + prefix + "\t\tValue "
+			keyHeads = [keyHead % (key, frame) for key, frame in enumerate(frames)]
+			if interpolation == "hermite":
+				self.__keyHeads[prefix] = keyHeads
+		
+		keyTail = "\n" + prefix + "\t\tInterpolation " + interpolation + "\n" + prefix + "\t\tEnd\n"
+		
+		result.extend([head + value + keyTail for head, value in zip(keyHeads, values)])
 			
 		result.append( prefix+"\tEnd\n" )
+	
+	def _getSourceColumns(self):
+		"""
+		Returns the chan file as (list frames, dict columns), where frames
+		are the frame numbers as strings, and columns maps each channel 
+		name (tx, ty, tz, rx, ry, rz, fov) to its list of values. Each line
+		is only split once, or the columns of a parsed ChanFile are used directly.
+		"""
+		if isinstance(self.chanfile, basestring):
+			fh = open(self.chanfile, 'r')
+			rows = [line.split() for line in fh if line.strip()]
+			fh.close()
+			
+			values = zip(*rows)
+			frames = list(values[0])
+			columns = dict((name, [float(v) for v in values[i+1]]) 
+							for i, name in enumerate(self.CHANNELS))
+			return frames, columns
+		
+		source = self.chanfile.getColumns()
+		frames = [str(f) for f in source['frame'].tolist()]
+		columns = dict((name, source[name]) for name in self.CHANNELS)
+		
+		return frames, columns
+	
+	def _scaleColumn(self, column, scale):
+		"""
+		Returns the values of a column multiplied by scale, 
+		formatted as strings, in a single pass over the column.
+		"""
+		if numpy is not None and isinstance(column, numpy.ndarray):
+			# tolist() so the values are formatted as python floats
+			return map(str, (column * scale).tolist())
+		
+		return [str(v * scale) for v in column]
 		
 	def _outputSingleValue(self, prefix, discAttr, value ):
 		"""
@@ -466,28 +544,32 @@ class ChanToAction(object):
 		if not self.objfile:
 			return
 		
-		data = open(self.objfile).readlines()
-		if not data or data[0] != '## OBJ file generated by Nuke ##\n':
-			raise Exception("%s is not a nuke-generated obj" % self.objfile)
-		
-		filtered = [line.strip() for line in data if line.startswith('v ')]
-		
-		pointData = []
-		for line in filtered:
-			try:
-				x,y,z = line.split()[1:]
-			except:
-				continue
-			pointData.append((x,y,z))
+		points = self.points
+		if points is None:
+			points = self._readObjPoints()
+		pointData = [points[i:i+3] for i in xrange(0, len(points) - 2, 3)]
 		
 		total = len(pointData)
 		if not total:
 			return
 		
-		nodeNum = 2
-		childrenIds = range(nodeNum+1, nodeNum+1+total)
+		groups, first = [], 0
+		if self.groupSize:
+			groups, first = groupHierarchy(total, self.groupSize)
 		
-		pointCloud = self._getAxisString('PointCloudAxis', nodeNum, childs=childrenIds)
+		# the node numbers of the children of the cloud and of each group
+		nodeNum = 2
+		pointsNum = nodeNum + 1 + len(groups)
+		childrenIds = defaultdict(list)
+		for n, parent in enumerate(groups):
+			childrenIds[parent].append(nodeNum + 1 + n)
+		for i in xrange(total):
+			parent = None
+			if groups:
+				parent = first + i * (len(groups) - first) // total
+			childrenIds[parent].append(pointsNum + i)
+		
+		pointCloud = self._getAxisString('PointCloudAxis', nodeNum, childs=childrenIds[None])
 		self.__result.append(pointCloud+'\n')
 		nodeNum += 1
 		
@@ -496,11 +578,29 @@ class ChanToAction(object):
 		firstX = xVals[0]
 		firstY = yVal
 		
+		for n in xrange(len(groups)):
+			if self.checkCancel:
+				self.checkCancel()
+			
+			axis = self._getAxisString('pointGroup%iAxis' % (n+1), nodeNum, 
+										xPos=xVals[0], yPos=yVal, 
+										childs=childrenIds[n])
+			
+			self.__result.append(axis+'\n')
+			nodeNum += 1
+			
+			xVals.rotate(-1)
+			if xVals[0] == firstX:
+				yVal += firstY
+		
 		for x,y,z in pointData:
+			if self.checkCancel:
+				self.checkCancel()
+			
 			x = float(x) * self.scale
 			y = float(y) * self.scale
 			z = float(z) * self.scale
-			axis = self._getAxisString('point%iAxis' % (nodeNum-2), nodeNum, 
+			axis = self._getAxisString('point%iAxis' % (nodeNum-pointsNum+1), nodeNum, 
 										x=x, y=y, z=z,
 										xPos=xVals[0], yPos=yVal)
 		
@@ -512,6 +612,16 @@ class ChanToAction(object):
 				yVal += firstY
 		
 
+	def _readObjPoints(self):
+		"""
+		Reads the objfile, returning its points as a flat array
+		of x,y,z positions
+		"""
+		# imported here, as the core package imports the templates
+		from core.objfile import readObjPoints
+		return readObjPoints(self.objfile)
+		
+
 	def _getAxisString(self, name, id, x=0, y=0, z=0, xPos=0, yPos=0, childs=[]):
 		"""
 		Builds the individual axis block info from given values.
@@ -25,17 +25,26 @@ Written by: Justin Israel
 
 class ChanToTerragen(object):
 	
-	def __init__(self, chanObject, data, scale=1.0):
+	def __init__(self, chanObject, data, scale=1.0, checkCancel=None):
+		"""
+			ChanFile chanObject - parsed chan file
+			dict data - template values
+			float scale - scales translate by given amount
+			callable checkCancel - optional, called for each frame written.
+								   It raises to stop the conversion
+		"""
 		self.__chanObject = chanObject
 		self.__data = data.copy()
 		self.scale = scale
+		self.checkCancel = checkCancel
 	
 	
 	def convert(self):
 		""" """
-		self.__data['keyData'] = self.__chanObject.getKeyData()
+		data = self.__data.copy()
+		data['keyData'] = self.__chanObject.getKeyData()
 
-		rendered = self.getTemplate(self.__data)
+		rendered = self.getTemplate(data)
 		
 		return rendered
 		
@@ -658,6 +667,9 @@ class ChanToTerragen(object):
 		scale = self.scale
 		
 		for frame in sorted(keys):
+			if self.checkCancel:
+				self.checkCancel()
+			
 			attribs = keyData[frame]
 			
 			x,y,z = attribs['tx'], attribs['ty'], attribs['tz']
@@ -0,0 +1,769 @@
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+Written by: Justin Israel
+			justinisrael@gmail.com
+			justinfx.com
+
+"""
+
+import re, zlib
+from struct import pack, unpack, calcsize
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+from templates import fbx_template
+from templates.pointgroups import groupHierarchy
+
+
+FBX_VERSION = 7400
+
+# arrays smaller than this are not worth compressing
+COMPRESS_MIN_SIZE = 128
+
+# Fixed header and footer values. The FBX SDK checks the file id
+# and creation time against the footer id, so these must go together.
+HEADER_MAGIC  = 'Kaydara FBX Binary\x20\x20\x00\x1a\x00'
+FILE_ID		  = '\x28\xb3\x2a\xeb\xb6\x24\xcc\xc2\xbf\xc8\xb0\x2a\xa9\x2b\xfc\xf1'
+CREATION_TIME = '1970-01-01 10:00:00:000'
+FOOTER_ID	  = '\xfa\xbc\xab\x09\xd0\xc8\xd4\x66\xb1\x76\xfb\x83\x1c\xf7\x26\x7e'
+FOOTER_MAGIC  = '\xf8\x5a\x8c\x6a\xde\xf5\xd9\x7e\xec\xe9\x0c\xe3\x75\x8f\x29\x0b'
+
+NULL_RECORD = '\x00' * 13
+
+# nodes that always end with a NULL_RECORD, even when empty
+ALWAYS_NULL_RECORD = ('AnimationStack', 'AnimationLayer')
+
+# KeyAttrFlags for linear interpolation, matching the 'L' keys of the ascii format
+KEY_LINEAR = 0x00000004
+
+# FbxTime::EMode values for the common frame rates. Anything else is custom.
+TIME_MODES = {120 : 1, 100 : 2, 60 : 3, 50 : 4, 48 : 5, 30 : 6, 25 : 10, 24 : 11, 96 : 15, 72 : 16}
+TIME_MODE_CUSTOM = 14
+
+# Properties60 type -> Properties70 (type, label)
+PROPERTY_TYPES = {
+	'Vector3D'	: ('Vector3D', 'Vector'),
+	'Vector'	: ('Vector3D', 'Vector'),
+	'Vector2D'	: ('Vector2D', 'Vector2'),
+	'double'	: ('double', 'Number'),
+	'int'		: ('int', 'Integer'),
+	'Color'		: ('ColorRGB', 'Color'),
+	'ColorRGB'	: ('ColorRGB', 'Color'),
+}
+
+INT_PROPERTY_TYPES = ('bool', 'enum', 'int')
+
+
+class Array(object):
+	"""
+	A typed array property value.
+
+		str typecode - one of 'f' (float32), 'd' (double), 'i' (int32),
+					   'l' (int64) or 'b' (bool)
+		values - sequence of numbers
+	"""
+
+	FORMATS = {'f' : 'f', 'd' : 'd', 'i' : 'i', 'l' : 'q', 'b' : 'B'}
+	DTYPES  = {'f' : '<f4', 'd' : '<f8', 'i' : '<i4', 'l' : '<i8', 'b' : 'u1'}
+
+	def __init__(self, typecode, values):
+		self.typecode = typecode
+		self.values = values
+
+	def tostring(self):
+		""" Returns the values packed as little-endian binary data """
+		if numpy is not None:
+			return numpy.asarray(self.values, dtype=self.DTYPES[self.typecode]).tostring()
+
+		return pack('<%d%s' % (len(self.values), self.FORMATS[self.typecode]), *self.values)
+
+
+class Int64(long):
+	""" An integer property value to be written as int64 ('L') rather than int32 """
+
+
+class Raw(str):
+	""" A string property value to be written as raw bytes ('R') """
+
+
+class FbxNode(object):
+	"""
+	A node record of a binary FBX file: a name, a list of property values
+	and a list of child nodes.
+
+	Property values are typed by their python type:
+		bool  - 'C'
+		int   - 'I'
+		Int64 - 'L'
+		float - 'D'
+		str	  - 'S'
+		Raw	  - 'R'
+		Array - 'f', 'd', 'i', 'l' or 'b'
+	"""
+
+	def __init__(self, name, *props):
+		self.name = name
+		self.props = props
+		self.children = []
+
+	def add(self, name, *props):
+		"""
+		add(str name, *props) -> FbxNode
+
+		Creates, appends and returns a new child node
+		"""
+		child = FbxNode(name, *props)
+		self.children.append(child)
+		return child
+
+	def addNode(self, node):
+		""" Appends an existing node as a child, and returns it """
+		self.children.append(node)
+		return node
+
+	def encode(self, offset, compress=True):
+		"""
+		encode(int offset, bool compress=True) -> str
+
+		Returns the binary node record, for a node starting at the given
+		absolute file offset. Arrays are zlib compressed if compress is True.
+		"""
+		props = ''.join([encodeProperty(p, compress) for p in self.props])
+
+		end = offset + 13 + len(self.name) + len(props)
+
+		children = []
+		for child in self.children:
+			data = child.encode(end, compress)
+			children.append(data)
+			end += len(data)
+
+		if self.children or not self.props or self.name in ALWAYS_NULL_RECORD:
+			children.append(NULL_RECORD)
+			end += len(NULL_RECORD)
+
+		header = pack('<IIIB', end, len(self.props), len(props), len(self.name))
+
+		return '%s%s%s%s' % (header, self.name, props, ''.join(children))
+
+
+def encodeProperty(value, compress=True):
+	"""
+	encodeProperty(value, bool compress=True) -> str
+
+	Returns the binary record for a single property value
+	"""
+	if isinstance(value, Array):
+		data = value.tostring()
+		encoding = 0
+		if compress and len(data) >= COMPRESS_MIN_SIZE:
+			data = zlib.compress(data)
+			encoding = 1
+		return value.typecode + pack('<III', len(value.values), encoding, len(data)) + data
+
+	if isinstance(value, bool):
+		return 'C' + (value and '\x01' or '\x00')
+
+	if isinstance(value, Int64):
+		return 'L' + pack('<q', value)
+
+	if isinstance(value, (int, long)):
+		return 'I' + pack('<i', value)
+
+	if isinstance(value, float):
+		return 'D' + pack('<d', value)
+
+	if isinstance(value, Raw):
+		return 'R' + pack('<I', len(value)) + value
+
+	if isinstance(value, basestring):
+		value = str(value)
+		return 'S' + pack('<I', len(value)) + value
+
+	raise TypeError("Unsupported FBX property value: %r" % (value,))
+
+
+def decodeNodes(data):
+	"""
+	decodeNodes(str data) -> list
+
+	Parses a binary FBX file written by iterTemplate() back into its
+	top level FbxNode objects, the reverse of FbxNode.encode(). Arrays
+	are read back as Array values, and strings as str.
+	"""
+	if not data.startswith(HEADER_MAGIC):
+		raise ValueError("Not a binary FBX file")
+
+	def decodeNode(offset):
+		end, numProps, propsSize, nameSize = unpack('<IIIB', data[offset:offset+13])
+		if not end:
+			return None, offset + 13
+
+		offset += 13
+		node = FbxNode(data[offset:offset+nameSize])
+		offset += nameSize
+
+		props = []
+		for i in xrange(numProps):
+			typecode = data[offset]
+			offset += 1
+			if typecode in Array.FORMATS:
+				count, encoding, size = unpack('<III', data[offset:offset+12])
+				values = data[offset+12:offset+12+size]
+				if encoding:
+					values = zlib.decompress(values)
+				fmt = '<%d%s' % (count, Array.FORMATS[typecode])
+				props.append(Array(typecode, list(unpack(fmt, values))))
+				offset += 12 + size
+			elif typecode in 'SR':
+				size = unpack('<I', data[offset:offset+4])[0]
+				props.append(data[offset+4:offset+4+size])
+				offset += 4 + size
+			else:
+				fmt = '<' + {'C' : 'B', 'I' : 'i', 'L' : 'q', 'D' : 'd'}[typecode]
+				value = unpack(fmt, data[offset:offset+calcsize(fmt)])[0]
+				if typecode == 'C':
+					value = bool(value)
+				props.append(value)
+				offset += calcsize(fmt)
+		node.props = tuple(props)
+
+		while offset < end:
+			child, offset = decodeNode(offset)
+			if child is None:
+				break
+			node.addNode(child)
+
+		return node, end
+
+	nodes = []
+	offset = len(HEADER_MAGIC) + 4
+	while True:
+		node, offset = decodeNode(offset)
+		if node is None:
+			return nodes
+		nodes.append(node)
+
+
+def objectName(name, className):
+	""" Returns the binary form of an object name, ie 'camera1\\x00\\x01Model' """
+	return '%s\x00\x01%s' % (name, className)
+
+
+def templateProperties(template):
+	"""
+	templateProperties(str template) -> list
+
+	Parses the rendered 'Property:' lines of an ascii template,
+	such as cameraType() or nullType(), returning a list of
+	(name, type, flags, values) tuples in the Properties70 form.
+	"""
+	properties = []
+
+	for name, propType, flags, values in re.findall(r'Property: "(.*?)", "(.*?)", "(.*?)",?(.*)', template):
+		propType, label = PROPERTY_TYPES.get(propType, (propType, ''))
+		flags = flags.replace('N', '')
+
+		values = [v for v in values.strip().split(',') if v]
+		if propType in INT_PROPERTY_TYPES:
+			values = [int(float(v)) for v in values]
+		else:
+			values = [float(v) for v in values]
+
+		properties.append((name, propType, label, flags, values))
+
+	return properties
+
+
+def propertiesNode(properties):
+	""" Returns a Properties70 node for a list of (name, type, label, flags, values) """
+	node = FbxNode('Properties70')
+	for name, propType, label, flags, values in properties:
+		node.add('P', name, propType, label, flags, *values)
+	return node
+
+
+def splitProperties(properties, lastModelProperty='Visibility'):
+	"""
+	Splits a Properties60 style list of properties into the ones that
+	belong to the Model and the ones that belong to its NodeAttribute
+	in FBX 7. The ascii templates list all the transform properties first,
+	ending with lastModelProperty.
+	"""
+	names = [p[0] for p in properties]
+	i = names.index(lastModelProperty) + 1
+	return properties[:i], properties[i:]
+
+
+def getTimeMode(fps):
+	""" Returns the GlobalSettings TimeMode for a frame rate """
+	if float(fps) == int(fps):
+		return TIME_MODES.get(int(fps), TIME_MODE_CUSTOM)
+	return TIME_MODE_CUSTOM
+
+
+class Patch(object):
+	"""
+	A chunk of iterTemplate() output that overwrites bytes already
+	yielded, at an absolute file offset. See writeChunks()
+	"""
+
+	def __init__(self, offset, data):
+		self.offset = offset
+		self.data = data
+
+
+def writeChunks(fh, chunks):
+	"""
+	writeChunks(file fh, chunks) -> void
+
+	Writes the chunks of iterTemplate() to a seekable binary file,
+	opened at its start, applying each Patch to the bytes already written.
+	"""
+	for chunk in chunks:
+		if isinstance(chunk, Patch):
+			end = fh.tell()
+			fh.seek(chunk.offset)
+			fh.write(chunk.data)
+			fh.seek(end)
+		else:
+			fh.write(chunk)
+
+
+class NodeStream(object):
+	"""
+	Encodes node records one at a time, keeping track of the file offset,
+	so that nodes with many children never need to be held in memory.
+	"""
+
+	def __init__(self, offset, compress=True):
+		"""
+		__init__(int offset, bool compress=True)
+
+			int offset - absolute file offset of the first node
+			bool compress - zlib compress arrays
+		"""
+		self.offset = offset
+		self.compress = compress
+
+	def encode(self, node):
+		""" Returns the binary record of a whole FbxNode, at the current offset """
+		data = node.encode(self.offset, self.compress)
+		self.offset += len(data)
+		return data
+
+	def iterNode(self, node, children):
+		"""
+		iterNode(FbxNode node, children) -> generator
+
+		Yields the record of a node with the FbxNodes of children after
+		its own, encoded as they are consumed. The node's end offset is
+		written as 0 and filled in by a Patch, yielded last.
+		"""
+		start = self.offset
+		props = ''.join([encodeProperty(p, self.compress) for p in node.props])
+
+		yield pack('<IIIB', 0, len(node.props), len(props), len(node.name)) + node.name + props
+		self.offset += 13 + len(node.name) + len(props)
+
+		for child in node.children:
+			yield self.encode(child)
+		for child in children:
+			yield self.encode(child)
+
+		yield NULL_RECORD
+		self.offset += len(NULL_RECORD)
+
+		yield Patch(start, pack('<I', self.offset))
+
+
+class Scene(object):
+	"""
+	The nodes of a binary FBX 7.4 scene. The Objects and Connections,
+	which hold a node or two per point, are built one at a time as
+	they are iterated.
+
+		dict data - values used to render the ascii fbx_template, plus
+					fbxTime_start and fbxTime_end
+		str objectType - 'null' or 'camera'
+		keyTimes - FBX time of every animation key
+		curves - list of (str nodeName, str property, list channels), where
+				 channels is a list of (str channel, sequence values).
+				 ie ('T', 'Lcl Translation', [('X', [...]), ('Y', [...]), ('Z', [...])])
+				 A channel may also be (str channel, values, keyTimes), for
+				 curves keyed at their own times rather than at every keyTimes
+		points - flat x, y, z positions of point cloud locators
+		int meshSize - if not 0, the points are written as the vertices of
+					   meshes of up to meshSize points, instead of locators
+		int groupSize - if not 0, the locators or meshes are parented to a
+						tree of 'pointGroupN' nulls of up to groupSize children,
+						see pointgroups.groupHierarchy()
+		float scale - scales the point positions as they are written, so
+					  the points are never copied
+	"""
+
+	# the id of the first object
+	FIRST_ID = 1000000
+
+	def __init__(self, data, objectType='null', keyTimes=(), curves=(), points=(), meshSize=0, 
+				 groupSize=0, scale=1.0):
+		self.data = data
+		self.objectType = objectType
+		self.keyTimes = Array('l', keyTimes)
+		self.curves = curves
+		self.points = points
+		self.meshSize = meshSize
+		self.scale = scale
+
+		if objectType == 'camera':
+			self.name, self.className = 'camera1', 'Camera'
+			template = fbx_template.cameraType() % data
+		else:
+			self.name, self.className = 'null1', 'Null'
+			template = fbx_template.nullType() % {'name' : self.name, 'x' : 0, 'y' : 0, 'z' : 0}
+
+		self.modelProps, self.attributeProps = splitProperties(templateProperties(template))
+
+		self.start = Int64(data['fbxTime_start'])
+		self.end = Int64(data['fbxTime_end'])
+
+		self.numPoints = len(points) // 3
+		self.childCount = meshSize and -(-self.numPoints // meshSize) or self.numPoints
+		self.groups, self.first = [], 0
+		if self.numPoints and groupSize:
+			self.groups, self.first = groupHierarchy(self.childCount, groupSize)
+
+		# object ids are numbered in the order the objects are written
+		ids = self.FIRST_ID
+		self.modelId, self.attributeId = Int64(ids), Int64(ids + 1)
+		ids += 2
+		if self.numPoints:
+			self.cloudId, self.nullId = Int64(ids), Int64(ids + 1)
+			self.firstGroupId = ids + 2
+			self.firstChildId = self.firstGroupId + len(self.groups)
+			ids = self.firstChildId + self.childCount * (meshSize and 2 or 1)
+		self.stackId, self.layerId = Int64(ids), Int64(ids + 1)
+		self.firstCurveId = ids + 2
+		self.documentId = Int64(self.firstCurveId + sum([1 + len(channels) for n, p, channels in curves]))
+
+	def getCounts(self):
+		""" Returns the number of objects of each node type """
+		counts = {'Model' : 1, 'NodeAttribute' : 1, 'AnimationStack' : 1, 'AnimationLayer' : 1}
+		if self.numPoints:
+			counts['NodeAttribute'] += 1
+			counts['Model'] += 1 + len(self.groups) + self.childCount
+			if self.meshSize:
+				counts['Geometry'] = self.childCount
+		if self.curves:
+			counts['AnimationCurveNode'] = len(self.curves)
+			counts['AnimationCurve'] = sum([len(channels) for n, p, channels in self.curves])
+		return counts
+
+	def _getParentId(self, i):
+		""" Returns the id of the parent of point cloud child i """
+		if not self.groups:
+			return self.cloudId
+		groups, first = self.groups, self.first
+		return Int64(self.firstGroupId + first + i * (len(groups) - first) // self.childCount)
+
+	def _getGroupIds(self):
+		""" Yields (groupId, parentId) for each point group """
+		for n, parent in enumerate(self.groups):
+			parentId = self.cloudId
+			if parent is not None:
+				parentId = Int64(self.firstGroupId + parent)
+			yield Int64(self.firstGroupId + n), parentId
+
+	def _iterCurves(self):
+		""" Yields (curveNodeId, nodeName, propName, [(curveId, curveData), ...]) for each curve """
+		ids = self.firstCurveId
+		for nodeName, propName, channels in self.curves:
+			curveNodeId = Int64(ids)
+			ids += 1
+			curveIds = [Int64(i) for i in xrange(ids, ids + len(channels))]
+			ids += len(channels)
+			yield curveNodeId, nodeName, propName, zip(curveIds, channels)
+
+	def getHeaderNodes(self):
+		""" Returns the top level nodes before the Objects """
+		data = self.data
+
+		header = FbxNode('FBXHeaderExtension')
+		header.add('FBXHeaderVersion', 1003)
+		header.add('FBXVersion', FBX_VERSION)
+		header.add('EncryptionType', 0)
+		timeStamp = header.add('CreationTimeStamp')
+		timeStamp.add('Version', 1000)
+		for key in ('Year', 'Month', 'Day', 'Hour', 'Minute', 'Second'):
+			timeStamp.add(key, int(data['date_%s' % key.lower()]))
+		timeStamp.add('Millisecond', 0)
+		header.add('Creator', 'cmiVFX.com & JustinFX.com: AtomSplitter')
+
+		# settings
+		fps = data['fps']
+		start, end = self.start, self.end
+		settings = FbxNode('GlobalSettings')
+		settings.add('Version', 1000)
+		settings.addNode(propertiesNode([('UpAxis', 'int', 'Integer', '', [1]),
+										 ('UpAxisSign', 'int', 'Integer', '', [1]),
+										 ('FrontAxis', 'int', 'Integer', '', [2]),
+										 ('FrontAxisSign', 'int', 'Integer', '', [1]),
+										 ('CoordAxis', 'int', 'Integer', '', [0]),
+										 ('CoordAxisSign', 'int', 'Integer', '', [1]),
+										 ('UnitScaleFactor', 'double', 'Number', '', [1.0]),
+										 ('TimeMode', 'enum', '', '', [getTimeMode(fps)]),
+										 ('TimeSpanStart', 'KTime', 'Time', '', [start]),
+										 ('TimeSpanStop', 'KTime', 'Time', '', [end]),
+										 ('CustomFrameRate', 'double', 'Number', '', [float(fps)])]))
+
+		documents = FbxNode('Documents')
+		documents.add('Count', 1)
+		document = documents.add('Document', self.documentId, 'Scene', 'Scene')
+		document.add('RootNode', Int64(0))
+
+		counts = self.getCounts()
+		definitions = FbxNode('Definitions')
+		definitions.add('Version', 100)
+		definitions.add('Count', sum(counts.values()) + 1)
+		definitions.add('ObjectType', 'GlobalSettings').add('Count', 1)
+		for nodeType in ('Model', 'NodeAttribute', 'Geometry', 'AnimationStack', 'AnimationLayer',
+						 'AnimationCurveNode', 'AnimationCurve'):
+			if nodeType in counts:
+				definitions.add('ObjectType', nodeType).add('Count', counts[nodeType])
+
+		return [header,
+				FbxNode('FileId', Raw(FILE_ID)),
+				FbxNode('CreationTime', CREATION_TIME),
+				FbxNode('Creator', 'cmiVFX.com & JustinFX.com: AtomSplitter'),
+				settings,
+				documents,
+				FbxNode('References'),
+				definitions]
+
+	def iterObjects(self):
+		""" Yields the children of the Objects node, one object at a time """
+		name, className = self.name, self.className
+
+		# main object
+		attribute = FbxNode('NodeAttribute', self.attributeId, objectName(name, 'NodeAttribute'), className)
+		attribute.addNode(propertiesNode(self.attributeProps))
+		attribute.add('TypeFlags', className)
+		if self.objectType == 'camera':
+			attribute.add('GeometryVersion', 124)
+			attribute.add('Position', 0.0, 0.0, -50.0)
+			attribute.add('Up', 0.0, 1.0, 0.0)
+			attribute.add('LookAt', 0.0, 0.0, -1.0)
+			attribute.add('ShowInfoOnMoving', 1)
+			attribute.add('ShowAudio', 0)
+			attribute.add('AudioColor', 0.0, 1.0, 0.0)
+			attribute.add('CameraOrthoZoom', 1.0)
+		yield attribute
+
+		model = FbxNode('Model', self.modelId, objectName(name, 'Model'), className)
+		model.add('Version', 232)
+		model.addNode(propertiesNode(self.modelProps))
+		model.add('Shading', True)
+		model.add('Culling', 'CullingOff')
+		yield model
+
+		# point cloud, as locators sharing a single null attribute, or as meshes
+		if self.numPoints:
+			null = FbxNode('NodeAttribute', self.nullId, objectName('PointCloud', 'NodeAttribute'), 'Null')
+			null.add('TypeFlags', 'Null')
+			yield null
+
+			yield nullModel(self.cloudId, 'PointCloud')
+
+			for n, (groupId, parentId) in enumerate(self._getGroupIds()):
+				yield nullModel(groupId, 'pointGroup%d' % (n+1))
+
+			points, scale = self.points, self.scale
+			numPoints = self.numPoints
+
+			if self.meshSize:
+				size = self.meshSize * 3
+				for n, i in enumerate(xrange(0, numPoints * 3, size)):
+					meshName = 'pointMesh%d' % (n+1)
+					vertices = points[i:min(i + size, numPoints * 3)]
+					if scale != 1.0:
+						vertices = [val * scale for val in vertices]
+
+					geometry = FbxNode('Geometry', Int64(self.firstChildId + n * 2), 
+									   objectName(meshName, 'Geometry'), 'Mesh')
+					geometry.add('Vertices', Array('d', vertices))
+					geometry.add('PolygonVertexIndex', Array('i', []))
+					geometry.add('GeometryVersion', 124)
+					yield geometry
+
+					mesh = FbxNode('Model', Int64(self.firstChildId + n * 2 + 1), 
+								   objectName(meshName, 'Model'), 'Mesh')
+					mesh.add('Version', 232)
+					mesh.add('Shading', True)
+					mesh.add('Culling', 'CullingOff')
+					yield mesh
+
+			else:
+				for i in xrange(numPoints):
+					locator = FbxNode('Model', Int64(self.firstChildId + i), 
+									  objectName('locator%d' % (i+1), 'Model'), 'Null')
+					locator.add('Version', 232)
+					locator.add('Properties70').add('P', 'Lcl Translation', 'Lcl Translation', '', 'A',
+													float(points[i*3]) * scale, 
+													float(points[i*3+1]) * scale, 
+													float(points[i*3+2]) * scale)
+					locator.add('Shading', True)
+					locator.add('Culling', 'CullingOff')
+					yield locator
+
+		# animation
+		stack = FbxNode('AnimationStack', self.stackId, objectName('Take 001', 'AnimStack'), '')
+		stack.addNode(propertiesNode([('LocalStart', 'KTime', 'Time', '', [self.start]),
+									  ('LocalStop', 'KTime', 'Time', '', [self.end]),
+									  ('ReferenceStart', 'KTime', 'Time', '', [self.start]),
+									  ('ReferenceStop', 'KTime', 'Time', '', [self.end])]))
+		yield stack
+		yield FbxNode('AnimationLayer', self.layerId, objectName('BaseLayer', 'AnimLayer'), '')
+
+		for curveNodeId, nodeName, propName, channels in self._iterCurves():
+			defaults = [('d|%s' % c[0], 'Number', '', 'A', [float(c[1][0])]) for i, c in channels]
+			curveNode = FbxNode('AnimationCurveNode', curveNodeId, objectName(nodeName, 'AnimCurveNode'), '')
+			curveNode.addNode(propertiesNode(defaults))
+			yield curveNode
+
+			for curveId, curveData in channels:
+				channel, values = curveData[:2]
+				times = self.keyTimes
+				if len(curveData) > 2:
+					times = Array('l', curveData[2])
+
+				curve = FbxNode('AnimationCurve', curveId, objectName('', 'AnimCurve'), '')
+				curve.add('Default', float(values[0]))
+				curve.add('KeyVer', 4008)
+				curve.add('KeyTime', times)
+				curve.add('KeyValueFloat', Array('f', values))
+				curve.add('KeyAttrFlags', Array('i', [KEY_LINEAR]))
+				curve.add('KeyAttrDataFloat', Array('f', [0.0, 0.0, 0.0, 0.0]))
+				curve.add('KeyAttrRefCount', Array('i', [len(values)]))
+				yield curve
+
+	def iterConnections(self):
+		""" Yields the children of the Connections node, one connection at a time """
+		modelId, attributeId = self.modelId, self.attributeId
+
+		yield FbxNode('C', 'OO', attributeId, modelId)
+		yield FbxNode('C', 'OO', modelId, Int64(0))
+
+		if self.numPoints:
+			nullId, cloudId = self.nullId, self.cloudId
+			yield FbxNode('C', 'OO', nullId, cloudId)
+			yield FbxNode('C', 'OO', cloudId, Int64(0))
+
+			for groupId, parentId in self._getGroupIds():
+				yield FbxNode('C', 'OO', nullId, groupId)
+				yield FbxNode('C', 'OO', groupId, parentId)
+
+			if self.meshSize:
+				for n in xrange(self.childCount):
+					geometryId = Int64(self.firstChildId + n * 2)
+					meshId = Int64(self.firstChildId + n * 2 + 1)
+					yield FbxNode('C', 'OO', geometryId, meshId)
+					yield FbxNode('C', 'OO', meshId, self._getParentId(n))
+			else:
+				for i in xrange(self.numPoints):
+					locatorId = Int64(self.firstChildId + i)
+					yield FbxNode('C', 'OO', nullId, locatorId)
+					yield FbxNode('C', 'OO', locatorId, self._getParentId(i))
+
+		yield FbxNode('C', 'OO', self.layerId, self.stackId)
+
+		# curves animate the property where it lives, ie FocalLength is on the camera attribute
+		attributeNames = set(p[0] for p in self.attributeProps)
+
+		for curveNodeId, nodeName, propName, channels in self._iterCurves():
+			yield FbxNode('C', 'OO', curveNodeId, self.layerId)
+			yield FbxNode('C', 'OP', curveNodeId, 
+						  propName in attributeNames and attributeId or modelId, propName)
+
+			for curveId, curveData in channels:
+				yield FbxNode('C', 'OP', curveId, curveNodeId, 'd|%s' % curveData[0])
+
+	def getTakes(self):
+		""" Returns the Takes node, the last of the scene """
+		takes = FbxNode('Takes')
+		takes.add('Current', 'Take 001')
+		take = takes.add('Take', 'Take 001')
+		take.add('FileName', 'Take_001.tak')
+		take.add('LocalTime', self.start, self.end)
+		take.add('ReferenceTime', self.start, self.end)
+		return takes
+
+
+def nullModel(modelId, name):
+	""" Returns the Model node of a null without properties, such as a point group """
+	model = FbxNode('Model', modelId, objectName(name, 'Model'), 'Null')
+	model.add('Version', 232)
+	model.add('Shading', True)
+	model.add('Culling', 'CullingOff')
+	return model
+
+
+def iterTemplate(data, objectType='null', keyTimes=(), curves=(), points=(), meshSize=0, groupSize=0, 
+				 scale=1.0, compress=True):
+	"""
+	iterTemplate(dict data, str objectType='null', ..., bool compress=True) -> generator
+
+	Binary counterpart of fbx_template.iterTemplate(). Yields a binary FBX 7.4
+	file in pieces: the header, each top level node, with the Objects and 
+	Connections one child at a time, and the footer. See Scene for the
+	arguments. Packed arrays are zlib compressed if compress is True.
+	
+	The end offsets of the Objects and Connections are only known once
+	they are written, so they are yielded as Patch chunks. The output 
+	must be written with writeChunks().
+	"""
+	scene = Scene(data, objectType, keyTimes, curves, points, meshSize, groupSize, scale)
+
+	yield HEADER_MAGIC + pack('<I', FBX_VERSION)
+	stream = NodeStream(len(HEADER_MAGIC) + 4, compress)
+
+	for node in scene.getHeaderNodes():
+		yield stream.encode(node)
+
+	for chunk in stream.iterNode(FbxNode('Objects'), scene.iterObjects()):
+		yield chunk
+
+	for chunk in stream.iterNode(FbxNode('Connections'), scene.iterConnections()):
+		yield chunk
+
+	yield stream.encode(scene.getTakes())
+
+	yield NULL_RECORD
+	offset = stream.offset + len(NULL_RECORD)
+
+	# footer, padded to a 16 byte boundary
+	footer = FOOTER_ID + '\x00' * 4
+	offset += len(footer)
+	padding = ((offset + 15) & ~15) - offset
+	if not padding:
+		padding = 16
+
+	yield footer + '\x00' * padding + pack('<I', FBX_VERSION) + '\x00' * 120 + FOOTER_MAGIC
@@ -38,21 +38,87 @@ def getTemplate(objectType = 'null', objectData=[]):
 		return ""
 	
 		
+	# collect the pieces and join them once, so building the
+	# template stays linear in the number of objects
+	objectList = [objectdata]
 	connectionList = []
 	connectionList.append('\tConnect: "OO", "Model::%s", "Model::Scene"' % objectName)
 	
 	if objectData:
 		
 		for thisData in objectData:
-			objectdata = "%s\n%s" % (objectdata, thisData['data'])
+			objectList.append(thisData['data'])
 			connectionList.append('\tConnect: "OO", "Model::%(name)s", "Model::%(parent)s"' % \
 									{'name' : thisData['name'], 
 									 'parent' : thisData.get('parent', 'Scene')})
 	
+	objectdata = '\n'.join(objectList)
 	connections = '\n'.join(connectionList)
 	
 	# main template
-	template = """
+	template = headerSection() + objectdata + settingsSection() + connections + \
+			   takesSection() + '%(animationData)s' + footerSection()
+	
+	return template.replace('\n\t\t', '\n').lstrip()
+
+
+def iterTemplate(data, objectType = 'null', objectData=(), animationData=()):
+	""" 
+	Generator version of getTemplate(), rendered with the given data.
+	
+	Yields the FBX file in pieces, in order, so it can be streamed
+	straight to a file object without building the whole document
+	in memory.
+	
+		dict data - values used to render the template sections
+		str objectType - 'null' or 'camera'
+		objectData - re-iterable of dicts with 'name', 'parent' and 'data' keys,
+					 as passed to getTemplate(). It is walked twice, once for
+					 the Objects section and once for the Connections section.
+		animationData - iterable of lines for the 'Models animation' section
+	"""
+	
+	if objectType == 'null':
+		objectdata = nullType()
+		objectName = "null1"
+	
+	elif objectType == 'camera':
+		objectdata = cameraType()
+		objectName = "camera1"
+   
+	else:
+		return
+	
+	# objects
+	yield (headerSection() + objectdata).replace('\n\t\t', '\n').lstrip() % data
+	
+	for thisData in objectData:
+		yield '\n%s' % thisData['data'].replace('\n\t\t', '\n')
+	
+	yield settingsSection().replace('\n\t\t', '\n') % data
+	
+	# connections
+	yield '\tConnect: "OO", "Model::%s", "Model::Scene"' % objectName
+	
+	for thisData in objectData:
+		yield '\n\tConnect: "OO", "Model::%(name)s", "Model::%(parent)s"' % \
+									{'name' : thisData['name'], 
+									 'parent' : thisData.get('parent', 'Scene')}
+	
+	# animation
+	yield takesSection().replace('\n\t\t', '\n') % data
+	
+	lineterm = ''
+	for line in animationData:
+		yield lineterm + line
+		lineterm = '\n'
+	
+	yield footerSection().replace('\n\t\t', '\n') % data
+
+
+def headerSection():
+	""" FBX header, definitions, and the opening of the Objects section """
+	data = """
 		; FBX 6.1.0 project file
 		; Created by AtomSplitter (cmiVFX.com & JustinFX.com)
 		; 
@@ -110,8 +176,13 @@ def getTemplate(objectType = 'null', objectData=[]):
 		;------------------------------------------------------------------
 		
 		Objects:  {  
-		""" + objectdata + \
 		"""
+	return data
+
+
+def settingsSection():
+	""" GlobalSettings object, closing Objects and opening Connections """
+	data = """
 			GlobalSettings:  {
 				Version: 1000
 				Properties60:  {
@@ -130,8 +201,13 @@ def getTemplate(objectType = 'null', objectData=[]):
 		;------------------------------------------------------------------
 		
 		Connections:  {
-		""" + connections + \
 		"""
+	return data
+
+
+def takesSection():
+	""" Closes Connections and opens the Takes section, up to the animation data """
+	data = """
 		}
 		;Takes and animation section
 		;----------------------------------------------------
@@ -145,7 +221,13 @@ def getTemplate(objectType = 'null', objectData=[]):
 				
 				;Models animation
 				;----------------------------------------------------
-				%(animationData)s
+				"""
+	return data
+
+
+def footerSection():
+	""" Closes the Takes section and adds the Version5 settings """
+	data = """
 			}
 		}
 		;Version 5 settings
@@ -178,9 +260,8 @@ def getTemplate(objectType = 'null', objectData=[]):
 			}
 		}
 
-	""" 
-	
-	return template.replace('\n\t\t', '\n').lstrip()
+	"""
+	return data
 
 
 def cameraType():
@@ -454,5 +535,94 @@ def nullType():
 	return data
 
 
-
-
+def meshType():
+	""" Vertex-only mesh model, used for point clouds """
+	data = """
+			Model: "Model::%(name)s", "Mesh" {
+				Version: 232
+				Properties60:  {
+					Property: "QuaternionInterpolate", "bool", "",0
+					Property: "RotationOffset", "Vector3D", "",0,0,0
+					Property: "RotationPivot", "Vector3D", "",0,0,0
+					Property: "ScalingOffset", "Vector3D", "",0,0,0
+					Property: "ScalingPivot", "Vector3D", "",0,0,0
+					Property: "TranslationActive", "bool", "",0
+					Property: "TranslationMin", "Vector3D", "",0,0,0
+					Property: "TranslationMax", "Vector3D", "",0,0,0
+					Property: "TranslationMinX", "bool", "",0
+					Property: "TranslationMinY", "bool", "",0
+					Property: "TranslationMinZ", "bool", "",0
+					Property: "TranslationMaxX", "bool", "",0
+					Property: "TranslationMaxY", "bool", "",0
+					Property: "TranslationMaxZ", "bool", "",0
+					Property: "RotationOrder", "enum", "",0
+					Property: "RotationSpaceForLimitOnly", "bool", "",0
+					Property: "RotationStiffnessX", "double", "",0
+					Property: "RotationStiffnessY", "double", "",0
+					Property: "RotationStiffnessZ", "double", "",0
+					Property: "AxisLen", "double", "",10
+					Property: "PreRotation", "Vector3D", "",0,0,0
+					Property: "PostRotation", "Vector3D", "",0,0,0
+					Property: "RotationActive", "bool", "",1
+					Property: "RotationMin", "Vector3D", "",0,0,0
+					Property: "RotationMax", "Vector3D", "",0,0,0
+					Property: "RotationMinX", "bool", "",0
+					Property: "RotationMinY", "bool", "",0
+					Property: "RotationMinZ", "bool", "",0
+					Property: "RotationMaxX", "bool", "",0
+					Property: "RotationMaxY", "bool", "",0
+					Property: "RotationMaxZ", "bool", "",0
+					Property: "InheritType", "enum", "",1
+					Property: "ScalingActive", "bool", "",0
+					Property: "ScalingMin", "Vector3D", "",0,0,0
+					Property: "ScalingMax", "Vector3D", "",0,0,0
+					Property: "ScalingMinX", "bool", "",0
+					Property: "ScalingMinY", "bool", "",0
+					Property: "ScalingMinZ", "bool", "",0
+					Property: "ScalingMaxX", "bool", "",0
+					Property: "ScalingMaxY", "bool", "",0
+					Property: "ScalingMaxZ", "bool", "",0
+					Property: "GeometricTranslation", "Vector3D", "",0,0,0
+					Property: "GeometricRotation", "Vector3D", "",0,0,0
+					Property: "GeometricScaling", "Vector3D", "",1,1,1
+					Property: "MinDampRangeX", "double", "",0
+					Property: "MinDampRangeY", "double", "",0
+					Property: "MinDampRangeZ", "double", "",0
+					Property: "MaxDampRangeX", "double", "",0
+					Property: "MaxDampRangeY", "double", "",0
+					Property: "MaxDampRangeZ", "double", "",0
+					Property: "MinDampStrengthX", "double", "",0
+					Property: "MinDampStrengthY", "double", "",0
+					Property: "MinDampStrengthZ", "double", "",0
+					Property: "MaxDampStrengthX", "double", "",0
+					Property: "MaxDampStrengthY", "double", "",0
+					Property: "MaxDampStrengthZ", "double", "",0
+					Property: "PreferedAngleX", "double", "",0
+					Property: "PreferedAngleY", "double", "",0
+					Property: "PreferedAngleZ", "double", "",0
+					Property: "LookAtProperty", "object", ""
+					Property: "UpVectorProperty", "object", ""
+					Property: "Show", "bool", "",1
+					Property: "NegativePercentShapeSupport", "bool", "",1
+					Property: "DefaultAttributeIndex", "int", "",0
+					Property: "Freeze", "bool", "",0
+					Property: "LODBox", "bool", "",0
+					Property: "Lcl Translation", "Lcl Translation", "A+",0,0,0
+					Property: "Lcl Rotation", "Lcl Rotation", "A+",0,0,0
+					Property: "Lcl Scaling", "Lcl Scaling", "A+",1,1,1
+					Property: "Visibility", "Visibility", "A+",1
+					Property: "Color", "ColorRGB", "N",0.8,0.8,0.8
+					Property: "Primary Visibility", "bool", "N",1
+					Property: "Casts Shadows", "bool", "N",0
+					Property: "Receive Shadows", "bool", "N",0
+				}
+				MultiLayer: 0
+				MultiTake: 1
+				Shading: Y
+				Culling: "CullingOff"
+				Vertices: %(vertices)s
+				PolygonVertexIndex: 
+				GeometryVersion: 124
+			}
+			"""
+	return data
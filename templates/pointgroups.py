@@ -0,0 +1,63 @@
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+Written by: Justin Israel
+			justinisrael@gmail.com
+			justinfx.com
+
+Grouping of point cloud children, shared by the writers of the
+grouped point cloud hierarchy and by core.pointcloud.
+"""
+
+
+def groupHierarchy(count, groupSize):
+	"""
+	groupHierarchy(int count, int groupSize) -> (list groups, int first)
+	
+	Groups count items, such as core.pointcloud.mortonOrder() points,
+	into a balanced tree of groups of at most groupSize children each.
+	Each group holds a run of consecutive items, or of consecutive 
+	groups of the level below, split as evenly as possible.
+	
+	Returns groups, the index of the parent group of each group, or 
+	None for the groups directly under the root, listed top level first
+	so that parents come before their children. Item i is a child of 
+	group first + i * (len(groups) - first) // count. groups is empty 
+	if no more than groupSize items need grouping.
+	"""
+	if groupSize < 2:
+		raise ValueError("Point groups need room for at least 2 children, got %d" % groupSize)
+	
+	# the number of members of each level, from the items up
+	levels = [count]
+	while levels[-1] > groupSize:
+		levels.append(-(-levels[-1] // groupSize))
+	
+	groups = []
+	first = 0
+	parents = None
+	for level in xrange(len(levels) - 1, 0, -1):
+		members = levels[level]
+		if parents is None:
+			groups.extend([None] * members)
+		else:
+			groups.extend([first + i * parents // members for i in xrange(members)])
+		first = len(groups) - members
+		parents = members
+	
+	return groups, first
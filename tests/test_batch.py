@@ -0,0 +1,155 @@
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+
+Checks of batch conversion in core.batch.
+
+Usage:
+	python -m unittest discover -s tests -t .
+"""
+
+import os, shutil, tempfile, unittest
+import multiprocessing
+
+from core import expandChanFiles, batchConvert
+from core.batch import _initQueueWorker, _queueConvert
+from benchmarks.synthetic import writeChan
+
+
+class TestBatch(unittest.TestCase):
+
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp()
+		os.mkdir(self.path('shots'))
+		os.mkdir(self.path('shots', 'sub'))
+		
+		self.chanFiles = [self.path('shots', 'a.chan'), self.path('shots', 'b.CHAN'), 
+						  self.path('shots', 'sub', 'c.chan')]
+		for seed, chanFile in enumerate(self.chanFiles):
+			writeChan(chanFile, 20, seed=seed)
+		
+		fh = open(self.path('shots', 'notes.txt'), 'w')
+		fh.write('not a chan file')
+		fh.close()
+
+	def tearDown(self):
+		shutil.rmtree(self.tempDir)
+
+	def path(self, *names):
+		return os.path.join(self.tempDir, *names)
+
+	def testExpandDirectory(self):
+		self.assertEqual(expandChanFiles([self.path('shots')]), self.chanFiles)
+
+	def testExpandGlobAndManifest(self):
+		manifest = self.path('manifest.txt')
+		fh = open(manifest, 'w')
+		fh.write('# shots\n\n%s\n  %s  \n' % (self.chanFiles[2], self.chanFiles[0]))
+		fh.close()
+		
+		chanFiles = expandChanFiles([self.path('shots', '*.chan'), self.chanFiles[0]], manifest=manifest)
+		self.assertEqual(chanFiles, [self.chanFiles[0], self.chanFiles[2]])
+
+	def convert(self, jobs):
+		missing = self.path('shots', 'missing.chan')
+		finished = []
+		results = batchConvert(self.chanFiles + [missing], jobs=jobs, callback=finished.append, format='fbx,action')
+		
+		self.assertEqual(finished, results)
+		self.assertEqual(sorted(r[0] for r in results), sorted(self.chanFiles + [missing]))
+		
+		for chanFile, written, error, seconds in results:
+			if chanFile == missing:
+				self.assertEqual(written, None)
+				self.assertTrue('does not exist' in error)
+				continue
+			
+			base = os.path.splitext(chanFile)[0]
+			self.assertEqual(error, None)
+			self.assertEqual(written, [base + '.fbx', base + '.action'])
+			for name in written:
+				self.assertTrue(os.path.isfile(name))
+
+	def testConvertInProcess(self):
+		self.convert(1)
+
+	def testConvertPool(self):
+		self.convert(2)
+
+	def testCallbackErrorStopsPool(self):
+		def callback(result):
+			raise RuntimeError("stop")
+		
+		self.assertRaises(RuntimeError, batchConvert, self.chanFiles, jobs=2, callback=callback)
+
+
+class TestQueueConvert(unittest.TestCase):
+
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp()
+		self.chanFile = os.path.join(self.tempDir, 'a.chan')
+		writeChan(self.chanFile, 50)
+		
+		self.messages = multiprocessing.Queue()
+		self.cancelFlag = multiprocessing.RawValue('b', 0)
+		self.pool = multiprocessing.Pool(2, _initQueueWorker, (self.messages, self.cancelFlag))
+
+	def tearDown(self):
+		self.pool.close()
+		self.pool.join()
+		shutil.rmtree(self.tempDir)
+
+	def convert(self, *jobs):
+		""" Runs (key, chanFile) jobs in the pool, returning key -> list of messages """
+		results = [self.pool.apply_async(_queueConvert, ((key, chanFile, {'format' : 'fbx'}, ''),)) 
+				   for key, chanFile in jobs]
+		for result in results:
+			result.get(30)
+		
+		messages = dict((key, []) for key, chanFile in jobs)
+		done = 0
+		while done < len(jobs):
+			message = self.messages.get(timeout=30)
+			messages[message[1]].append(message)
+			done += message[0] != 'progress'
+		return messages
+
+	def testMessages(self):
+		missing = os.path.join(self.tempDir, 'missing.chan')
+		messages = self.convert((1, self.chanFile), (2, missing))
+		
+		self.assertEqual(messages[1][-1], ('converted', 1, os.path.join(self.tempDir, 'a.fbx')))
+		progress = [message[2:] for message in messages[1][:-1]]
+		self.assertEqual(set(message[0] for message in messages[1][:-1]), set(['progress']))
+		self.assertEqual(progress[0], ('parse', 0.0))
+		self.assertEqual(progress[-1], ('write', 1.0))
+		# only changes of percent are sent
+		self.assertEqual(len(progress), len(set((stage, int(fraction * 100)) for stage, fraction in progress)))
+		
+		self.assertEqual(messages[2][-1][:2], ('failed', 2))
+		self.assertTrue('does not exist' in messages[2][-1][2])
+
+	def testCancelled(self):
+		self.cancelFlag.value = 1
+		messages = self.convert((1, self.chanFile))
+		self.assertEqual(messages[1][-1], ('cancelled', 1))
+		self.assertFalse(os.path.exists(os.path.join(self.tempDir, 'a.fbx')))
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,117 @@
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+
+
+Checks of the synthetic shots and the scaling suite in benchmarks.
+
+Usage:
+	python -m unittest discover -s tests -t .
+"""
+
+import os, shutil, tempfile, unittest
+
+from core import ChanFile
+from core.objfile import readObjPoints
+from benchmarks import suite
+from benchmarks.synthetic import makeShot, writeChan, writeObj
+
+
+class BenchmarkTestCase(unittest.TestCase):
+
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.tempDir)
+
+	def path(self, name):
+		return os.path.join(self.tempDir, name)
+
+	def read(self, filename):
+		fh = open(filename, 'rb')
+		try:
+			return fh.read()
+		finally:
+			fh.close()
+
+
+class TestSynthetic(BenchmarkTestCase):
+
+	def testDeterministic(self):
+		for chanType in ('camera', 'null'):
+			writeChan(self.path('a.chan'), 100, chanType, seed=3)
+			writeChan(self.path('b.chan'), 100, chanType, seed=3)
+			self.assertEqual(self.read(self.path('a.chan')), self.read(self.path('b.chan')))
+		
+		writeObj(self.path('a.obj'), 100, seed=3)
+		writeObj(self.path('b.obj'), 100, seed=3)
+		self.assertEqual(self.read(self.path('a.obj')), self.read(self.path('b.obj')))
+		
+		writeChan(self.path('b.chan'), 100, seed=4)
+		writeObj(self.path('b.obj'), 100, seed=4)
+		self.assertNotEqual(self.read(self.path('a.chan')), self.read(self.path('b.chan')))
+		self.assertNotEqual(self.read(self.path('a.obj')), self.read(self.path('b.obj')))
+
+	def testShot(self):
+		chanFile, objFile = makeShot(self.tempDir, 120, points=40, chanType='null')
+		chan = ChanFile(chanFile)
+		self.assertEqual(chan.getType(), 'null')
+		self.assertEqual(chan.getFrameRange(), (1, 120))
+		
+		points = readObjPoints(objFile)
+		self.assertEqual(len(points), 120)
+		self.assertTrue(max(abs(p) for p in points) <= 10.0)
+		
+		# reused, rather than written again
+		os.utime(chanFile, (1000, 1000))
+		self.assertEqual(makeShot(self.tempDir, 120, points=40, chanType='null'), (chanFile, objFile))
+		self.assertEqual(os.path.getmtime(chanFile), 1000)
+		
+		self.assertEqual(makeShot(self.tempDir, 10)[1], '')
+
+
+class TestSuite(BenchmarkTestCase):
+
+	def testSweep(self):
+		seen = []
+		results = suite.sweep([20], [0, 10], formats=('fbx', 'action'), callback=seen.append)
+		self.assertEqual(results, seen)
+		
+		# nulls only convert to fbx
+		self.assertEqual([suite.caseKey(r) for r in results], 
+						 [('camera', 20, 0, 'fbx'), ('camera', 20, 0, 'action'),
+						  ('camera', 20, 10, 'fbx'), ('camera', 20, 10, 'action'),
+						  ('null', 20, 0, 'fbx'), ('null', 20, 10, 'fbx')])
+		for result in results:
+			self.assertFalse('error' in result, result)
+			self.assertTrue(result['wall'] >= 0 and result['outputBytes'] > 0)
+		
+		self.assertTrue(results[2]['outputBytes'] > results[0]['outputBytes'])
+
+	def testResultsFile(self):
+		results = suite.sweep([20], [0], formats=('fbxbin',), types=('camera',))
+		suite.writeResults(self.path('results.json'), results)
+		
+		loaded = suite.loadResults(self.path('results.json'))
+		self.assertEqual(loaded.keys(), [('camera', 20, 0, 'fbxbin')])
+		self.assertEqual(loaded.values()[0]['outputBytes'], results[0]['outputBytes'])
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,166 @@
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+
+
+Checks of the on-disk parse cache in core.cache.
+
+Usage:
+	python -m unittest discover -s tests -t .
+"""
+
+import os, shutil, tempfile, time, unittest
+
+from core import cache, chanfile
+from core import ChanFile, ChanConvert, ParseCache
+from core.objfile import readObjPoints
+from benchmarks.synthetic import makeShot, writeChan
+
+
+def pythonOnly(func):
+	""" Runs func with numpy hidden from core.cache and core.chanfile """
+	def wrapper(*args, **kwargs):
+		saved = cache.numpy, chanfile.numpy
+		cache.numpy = chanfile.numpy = None
+		try:
+			return func(*args, **kwargs)
+		finally:
+			cache.numpy, chanfile.numpy = saved
+	return wrapper
+
+
+class CountingCache(ParseCache):
+	""" ParseCache counting its hits and misses """
+	
+	def __init__(self, *args, **kwargs):
+		ParseCache.__init__(self, *args, **kwargs)
+		self.hits = self.misses = 0
+	
+	def load(self, key):
+		result = ParseCache.load(self, key)
+		if result:
+			self.hits += 1
+		else:
+			self.misses += 1
+		return result
+
+
+class TestParseCache(unittest.TestCase):
+
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp()
+		self.cache = CountingCache(self.path('cache'))
+		self.chanFile, self.objFile = makeShot(self.tempDir, 50, points=200)
+
+	def tearDown(self):
+		shutil.rmtree(self.tempDir)
+
+	def path(self, name):
+		return os.path.join(self.tempDir, name)
+
+	def columns(self, chanFile, cache=None):
+		""" Returns the parsed columns as lists """
+		columns = ChanFile(chanFile, cache=cache).getColumns()
+		return dict((name, list(values)) for name, values in columns.iteritems())
+
+	def testStoreLoad(self):
+		self.cache.store('key', 'test', [[1.0, 2.5], [3.0, -4.0]])
+		kind, columns = self.cache.load('key')
+		self.assertEqual(kind, 'test')
+		self.assertEqual([list(c) for c in columns], [[1.0, 2.5], [3.0, -4.0]])
+		self.assertEqual(self.cache.load('missing'), None)
+
+	def testChanHit(self):
+		expected = self.columns(self.chanFile)
+		
+		self.assertEqual(self.columns(self.chanFile, self.cache), expected)
+		self.assertEqual((self.cache.hits, self.cache.misses), (0, 1))
+		
+		self.assertEqual(self.columns(self.chanFile, self.cache), expected)
+		self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+		self.assertEqual(ChanFile(self.chanFile, cache=self.cache).getType(), 'camera')
+
+	def testChanNullType(self):
+		chanFile = self.path('null.chan')
+		writeChan(chanFile, 20, 'null')
+		ChanFile(chanFile, cache=self.cache).parse()
+		
+		chan = ChanFile(chanFile, cache=self.cache)
+		self.assertEqual(chan.getType(), 'null')
+		self.assertEqual(self.cache.hits, 1)
+
+	def testEditedFileMisses(self):
+		self.columns(self.chanFile, self.cache)
+		
+		writeChan(self.chanFile, 30, seed=1)
+		
+		self.assertEqual(self.columns(self.chanFile, self.cache), self.columns(self.chanFile))
+		self.assertEqual((self.cache.hits, self.cache.misses), (0, 2))
+
+	def testCorruptEntryMisses(self):
+		key = self.cache.getKey(self.chanFile)
+		self.columns(self.chanFile, self.cache)
+		
+		entry = os.path.join(self.cache.cacheDir, key + ParseCache.EXTENSION)
+		fh = open(entry, 'r+b')
+		fh.truncate(os.path.getsize(entry) - 8)
+		fh.close()
+		
+		self.assertEqual(self.columns(self.chanFile, self.cache), self.columns(self.chanFile))
+		self.assertEqual((self.cache.hits, self.cache.misses), (0, 2))
+
+	def testObjPoints(self):
+		expected = list(readObjPoints(self.objFile))
+		
+		for i in xrange(2):
+			points = ChanConvert(self.chanFile, objFile=self.objFile, cache=self.cache).getObjPoints()
+			self.assertEqual(list(points), expected)
+		self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+	def testNumpyMatchesPython(self):
+		expected = self.columns(self.chanFile)
+		
+		# entries written with numpy are read without, and the other way
+		self.columns(self.chanFile, self.cache)
+		self.assertEqual(pythonOnly(self.columns)(self.chanFile, self.cache), expected)
+		
+		self.cache.clear()
+		pythonOnly(self.columns)(self.chanFile, self.cache)
+		self.assertEqual(self.columns(self.chanFile, self.cache), expected)
+		self.assertEqual(self.cache.hits, 2)
+
+	def testEvictsLeastRecentlyUsed(self):
+		for i, key in enumerate(('old', 'used', 'new')):
+			self.cache.store(key, 'test', [[float(i)] * 100])
+			entry = os.path.join(self.cache.cacheDir, key + ParseCache.EXTENSION)
+			os.utime(entry, (time.time() - 100 + i, time.time() - 100 + i))
+		
+		entrySize = self.cache.size() / 3
+		self.cache.load('old')
+		
+		self.assertEqual(self.cache.evict(entrySize * 2), 1)
+		self.assertEqual(self.cache.load('used'), None)
+		self.assertNotEqual(self.cache.load('old'), None)
+		self.assertNotEqual(self.cache.load('new'), None)
+		
+		self.cache.clear()
+		self.assertEqual(self.cache.size(), 0)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,123 @@
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+
+
+Checks of the .action writer in templates.chan2action.
+
+Usage:
+	python -m unittest discover -s tests -t .
+"""
+
+import re, shutil, tempfile, unittest
+
+from core import chanfile, ChanFile
+from templates import chan2action
+from templates.chan2action import ChanToAction
+from benchmarks.synthetic import makeShot
+
+
+def pythonOnly(func):
+	""" Runs func with numpy hidden from templates.chan2action and core.chanfile """
+	def wrapper(*args, **kwargs):
+		saved = chan2action.numpy, chanfile.numpy
+		chan2action.numpy = chanfile.numpy = None
+		try:
+			return func(*args, **kwargs)
+		finally:
+			chan2action.numpy, chanfile.numpy = saved
+	return wrapper
+
+
+def convert(chanFile, **kwargs):
+	""" Returns the .action output of a ChanToAction, without its dates """
+	text = ChanToAction(chanFile, **kwargs).convert()
+	return re.sub(r'CreationDate [^\n]*', 'CreationDate', text)
+
+
+def getChannels(text):
+	""" Returns the first channel of each name in .action output, as {name : (keys, interpolations)} """
+	channels = {}
+	name = keys = None
+	for line in text.splitlines():
+		words = line.split()
+		if words[:1] == ['Channel'] and len(words) == 2:
+			name, keys, interpolations = words[1], [], set()
+		elif name and words[:1] == ['Frame']:
+			keys.append([int(words[1])])
+		elif name and keys and words[:1] == ['Value']:
+			keys[-1].append(float(words[1]))
+		elif name and words[:1] == ['Interpolation']:
+			interpolations.add(words[1])
+		elif name and words == ['End'] and line.count('\t') == 3:
+			channels.setdefault(name, (keys, interpolations))
+			name = None
+	return channels
+
+
+class TestChanToAction(unittest.TestCase):
+
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp()
+		self.chanFile, self.objFile = makeShot(self.tempDir, 40)
+
+	def tearDown(self):
+		shutil.rmtree(self.tempDir)
+
+	def testChannelValues(self):
+		columns = ChanFile(self.chanFile).getColumns()
+		channels = getChannels(convert(self.chanFile))
+		
+		frames = list(columns['frame'])
+		for name, attr, scale in (('position/x', 'tx', 100), ('rotation/y', 'ry', -1), ('fov', 'fov', 1)):
+			keys, interpolations = channels[name]
+			self.assertEqual([key[0] for key in keys], frames)
+			for key, value in zip(keys, columns[attr]):
+				self.assertAlmostEqual(key[1], value * scale, 9)
+			self.assertEqual(interpolations, set(['hermite']))
+
+	def testParsedMatchesFile(self):
+		expected = convert(self.chanFile)
+		self.assertEqual(convert(ChanFile(self.chanFile)), expected)
+		
+		# the converter can be reused
+		converter = ChanToAction(ChanFile(self.chanFile))
+		self.assertEqual(converter.convert(), converter.convert())
+
+	def testNumpyMatchesPython(self):
+		expected = convert(ChanFile(self.chanFile))
+		self.assertEqual(pythonOnly(lambda: convert(ChanFile(self.chanFile)))(), expected)
+		self.assertEqual(pythonOnly(convert)(self.chanFile), expected)
+
+	def testReducedChannels(self):
+		columns = ChanFile(self.chanFile).getColumns()
+		indices = [0, 10, 39]
+		text = convert(ChanFile(self.chanFile), keyIndices={'tx' : indices})
+		channels = getChannels(text)
+		
+		keys, interpolations = channels['position/x']
+		self.assertEqual(keys, [[columns['frame'][i], columns['tx'][i] * 100] for i in indices])
+		self.assertEqual(interpolations, set(['linear']))
+		
+		# the other channels keep every key
+		self.assertEqual(len(channels['position/y'][0]), 40)
+		self.assertEqual(channels['position/y'][1], set(['hermite']))
+
+
+if __name__ == "__main__":
+	unittest.main()
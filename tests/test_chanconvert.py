@@ -0,0 +1,410 @@
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+
+Checks of ChanConvert's writers, on synthetic shots from 
+benchmarks.synthetic.
+
+Usage:
+	python -m unittest discover -s tests -t .
+"""
+
+import os, re, shutil, tempfile, threading, unittest
+from datetime import datetime
+
+from core import chanfile, chanconvert, ChanConvert, ConvertCancelled
+from templates import fbx_binary
+from benchmarks.synthetic import makeShot
+
+
+def pythonOnly(func):
+	""" Runs func with numpy hidden from core.chanconvert """
+	def wrapper(*args, **kwargs):
+		saved = chanconvert.numpy
+		chanconvert.numpy = None
+		try:
+			return func(*args, **kwargs)
+		finally:
+			chanconvert.numpy = saved
+	return wrapper
+
+
+class ConvertTestCase(unittest.TestCase):
+
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.tempDir)
+
+	def path(self, name):
+		return os.path.join(self.tempDir, name)
+
+	def read(self, filename, mode='r'):
+		fh = open(filename, mode)
+		try:
+			return fh.read()
+		finally:
+			fh.close()
+
+
+class TestStreamingFbx(ConvertTestCase):
+
+	def fbxData(self, converter):
+		""" Returns the template data of ascii FBX output, as ChanConvert._write() renders it """
+		data = converter._getData()
+		fps = data['fps']
+		data.update(fbxTime_start=converter.getFbxTime(data['start'], fps),
+					fbxTime_end=converter.getFbxTime(data['finish'], fps),
+					filmWidth=data['filmWidth'] / 25.4,
+					filmHeight=data['filmHeight'] / 25.4,
+					rotationOrder=4)
+		return data
+
+	def testMatchesTemplate(self):
+		chanFile, objFile = makeShot(self.tempDir, 50, points=20)
+		converter = ChanConvert(chanFile, objFile=objFile)
+		
+		data = self.fbxData(converter)
+		streamed = ''.join(converter.iterFbx(data))
+		
+		data['animationData'] = converter.keyDataToString()
+		self.assertEqual(streamed, converter.getTemplate(data))
+
+	def testWrittenFile(self):
+		chanFile, objFile = makeShot(self.tempDir, 50, points=20)
+		converter = ChanConvert(chanFile, objFile=objFile)
+		
+		written = converter.writeFbx(self.path('out.fbx'))
+		self.assertEqual(written, self.path('out.fbx'))
+		
+		text = self.read(written)
+		self.assertTrue(text.startswith('; FBX'))
+		self.assertEqual(text.count('Model: "Model::locator'), 20)
+		self.assertTrue(text.endswith('\n'))
+
+	def testFailedWriteKeepsFile(self):
+		chanFile, objFile = makeShot(self.tempDir, 50, points=20)
+		outFile = self.path('out.fbx')
+		fh = open(outFile, 'w')
+		fh.write('previous')
+		fh.close()
+		
+		def progress(stage, fraction):
+			if stage == 'write':
+				raise ConvertCancelled()
+		
+		for outFormat in ('fbx', 'fbxbin'):
+			converter = ChanConvert(chanFile, objFile=objFile, format=outFormat)
+			self.assertRaises(ConvertCancelled, converter.writeFbx, outFile, progress=progress)
+			self.assertEqual(self.read(outFile), 'previous')
+			self.assertEqual(os.listdir(self.tempDir).count('out.fbx'), 1)
+			self.assertFalse([name for name in os.listdir(self.tempDir) if name.endswith('.tmp')])
+
+	def testBinaryPointsScaled(self):
+		chanFile, objFile = makeShot(self.tempDir, 10, points=5)
+		points = ChanConvert(chanFile, objFile=objFile).getObjPoints()
+		
+		converter = ChanConvert(chanFile, objFile=objFile, format='fbxbin', scaleValue=2.0)
+		nodes = fbx_binary.decodeNodes(self.read(converter.writeFbx(self.path('out.fbx')), 'rb'))
+		objects = [node for node in nodes if node.name == 'Objects'][0].children
+		
+		locators = [node for node in objects if node.props[1].startswith('locator')]
+		self.assertEqual(len(locators), 5)
+		for i, locator in enumerate(locators):
+			translate = locator.children[1].children[0].props[4:]
+			self.assertEqual(translate, tuple(val * 2.0 for val in points[i*3:i*3+3]))
+
+
+class TestPointMesh(ConvertTestCase):
+
+	def convert(self, outFormat, **kwargs):
+		""" Returns the converter and written file of an 11 point shot, in meshes of 4 points """
+		chanFile, objFile = makeShot(self.tempDir, 10, points=11)
+		converter = ChanConvert(chanFile, objFile=objFile, format=outFormat, pointCloud='mesh', **kwargs)
+		converter.POINTS_PER_MESH = 4
+		return converter, converter.writeFbx(self.path('out.fbx'))
+
+	def testAscii(self):
+		converter, written = self.convert('fbx', scaleValue=2.0)
+		points = converter.getObjPoints()
+		text = self.read(written)
+		
+		self.assertEqual(text.count('Model: "Model::locator'), 0)
+		self.assertEqual(text.count(', "Mesh" {'), 3)
+		self.assertTrue('Connect: "OO", "Model::pointMesh3", "Model::PointCloud"' in text)
+		
+		vertices = []
+		for line in text.splitlines():
+			if line.strip().startswith('Vertices:'):
+				vertices.extend(float(val) for val in line.split(':', 1)[1].split(','))
+		self.assertEqual(vertices, [val * 2.0 for val in points])
+
+	def testBinary(self):
+		converter, written = self.convert('fbxbin', scaleValue=2.0)
+		points = converter.getObjPoints()
+		nodes = fbx_binary.decodeNodes(self.read(written, 'rb'))
+		objects = [node for node in nodes if node.name == 'Objects'][0].children
+		
+		self.assertFalse([node for node in objects if node.props[1].startswith('locator')])
+		meshes = [node for node in objects if node.name == 'Model' and node.props[2] == 'Mesh']
+		self.assertEqual([node.props[1].split('\x00')[0] for node in meshes], 
+						 ['pointMesh1', 'pointMesh2', 'pointMesh3'])
+		
+		vertices = []
+		for node in objects:
+			if node.name == 'Geometry':
+				vertices.extend(node.children[0].props[0].values)
+		self.assertEqual(vertices, [val * 2.0 for val in points])
+
+	def testUnknownMode(self):
+		chanFile, objFile = makeShot(self.tempDir, 10)
+		self.assertRaises(ValueError, ChanConvert, chanFile, pointCloud='spheres')
+
+
+class FixedDatetime(datetime):
+	""" datetime whose now() never changes, so output stamped with it can be compared """
+	
+	@classmethod
+	def now(cls):
+		return cls(2010, 1, 2, 3, 4, 5)
+
+
+class TestSharedConverter(ConvertTestCase):
+
+	FORMATS = 'fbx,fbxbin,action,terragen'
+
+	def setUp(self):
+		ConvertTestCase.setUp(self)
+		chanconvert.datetime = FixedDatetime
+
+	def tearDown(self):
+		chanconvert.datetime = datetime
+		ConvertTestCase.tearDown(self)
+
+	def outputs(self, written):
+		""" Returns the contents of written files, without the .action dates """
+		return [re.sub(r'CreationDate [^\n]*', 'CreationDate', self.read(name, 'rb')) for name in written]
+
+	def testThreadsMatchSingle(self):
+		chanFile, objFile = makeShot(self.tempDir, 50, points=30)
+		expected = self.outputs(ChanConvert(chanFile, objFile=objFile, format=self.FORMATS)
+								.writeAll(self.path('single.out'), threaded=False))
+		
+		converter = ChanConvert(chanFile, objFile=objFile, format=self.FORMATS, reduce=0.01)
+		reduced = self.outputs(converter.writeAll(self.path('reduced.out'), threaded=False))
+		converter = ChanConvert(chanFile, objFile=objFile, format=self.FORMATS, reduce=0.01)
+		
+		results = {}
+		def run(n):
+			if n % 2:
+				results[n] = converter.writeAll(self.path('thread%d.out' % n))
+			else:
+				results[n] = ChanConvert(chanFile, objFile=objFile, format=self.FORMATS).writeAll(
+								self.path('thread%d.out' % n), threaded=False)
+		
+		threads = [threading.Thread(target=run, args=(n,)) for n in xrange(12)]
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+		
+		self.assertEqual(len(results), 12)
+		for n, written in results.iteritems():
+			self.assertEqual(self.outputs(written), n % 2 and reduced or expected)
+
+	def testSetFps(self):
+		chanFile, objFile = makeShot(self.tempDir, 50)
+		converter = ChanConvert(chanFile)
+		
+		times = converter.getKeyTimes()
+		converter.setFps(48)
+		self.assertEqual(list(converter.getKeyTimes()), [t // 2 for t in times])
+		
+		threads = [threading.Thread(target=converter.setFps, args=(fps,)) for fps in (24, 30, 24)]
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+		self.assertEqual(list(converter.getKeyTimes()), list(times))
+
+
+class TestCancel(ConvertTestCase):
+
+	FORMATS = ('fbx', 'fbxbin', 'action', 'terragen')
+
+	def counter(self, limit=None):
+		""" Returns a cancelled() callback, counting its calls, that cancels after limit calls """
+		calls = []
+		def cancelled():
+			calls.append(None)
+			return limit is not None and len(calls) > limit
+		cancelled.calls = calls
+		return cancelled
+
+	def testCheckedAsWritten(self):
+		chanFile, objFile = makeShot(self.tempDir, 200, points=100)
+		
+		for outFormat in self.FORMATS:
+			cancelled = self.counter()
+			ChanConvert(chanFile, objFile=objFile, format=outFormat).writeFbx(self.path('out'), cancelled=cancelled)
+			# at least once per frame, or per channel of the camera and axis of the points
+			self.assertTrue(len(cancelled.calls) >= (outFormat == 'action' and 107 or 200), 
+							(outFormat, len(cancelled.calls)))
+
+	def testCancelled(self):
+		chanFile, objFile = makeShot(self.tempDir, 200, points=100)
+		outFile = self.path('out')
+		fh = open(outFile, 'w')
+		fh.write('previous')
+		fh.close()
+		
+		for outFormat in self.FORMATS:
+			cancelled = self.counter(5)
+			converter = ChanConvert(chanFile, objFile=objFile, format=outFormat)
+			self.assertRaises(ConvertCancelled, converter.writeFbx, outFile, cancelled=cancelled)
+			
+			# stopped at the first check after the cancel
+			self.assertEqual(len(cancelled.calls), 6)
+			self.assertEqual(self.read(outFile), 'previous')
+			self.assertEqual(os.listdir(self.tempDir).count('out'), 1)
+			self.assertFalse([name for name in os.listdir(self.tempDir) if name.endswith('.tmp')])
+
+	def testWriteAllCancelled(self):
+		chanFile, objFile = makeShot(self.tempDir, 200, points=100)
+		converter = ChanConvert(chanFile, objFile=objFile, format=','.join(self.FORMATS))
+		
+		self.assertRaises(ConvertCancelled, converter.writeAll, self.path('out.fbx'), cancelled=lambda: True)
+		self.assertEqual(sorted(os.listdir(self.tempDir)), sorted(os.path.basename(f) for f in (chanFile, objFile)))
+
+
+class TestProgress(ConvertTestCase):
+
+	def testWriteFractions(self):
+		chanFile, objFile = makeShot(self.tempDir, 200, points=2000)
+		
+		for outFormat in ('fbx', 'fbxbin'):
+			for options in ({}, {'pointGroup' : 16}, {'pointCloud' : 'mesh'}, {'reduce' : '0.1'}):
+				fractions = []
+				def progress(stage, fraction):
+					if stage == 'write':
+						fractions.append(fraction)
+				
+				converter = ChanConvert(chanFile, objFile=objFile, format=outFormat, **options)
+				converter.writeFbx(self.path('out'), progress=progress)
+				
+				message = (outFormat, options, fractions)
+				self.assertEqual(fractions[-1], 1.0, message)
+				self.assertEqual(fractions, sorted(fractions), message)
+				self.assertTrue(0.0 <= fractions[0], message)
+				# the estimate is close to the chunks written
+				if len(fractions) > 2:
+					self.assertTrue(fractions[-2] > 0.75, message)
+
+
+class TestKeyTimes(ConvertTestCase):
+
+	FRAMES = [1, 2, 3, 1001, 0, -1, -17, 2.5, -2.5, 0.0001, 123456]
+
+	def testFbxTimes(self):
+		for fps in (24, 25, 30, 23.976, 48):
+			expected = [ChanConvert.getFbxTime(f, fps) for f in self.FRAMES]
+			self.assertEqual(ChanConvert.getFbxTimes(self.FRAMES, fps), expected)
+			self.assertEqual(pythonOnly(ChanConvert.getFbxTimes)(self.FRAMES, fps), expected)
+			self.assertTrue(all(type(t) in (int, long) for t in ChanConvert.getFbxTimes(self.FRAMES, fps)))
+		
+		# past the range of int64, as python ints
+		frames = [1e12, -1e12]
+		self.assertEqual(ChanConvert.getFbxTimes(frames, 24), [ChanConvert.getFbxTime(f, 24) for f in frames])
+		self.assertEqual(ChanConvert.getFbxTimes([], 24), [])
+
+	def testParsedFrames(self):
+		chanFile, objFile = makeShot(self.tempDir, 100)
+		frames = chanfile.ChanFile(chanFile).getColumn('frame')
+		converter = ChanConvert(chanFile, fps=30)
+		self.assertEqual(list(converter.getKeyTimes()), [ChanConvert.getFbxTime(f, 30) for f in frames])
+
+	def testFocalLengths(self):
+		fovs = [1.0, 20.0, 39.5, 40.123456, 90.0, 179.0]
+		for aperature in (18.672, 24.0, 36.0):
+			expected = [ChanConvert.getFovToFocalLength(aperature, fov) for fov in fovs]
+			self.assertEqual(ChanConvert.getFovsToFocalLengths(aperature, fovs), expected)
+		
+		chanFile, objFile = makeShot(self.tempDir, 100)
+		converter = ChanConvert(chanFile)
+		fovs = chanfile.ChanFile(chanFile).getColumn('fov')
+		aperature = converter._getData()['filmHeight']
+		self.assertEqual(converter.getFocalLengths(), 
+						 [ChanConvert.getFovToFocalLength(aperature, fov) for fov in fovs])
+		self.assertEqual(pythonOnly(lambda: ChanConvert(chanFile).getFocalLengths())(), 
+						 converter.getFocalLengths())
+
+
+class TestWriteAll(ConvertTestCase):
+
+	def testFormatNames(self):
+		chanFile, objFile = makeShot(self.tempDir, 30, points=10)
+		converter = ChanConvert(chanFile, objFile=objFile, format='fbx, action,TGD,fbxbin,fbx')
+		self.assertEqual(converter.getFormats(), ['fbx', 'action', 'terragen', 'fbxbin'])
+		
+		base = os.path.splitext(chanFile)[0]
+		written = converter.writeAll()
+		self.assertEqual(written, [base + '.fbx', base + '.action', base + '.tgd', base + '_1.fbx'])
+		
+		self.assertTrue(self.read(written[0]).startswith('; FBX'))
+		self.assertTrue(self.read(written[1]).startswith('Module Action'))
+		self.assertTrue(self.read(written[2]).startswith('<terragen'))
+		self.assertTrue(self.read(written[3], 'rb').startswith(fbx_binary.HEADER_MAGIC))
+		
+		# the ascii and binary FBX hold the same points
+		points = [node for node in fbx_binary.decodeNodes(self.read(written[3], 'rb')) 
+				  if node.name == 'Objects'][0].children
+		self.assertEqual(len([node for node in points if node.props[1].startswith('locator')]), 
+						 self.read(written[0]).count('Model: "Model::locator'))
+
+	def testOutFileExtensions(self):
+		chanFile, objFile = makeShot(self.tempDir, 30)
+		converter = ChanConvert(chanFile, format='fbx,action')
+		written = converter.writeAll(self.path('shot.out'), threaded=False)
+		self.assertEqual(written, [self.path('shot.fbx'), self.path('shot.action')])
+		
+		# a single format is written to outfile as given
+		written = ChanConvert(chanFile, format='action').writeAll(self.path('shot.out'))
+		self.assertEqual(written, [self.path('shot.out')])
+
+	def testParsedOnce(self):
+		chanFile, objFile = makeShot(self.tempDir, 30, points=10)
+		converter = ChanConvert(chanFile, objFile=objFile, format='fbx,fbxbin,action')
+		
+		calls = []
+		parse = chanfile.ChanFile.parse
+		readObjPoints = chanconvert.readObjPoints
+		chanfile.ChanFile.parse = lambda chan: calls.append('chan') or parse(chan)
+		chanconvert.readObjPoints = lambda objFile: calls.append('obj') or readObjPoints(objFile)
+		try:
+			converter.writeAll()
+			converter.writeAll()
+		finally:
+			chanfile.ChanFile.parse = parse
+			chanconvert.readObjPoints = readObjPoints
+		
+		self.assertEqual(calls, ['chan', 'obj'])
+
+
+if __name__ == "__main__":
+	unittest.main()
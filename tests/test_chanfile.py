@@ -0,0 +1,167 @@
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+
+Checks of the parsed columns of core.chanfile, with numpy and with
+the pure python fallback.
+
+Usage:
+	python -m unittest discover -s tests -t .
+"""
+
+import os, shutil, tempfile, unittest
+
+from core import chanfile
+from core.chanfile import ChanFile
+
+
+def pythonOnly(func):
+	""" Runs func with numpy hidden from core.chanfile """
+	def wrapper(*args, **kwargs):
+		saved = chanfile.numpy
+		chanfile.numpy = None
+		try:
+			return func(*args, **kwargs)
+		finally:
+			chanfile.numpy = saved
+	return wrapper
+
+
+class ChanTestCase(unittest.TestCase):
+
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.tempDir)
+
+	def writeChan(self, text, name='test.chan'):
+		""" Writes a .chan file, returning its path """
+		filename = os.path.join(self.tempDir, name)
+		fh = open(filename, 'wb')
+		fh.write(text)
+		fh.close()
+		return filename
+
+	def columns(self, filename):
+		""" Returns the parsed columns as lists """
+		columns = ChanFile(filename).getColumns()
+		return dict((name, list(values)) for name, values in columns.iteritems())
+
+
+class TestChanColumns(ChanTestCase):
+
+	CAMERA = "1 0.5 1.5 2.5 10 20 30 40\n" \
+			 "3 1.0 2.0 3.0 11 21 31 41\n" \
+			 "2 0.75 1.75 2.75 12 22 32 42\n" \
+			 "3 9.0 9.0 9.0 9 9 9 49\n"
+
+	def testCameraColumns(self):
+		chan = ChanFile(self.writeChan(self.CAMERA))
+		self.assertEqual(chan.getType(), 'camera')
+		self.assertEqual(chan.getFrameRange(), (1, 3))
+		self.assertEqual(chan.totalFrames(), 3)
+		
+		# sorted by frame, and a repeated frame keeps its last row
+		columns = self.columns(chan.getFileName())
+		self.assertEqual(sorted(columns), sorted(ChanFile.COLUMNS))
+		self.assertEqual(columns['frame'], [1, 2, 3])
+		self.assertEqual(columns['tx'], [0.5, 0.75, 9.0])
+		self.assertEqual(columns['fov'], [40.0, 42.0, 49.0])
+
+	def testNullColumns(self):
+		chan = ChanFile(self.writeChan("1 1 2 3 4 5 6\n2 2 3 4 5 6 7\n"))
+		self.assertEqual(chan.getType(), 'null')
+		self.assertEqual(list(chan.getColumn('fov')), [0.0, 0.0])
+		self.assertEqual(list(chan.getColumn('rz')), [6.0, 7.0])
+		self.assertFalse('fov' in chan.getKeyData()[1])
+
+	def testKeyDataView(self):
+		keyData = ChanFile(self.writeChan(self.CAMERA)).getKeyData()
+		self.assertEqual(len(keyData), 3)
+		self.assertEqual(keyData.keys(), [1, 2, 3])
+		self.assertTrue(2 in keyData)
+		self.assertFalse(4 in keyData)
+		self.assertEqual(keyData.get(4), None)
+		self.assertRaises(KeyError, lambda: keyData[0])
+		self.assertEqual(keyData[2], {'frame' : 2, 'tx' : 0.75, 'ty' : 1.75, 'tz' : 2.75,
+									  'rx' : 12.0, 'ry' : 22.0, 'rz' : 32.0, 'fov' : 42.0})
+		self.assertEqual([frame for frame, row in keyData.iteritems()], [1, 2, 3])
+
+	def testGappedFrames(self):
+		keyData = ChanFile(self.writeChan("10 0 0 0 0 0 0\n12 1 0 0 0 0 0\n15 2 0 0 0 0 0\n")).getKeyData()
+		self.assertEqual(keyData[12]['tx'], 1.0)
+		self.assertEqual(keyData[15]['tx'], 2.0)
+		self.assertFalse(11 in keyData)
+
+	@unittest.skipIf(chanfile.numpy is None, "needs numpy")
+	def testNumpyMatchesPython(self):
+		filename = self.writeChan(self.CAMERA)
+		self.assertEqual(self.columns(filename), pythonOnly(self.columns)(filename))
+
+
+class TestChanParse(ChanTestCase):
+
+	def assertMalformed(self, text, line):
+		""" Checks that both parsers name the line of the first malformed row """
+		filename = self.writeChan(text)
+		parsers = [lambda: ChanFile(filename).getColumns()]
+		if chanfile.numpy is not None:
+			parsers.append(pythonOnly(parsers[0]))
+		
+		for parse in parsers:
+			try:
+				parse()
+			except ValueError, e:
+				self.assertTrue('line %d ' % line in str(e), str(e))
+			else:
+				self.fail("Parsed a malformed file")
+
+	def testWhitespace(self):
+		text = "\r\n1\t0.5 1 2 3 4 5 40\r\n\r\n  2 0.25   1 2 3 4 5 41  \r\n"
+		filename = self.writeChan(text)
+		for columns in (self.columns, pythonOnly(self.columns)):
+			result = columns(filename)
+			self.assertEqual(result['frame'], [1, 2])
+			self.assertEqual(result['tx'], [0.5, 0.25])
+			self.assertEqual(result['fov'], [40.0, 41.0])
+
+	def testEmpty(self):
+		chan = ChanFile(self.writeChan("\n  \n"))
+		self.assertEqual(chan.totalFrames(), 0)
+		self.assertEqual(len(chan.getColumn('tx')), 0)
+
+	def testMalformedRows(self):
+		self.assertMalformed("1 0 0 0 0 0 0 40\n2 0 0 0 x 0 0 40\n", 2)
+		self.assertMalformed("1 0 0 0 0 0 0 40\n2 0 0 0 0 0 0 40\n3 0 0 0 0 0 0\n", 3)
+		self.assertMalformed("1 0 0 0 0 0 0\n\n2 0 0 0 0 0 0 5\n", 3)
+		self.assertMalformed("1 0 0 0 0 0 0\n2.5 0 0 0 0 0 0\n", 2)
+		self.assertMalformed("1 0 0 0 0\n", 1)
+
+	def testLongFile(self):
+		rows = ["%d %r %r 0 0 0 0 %r" % (f, f * 0.1, -f / 3.0, 30 + f * 0.01) for f in xrange(1, 5001)]
+		filename = self.writeChan('\n'.join(rows))
+		result = self.columns(filename)
+		self.assertEqual(len(result['frame']), 5000)
+		self.assertEqual(result['tx'][1234], 1235 * 0.1)
+		self.assertEqual(result['ty'][4999], -5000 / 3.0)
+		self.assertEqual(result, pythonOnly(self.columns)(filename))
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,87 @@
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+
+Runs AtomSplitter.py as a command line, in a separate python.
+
+Usage:
+	python -m unittest discover -s tests -t .
+"""
+
+import os, sys, shutil, tempfile, unittest, subprocess
+
+from benchmarks.synthetic import makeShot
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, 'AtomSplitter.py')
+
+
+class CliTestCase(unittest.TestCase):
+
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.tempDir)
+
+	def path(self, *names):
+		return os.path.join(self.tempDir, *names)
+
+	def runCli(self, *args, **env):
+		""" Returns (returncode, output) of AtomSplitter.py run with args """
+		environ = dict(os.environ)
+		environ.update(env)
+		process = subprocess.Popen([sys.executable, SCRIPT] + list(args), cwd=ROOT, env=environ,
+								   stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+		output = process.communicate()[0]
+		return process.returncode, output
+
+
+class TestHeadless(CliTestCase):
+
+	def blockQt(self):
+		""" Returns environment variables under which importing PyQt4 fails """
+		blocker = self.path('blocker', 'PyQt4')
+		os.makedirs(blocker)
+		fh = open(os.path.join(blocker, '__init__.py'), 'w')
+		fh.write('raise ImportError("PyQt4 was imported")\n')
+		fh.close()
+		return {'PYTHONPATH' : os.pathsep.join([self.path('blocker'), ROOT])}
+
+	def testConvertWithoutQt(self):
+		chanFile, objFile = makeShot(self.tempDir, 20, points=5)
+		code, output = self.runCli('-o', objFile, '-F', 'fbx,action', chanFile, **self.blockQt())
+		self.assertEqual(code, 0, output)
+		
+		base = os.path.splitext(chanFile)[0]
+		self.assertTrue(os.path.isfile(base + '.fbx'))
+		self.assertTrue(os.path.isfile(base + '.action'))
+
+	def testCoreImportsNoQt(self):
+		process = subprocess.Popen([sys.executable, '-c', 'import sys, core; print "PyQt4" in sys.modules'],
+								   cwd=ROOT, stdout=subprocess.PIPE)
+		self.assertEqual(process.communicate()[0].strip(), 'False')
+
+	def testGuiWithoutQt(self):
+		code, output = self.runCli(**self.blockQt())
+		self.assertNotEqual(code, 0)
+		self.assertTrue('The GUI needs PyQt4' in output, output)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,71 @@
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+
+Checks of the binary FBX output, parsed back with fbx_binary.decodeNodes().
+
+Usage:
+	python -m unittest discover -s tests -t .
+"""
+
+import os, shutil, tempfile, unittest
+
+from core import ChanConvert
+from templates import fbx_binary
+from benchmarks.synthetic import makeShot
+
+
+class TestCurveConnections(unittest.TestCase):
+
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.tempDir)
+
+	def convert(self, chanType):
+		""" Returns the top level nodes of a converted shot, by name """
+		chanFile, objFile = makeShot(self.tempDir, 10, chanType=chanType)
+		outFile = ChanConvert(chanFile, format='fbxbin').writeFbx(os.path.join(self.tempDir, 'out.fbx'))
+		return dict((node.name, node) for node in fbx_binary.decodeNodes(open(outFile, 'rb').read()))
+
+	def curveTargets(self, nodes):
+		""" Returns {curve node name : (target class, target property)} """
+		objects = dict((node.props[0], node) for node in nodes['Objects'].children)
+		targets = {}
+		for conn in nodes['Connections'].children:
+			source = objects.get(conn.props[1])
+			if conn.props[0] == 'OP' and source is not None and source.name == 'AnimationCurveNode':
+				target = objects[conn.props[2]]
+				targets[source.props[1].split('\x00')[0]] = (target.name, conn.props[3])
+		return targets
+
+	def testCameraFocalLength(self):
+		targets = self.curveTargets(self.convert('camera'))
+		self.assertEqual(targets['FocalLength'], ('NodeAttribute', 'FocalLength'))
+		self.assertEqual(targets['T'], ('Model', 'Lcl Translation'))
+		self.assertEqual(targets['R'], ('Model', 'Lcl Rotation'))
+
+	def testNullTransforms(self):
+		targets = self.curveTargets(self.convert('null'))
+		self.assertEqual(sorted(targets), ['R', 'T'])
+		self.assertEqual(targets['T'], ('Model', 'Lcl Translation'))
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,76 @@
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+
+
+Checks of the ascii FBX template in templates.fbx_template.
+
+Usage:
+	python -m unittest discover -s tests -t .
+"""
+
+import unittest
+from collections import defaultdict
+
+from core import PointCloudFbxData
+from templates import fbx_template
+
+
+class TestTemplate(unittest.TestCase):
+
+	ANIMATION = ['\t\tModel: "Model::null1" {', '\t\t}']
+
+	def points(self, count):
+		return [float(i) * 0.5 for i in xrange(count * 3)]
+
+	def assertSameOutput(self, objectType, objectData):
+		""" Checks getTemplate() renders the same file as iterTemplate() """
+		data = defaultdict(int)
+		streamed = ''.join(fbx_template.iterTemplate(data, objectType, objectData, self.ANIMATION))
+		
+		data['animationData'] = '\n'.join(self.ANIMATION)
+		self.assertEqual(fbx_template.getTemplate(objectType, objectData) % data, streamed)
+		return streamed
+
+	def testNoObjects(self):
+		for objectType in ('null', 'camera'):
+			self.assertSameOutput(objectType, [])
+
+	def testLocators(self):
+		text = self.assertSameOutput('null', list(PointCloudFbxData(self.points(50))))
+		self.assertEqual(text.count('Model: "Model::locator'), 50)
+		self.assertTrue('Connect: "OO", "Model::locator50", "Model::PointCloud"' in text)
+		
+		# objects keep their order
+		self.assertTrue(text.index('"Model::locator9"') < text.index('"Model::locator10"'))
+
+	def testMeshesAndGroups(self):
+		objectData = list(PointCloudFbxData(self.points(50), meshSize=10))
+		self.assertSameOutput('camera', objectData)
+		
+		objectData = list(PointCloudFbxData(self.points(50), groupSize=4))
+		text = self.assertSameOutput('camera', objectData)
+		self.assertTrue('"Model::pointGroup1", "Model::PointCloud"' in text)
+
+	def testUnknownType(self):
+		self.assertEqual(fbx_template.getTemplate('light', []), '')
+		self.assertEqual(list(fbx_template.iterTemplate({}, 'light', [])), [])
+
+
+if __name__ == "__main__":
+	unittest.main()
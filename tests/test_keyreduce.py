@@ -0,0 +1,193 @@
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+
+
+Checks of keyframe reduction in core.keyreduce.
+
+Usage:
+	python -m unittest discover -s tests -t .
+"""
+
+import os, shutil, tempfile, unittest
+from math import tan, atan, radians, degrees
+from random import Random
+
+from core import keyreduce, ChanFile, ChanConvert
+from benchmarks.synthetic import makeShot
+
+
+def pythonOnly(func):
+	""" Runs func with numpy hidden from core.keyreduce """
+	def wrapper(*args, **kwargs):
+		saved = keyreduce.numpy
+		keyreduce.numpy = None
+		try:
+			return func(*args, **kwargs)
+		finally:
+			keyreduce.numpy = saved
+	return wrapper
+
+
+def randomWalk(count, seed=0):
+	""" Returns (frames, values) of a noisy channel """
+	rand = Random(seed)
+	values = [0.0]
+	for i in xrange(count - 1):
+		values.append(values[-1] + rand.uniform(-0.1, 0.1))
+	return range(1, count + 1), values
+
+
+class TestSimplify(unittest.TestCase):
+
+	def testShortChannels(self):
+		self.assertEqual(keyreduce.simplify([], [], 0.1), [])
+		self.assertEqual(keyreduce.simplify([1, 2], [0.0, 5.0], 0.1), [0, 1])
+
+	def testConstant(self):
+		frames = range(1, 101)
+		self.assertEqual(keyreduce.simplify(frames, [2.0] * 100, 0.001), [0])
+		self.assertEqual(keyreduce.simplify(frames, [2.0, 2.0005] * 50, 0.001), [0])
+
+	def testLinear(self):
+		frames = range(1, 101)
+		values = [f * 0.5 for f in frames]
+		self.assertEqual(keyreduce.simplify(frames, values, 0.001), [0, 99])
+		
+		# a corner is kept
+		values = [abs(f - 40) for f in frames]
+		self.assertEqual(keyreduce.simplify(frames, values, 0.001), [0, 39, 99])
+
+	def testWithinTolerance(self):
+		frames, values = randomWalk(2000)
+		for tolerance in (0.0, 0.01, 0.1, 1.0):
+			indices = keyreduce.simplify(frames, values, tolerance)
+			self.assertEqual(indices, sorted(set(indices)))
+			self.assertEqual((indices[0], indices[-1]), (0, len(values) - 1))
+			self.assertTrue(keyreduce.maxError(frames, values, indices) <= tolerance + 1e-12)
+		
+		self.assertEqual(len(keyreduce.simplify(frames, values, 0.0)), len(values))
+
+	def testMaxError(self):
+		frames = [1, 2, 3, 4]
+		values = [0.0, 1.5, 2.0, 5.0]
+		self.assertEqual(keyreduce.maxError(frames, values, []), 0.0)
+		self.assertAlmostEqual(keyreduce.maxError(frames, values, [0, 2]), 3.0)
+		self.assertAlmostEqual(keyreduce.maxError(frames, values, [0, 3]), 4.0 / 3)
+
+	def testNumpyMatchesPython(self):
+		rand = Random(1)
+		for seed in xrange(5):
+			frames, values = randomWalk(1000, seed)
+			for tolerance in (0.001, 0.05, 0.5):
+				indices = keyreduce.simplify(frames, values, tolerance)
+				self.assertEqual(pythonOnly(keyreduce.simplify)(frames, values, tolerance), indices)
+			
+			indices = sorted(rand.sample(xrange(1000), 20))
+			self.assertAlmostEqual(pythonOnly(keyreduce.maxError)(frames, values, indices), 
+								   keyreduce.maxError(frames, values, indices), 12)
+
+
+class TestTolerances(unittest.TestCase):
+
+	def testGetTolerances(self):
+		self.assertEqual(keyreduce.getTolerances(True), keyreduce.DEFAULT_TOLERANCES)
+		self.assertEqual(keyreduce.getTolerances(0.5), dict((name, 0.5) for name in keyreduce.CHANNELS))
+		
+		tolerances = keyreduce.getTolerances('0.1, 0.2')
+		self.assertEqual([tolerances[name] for name in keyreduce.CHANNELS], 
+						 [0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2])
+		
+		tolerances = keyreduce.getTolerances({'rz' : -1})
+		self.assertEqual(tolerances['rz'], -1)
+		self.assertEqual(tolerances['tx'], keyreduce.DEFAULT_TOLERANCES['tx'])
+		
+		self.assertRaises(ValueError, keyreduce.getTolerances, '1,2,3,4')
+		self.assertRaises(ValueError, keyreduce.getTolerances, '')
+
+	def testFocalLengthTolerance(self):
+		aperature = 24.0
+		fovs = [20 + i * 0.7 for i in xrange(100)]
+		self.assertEqual(keyreduce.getFocalLengthTolerance(aperature, fovs, None), None)
+		self.assertEqual(keyreduce.getFocalLengthTolerance(aperature, [], 0.1), None)
+		
+		# a focal length off by the tolerance keeps its fov within the fov tolerance
+		for fovTolerance in (0.001, 0.1, 1.0):
+			tolerance = keyreduce.getFocalLengthTolerance(aperature, fovs, fovTolerance)
+			for fov in fovs:
+				focalLength = aperature / (2 * tan(radians(fov) / 2))
+				for offset in (-tolerance, tolerance):
+					moved = degrees(2 * atan(aperature / (2 * (focalLength + offset))))
+					self.assertTrue(abs(moved - fov) <= fovTolerance * 1.01, (fov, moved))
+
+
+class TestConvertReduced(unittest.TestCase):
+
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.tempDir)
+
+	def read(self, filename):
+		fh = open(filename)
+		try:
+			return fh.read()
+		finally:
+			fh.close()
+
+	def testReductionStats(self):
+		chanFile, objFile = makeShot(self.tempDir, 200)
+		self.assertEqual(ChanConvert(chanFile).getReductionStats(), [])
+		
+		stats = ChanConvert(chanFile, reduce=0.01).getReductionStats()
+		self.assertEqual([s[0] for s in stats], list(keyreduce.CHANNELS) + ['focalLength'])
+		for name, before, after, error in stats:
+			self.assertEqual(before, 200)
+			self.assertTrue(0 < after < before, name)
+		
+		chanFile, objFile = makeShot(self.tempDir, 200, chanType='null')
+		stats = ChanConvert(chanFile, reduce=0.01).getReductionStats()
+		self.assertEqual([s[0] for s in stats], ['tx', 'ty', 'tz', 'rx', 'ry', 'rz'])
+
+	def testFocalLengthKeys(self):
+		chanFile, objFile = makeShot(self.tempDir, 200)
+		converter = ChanConvert(chanFile, reduce='0.01,0.01,0.01')
+		fovs = ChanFile(chanFile).getColumn('fov')
+		focalLengths = converter.getFocalLengths()
+		aperature = 2 * focalLengths[0] * tan(radians(fovs[0]) / 2)
+		
+		indices = converter.getKeyIndices()['focalLength']
+		self.assertTrue(len(indices) < len(focalLengths))
+		
+		# the fov of the interpolated focal lengths stays within the fov tolerance
+		for start, end in zip(indices, indices[1:]):
+			for i in xrange(start, end + 1):
+				focalLength = focalLengths[start] + (focalLengths[end] - focalLengths[start]) * (i - start) / float(end - start)
+				fov = degrees(2 * atan(aperature / (2 * focalLength)))
+				self.assertTrue(abs(fov - fovs[i]) <= 0.0101, (i, fov, fovs[i]))
+
+	def testTerragenKeepsEveryKey(self):
+		chanFile, objFile = makeShot(self.tempDir, 100)
+		full = ChanConvert(chanFile, format='terragen').writeAll(os.path.join(self.tempDir, 'full.tgd'))
+		reduced = ChanConvert(chanFile, format='terragen', reduce=1.0).writeAll(os.path.join(self.tempDir, 'reduced.tgd'))
+		self.assertEqual(self.read(reduced[0]), self.read(full[0]))
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,130 @@
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+
+
+Checks of the .obj point reader in core.objfile.
+
+Usage:
+	python -m unittest discover -s tests -t .
+"""
+
+import os, math, shutil, tempfile, unittest
+
+from core import objfile
+from core.objfile import readObjPoints, NUKE_HEADER
+from benchmarks.synthetic import writeObj
+
+
+def pythonOnly(func):
+	""" Runs func with numpy hidden from core.objfile """
+	def wrapper(*args, **kwargs):
+		saved = objfile.numpy
+		objfile.numpy = None
+		try:
+			return func(*args, **kwargs)
+		finally:
+			objfile.numpy = saved
+	return wrapper
+
+
+def readLines(objFile):
+	""" Reference reader, converting the 'v ' lines one at a time """
+	points = []
+	for line in open(objFile, 'rb').read().split('\n')[1:]:
+		if not line.startswith('v '):
+			continue
+		values = line.split()[1:]
+		if len(values) == 3:
+			points.extend(float(v) for v in values)
+	return points
+
+
+class TestReadObjPoints(unittest.TestCase):
+
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.tempDir)
+
+	def writeObj(self, text, header=NUKE_HEADER):
+		filename = os.path.join(self.tempDir, 'test.obj')
+		fh = open(filename, 'wb')
+		fh.write(header + text)
+		fh.close()
+		return filename
+
+	def assertPoints(self, text, expected=None):
+		""" Checks both readers give the reference points for .obj text """
+		objFile = self.writeObj(text)
+		if expected is None:
+			expected = readLines(objFile)
+		
+		for reader in (readObjPoints, pythonOnly(readObjPoints)):
+			points = reader(objFile)
+			self.assertEqual(len(points), len(expected))
+			for value, reference in zip(points, expected):
+				if math.isnan(reference):
+					self.assertTrue(math.isnan(value))
+				else:
+					self.assertEqual(value, reference)
+
+	def testPlain(self):
+		self.assertPoints('v 1 2 3\nv -1.5 2.25e2 -3E-2\nv 0.1 +0.2 .3\n', 
+						  [1, 2, 3, -1.5, 225, -0.03, 0.1, 0.2, 0.3])
+
+	def testEmpty(self):
+		self.assertPoints('', [])
+		
+		# an empty file can't be memory mapped
+		self.assertRaises(Exception, readObjPoints, self.writeObj('', header=''))
+
+	def testMixedLines(self):
+		self.assertPoints('# comment\nv 1 2 3\n\nvn 0 0 1\nv 4 5 6\nv 7 8 9\nf 1 2 3\nv 1 1 1')
+
+	def testWhitespace(self):
+		self.assertPoints('v  1\t2   3  \r\nv 4 5 6\r\n\tv 7 8 9\nv 1 2 3')
+
+	def testBadLineCounts(self):
+		self.assertPoints('v 1 2\nv 1 2 3\nv 1 2 3 4\nv\nv 4 5 6\n')
+
+	def testSpecialValues(self):
+		self.assertPoints('v nan inf -inf\nv 1 2 3\nv 1e400 -0.0 1e-400\n')
+
+	def testBadValues(self):
+		for text in ('v 1 2 x\n', 'v 1 2 3\nv 1.2.3 4 5\n', 'v 1 2 --3'):
+			objFile = self.writeObj(text)
+			self.assertRaises(ValueError, readObjPoints, objFile)
+			self.assertRaises(ValueError, pythonOnly(readObjPoints), objFile)
+
+	def testNotNuke(self):
+		objFile = self.writeObj('v 1 2 3\n', header='# Blender\n')
+		self.assertRaises(Exception, readObjPoints, objFile)
+
+	def testSynthetic(self):
+		objFile = os.path.join(self.tempDir, 'cloud.obj')
+		writeObj(objFile, 20000, seed=5)
+		expected = readLines(objFile)
+		self.assertEqual(len(expected), 60000)
+		self.assertEqual(list(readObjPoints(objFile)), expected)
+		self.assertEqual(list(pythonOnly(readObjPoints)(objFile)), expected)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,223 @@
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+
+Checks of the point cloud filters in core.pointcloud, with numpy and 
+with the pure python fallbacks.
+
+Usage:
+	python -m unittest discover -s tests -t .
+"""
+
+import random, unittest
+from array import array
+from math import sqrt, floor
+
+from core import pointcloud
+
+
+def makeCloud(count, outliers=0, seed=1):
+	""" Returns count points in a 10 unit cube, then outliers points hundreds of units away """
+	rand = random.Random(seed)
+	points = array('d')
+	for i in xrange(count):
+		points.extend([rand.uniform(0, 10) for axis in xrange(3)])
+	for i in xrange(outliers):
+		points.extend([rand.uniform(500, 1000) for axis in xrange(3)])
+	return points
+
+
+def pythonOnly(func):
+	""" Runs func with numpy hidden from core.pointcloud """
+	def wrapper(*args, **kwargs):
+		saved = pointcloud.numpy
+		pointcloud.numpy = None
+		try:
+			return func(*args, **kwargs)
+		finally:
+			pointcloud.numpy = saved
+	return wrapper
+
+
+class TestRemoveOutliers(unittest.TestCase):
+
+	def bruteDistances(self, xyz, indices, neighbours):
+		""" The mean distance of each of the indexed points to its nearest neighbours, against every point """
+		result = []
+		for i in indices:
+			x, y, z = xyz[i]
+			squared = sorted((px - x) ** 2 + (py - y) ** 2 + (pz - z) ** 2 for px, py, pz in xyz)
+			result.append(sum(sqrt(d) for d in squared[1:neighbours + 1]) / neighbours)
+		return result
+
+	@unittest.skipIf(pointcloud.numpy is None, "needs numpy")
+	def testLargeCloudNumpy(self):
+		# the cell size has to keep growing until the far outliers resolve
+		points = makeCloud(50000, outliers=5)
+		xyz = pointcloud._toNumpy(points)
+		distances = pointcloud._meanNeighbourDistancesNumpy(xyz, 8)
+		
+		xyz = [tuple(p) for p in xyz]
+		indices = range(0, 50000, 2500) + range(50000, 50005)
+		for distance, expected in zip(distances[indices], self.bruteDistances(xyz, indices, 8)):
+			self.assertAlmostEqual(distance, expected, places=9)
+		
+		result = pointcloud.removeOutliers(points, 8, 2.0)
+		self.assertEqual(result, points[:50000 * 3])
+
+	def testPythonMatchesBrute(self):
+		points = makeCloud(1500, outliers=3)
+		xyz = [tuple(points[i:i+3]) for i in xrange(0, len(points), 3)]
+		distances = pointcloud._meanNeighbourDistances(xyz, 4)
+		
+		indices = range(0, 1500, 100) + [1500, 1501, 1502]
+		expected = self.bruteDistances(xyz, indices, 4)
+		for i, distance in zip(indices, expected):
+			self.assertAlmostEqual(distances[i], distance, places=9)
+		
+		result = pythonOnly(pointcloud.removeOutliers)(points, 4, 2.0)
+		self.assertEqual(result, points[:1500 * 3])
+
+	@unittest.skipIf(pointcloud.numpy is None, "needs numpy")
+	def testNumpyMatchesPython(self):
+		points = makeCloud(2000, outliers=4, seed=2)
+		points.extend([float('nan'), 0.0, 0.0])
+		self.assertEqual(pointcloud.removeOutliers(points, 6, 1.5), 
+						 pythonOnly(pointcloud.removeOutliers)(points, 6, 1.5))
+
+	def testSettings(self):
+		self.assertEqual(pointcloud.getOutlierSettings(True), 
+						 (pointcloud.DEFAULT_NEIGHBOURS, pointcloud.DEFAULT_STD_RATIO))
+		self.assertEqual(pointcloud.getOutlierSettings('12'), (12, pointcloud.DEFAULT_STD_RATIO))
+		self.assertEqual(pointcloud.getOutlierSettings('4,1.5'), (4, 1.5))
+		self.assertRaises(ValueError, pointcloud.getOutlierSettings, 0)
+		self.assertRaises(ValueError, pointcloud.getOutlierSettings, '1,2,3')
+
+
+class TestVoxelDecimate(unittest.TestCase):
+
+	def bruteDecimate(self, points, size):
+		""" The point nearest each occupied cell's centroid, the earliest on a tie, in point order """
+		cells = {}
+		for i in xrange(0, len(points) - 2, 3):
+			point = tuple(points[i:i+3])
+			if all(v - v == 0.0 for v in point):
+				cells.setdefault(tuple(floor(v / size) for v in point), []).append((i, point))
+		
+		keep = []
+		for members in cells.itervalues():
+			centroid = [sum(p[axis] for i, p in members) / len(members) for axis in xrange(3)]
+			distances = [(sum((p[axis] - centroid[axis]) ** 2 for axis in xrange(3)), i) for i, p in members]
+			keep.append(min(distances)[1])
+		
+		result = array('d')
+		for i in sorted(keep):
+			result.extend(points[i:i+3])
+		return result
+
+	def testMatchesBrute(self):
+		points = makeCloud(3000, outliers=5)
+		points.extend([-0.5, -2.5, 3.0, float('nan'), 1.0, 1.0, float('inf'), 0.0, 0.0])
+		for size in (0.5, 1.0, 3.0, 100.0):
+			expected = self.bruteDecimate(points, size)
+			self.assertEqual(pointcloud.voxelDecimate(points, size), expected)
+			self.assertEqual(pythonOnly(pointcloud.voxelDecimate)(points, size), expected)
+
+	def testNumpyMatchesPython(self):
+		points = list(makeCloud(5000, seed=3))
+		for size in (0.1, 0.7, 2.0):
+			self.assertEqual(pointcloud.voxelDecimate(points, size), 
+							 pythonOnly(pointcloud.voxelDecimate)(points, size))
+
+	def testEdgeCases(self):
+		self.assertEqual(pointcloud.voxelDecimate([], 1.0), array('d'))
+		self.assertEqual(pointcloud.voxelDecimate([float('nan')] * 3, 1.0), array('d'))
+		self.assertRaises(ValueError, pointcloud.voxelDecimate, [1.0, 2.0, 3.0], 0)
+		
+		# a spread too wide for one integer key per cell
+		points = [-1e8, 0.0, 0.0, 1e8, 1e8, 1e8, 1e8, 1e8, 1e8, 1e8 + 1e-7, 1e8, 1e8]
+		for decimate in (pointcloud.voxelDecimate, pythonOnly(pointcloud.voxelDecimate)):
+			self.assertEqual(decimate(points, 1e-6), array('d', points[:6]))
+
+
+class TestFrustumCull(unittest.TestCase):
+
+	def cameraColumns(self, *frames):
+		""" Returns ChanFile.getColumns() style columns of (tx, ty, tz, rx, ry, rz, fov) frames """
+		names = ('tx', 'ty', 'tz', 'rx', 'ry', 'rz', 'fov')
+		columns = dict((name, [float(frame[n]) for frame in frames]) for n, name in enumerate(names))
+		columns['frame'] = range(1, len(frames) + 1)
+		return columns
+
+	def cull(self, points, columns, filmWidth=1.0, filmHeight=1.0, minFrames=1):
+		""" Returns the culled points, checking numpy and python agree """
+		result = pointcloud.frustumCull(points, columns, filmWidth, filmHeight, minFrames)
+		self.assertEqual(pythonOnly(pointcloud.frustumCull)(points, columns, filmWidth, filmHeight, minFrames), 
+						 result)
+		return list(result)
+
+	def testLooksDownZ(self):
+		# a 90 degree fov, 2:1 film
+		columns = self.cameraColumns((0, 0, 0, 0, 0, 0, 90))
+		points = [0, 0, -5,  0, 0, 5,  0, 4.9, -5,  0, 5.1, -5,  9.9, 0, -5,  10.1, 0, -5]
+		self.assertEqual(self.cull(points, columns, 2.0, 1.0), [0, 0, -5, 0, 4.9, -5, 9.9, 0, -5])
+
+	def testRotation(self):
+		points = [0, 0, -5,  0, 0, 5,  5, 0, 0,  0, 5, 0]
+		self.assertEqual(self.cull(points, self.cameraColumns((0, 0, 0, 0, 180, 0, 30))), [0, 0, 5])
+		self.assertEqual(self.cull(points, self.cameraColumns((0, 0, 0, 0, -90, 0, 30))), [5, 0, 0])
+		self.assertEqual(self.cull(points, self.cameraColumns((0, 0, 0, 90, 0, 0, 30))), [0, 5, 0])
+		
+		# z rolls the camera, only changing which way is up
+		points = [8, 0, -5,  0, 8, -5]
+		self.assertEqual(self.cull(points, self.cameraColumns((0, 0, 0, 0, 0, 0, 90)), 2.0, 1.0), [8, 0, -5])
+		self.assertEqual(self.cull(points, self.cameraColumns((0, 0, 0, 0, 0, 90, 90)), 2.0, 1.0), [0, 8, -5])
+		
+		# translated, and seen from behind
+		points = [0, 0, -5,  0, 0, 5,  5, 0, 0,  0, 5, 0]
+		self.assertEqual(self.cull(points, self.cameraColumns((0, 0, -10, 0, 0, 0, 30))), [])
+
+	def testMinFrames(self):
+		points = [0, 0, -5,  20, 0, -5]
+		held = (0, 0, 0, 0, 0, 0, 30)
+		columns = self.cameraColumns(held, held, held, (20, 0, 0, 0, 0, 0, 30))
+		self.assertEqual(self.cull(points, columns), points)
+		self.assertEqual(self.cull(points, columns, minFrames=2), [0, 0, -5])
+		self.assertEqual(self.cull(points, columns, minFrames=3), [0, 0, -5])
+		self.assertEqual(self.cull(points, columns, minFrames=4), [])
+
+	def testNumpyMatchesPython(self):
+		rand = random.Random(4)
+		points = makeCloud(3000, outliers=10)
+		points.extend([float('nan'), 0.0, -5.0])
+		frames = [(rand.uniform(-5, 15), rand.uniform(-5, 15), rand.uniform(20, 30), 
+				   rand.uniform(-30, 30), rand.uniform(-30, 30), rand.uniform(-180, 180), rand.uniform(20, 60))
+				  for i in xrange(40)]
+		columns = self.cameraColumns(*frames)
+		
+		culled = self.cull(points, columns, 36.0, 24.0)
+		self.assertTrue(0 < len(culled) < len(points))
+		self.assertTrue(len(self.cull(points, columns, 36.0, 24.0, minFrames=5)) < len(culled))
+
+	def testEmpty(self):
+		self.assertEqual(self.cull([], self.cameraColumns((0, 0, 0, 0, 0, 0, 30))), [])
+		self.assertEqual(self.cull([0, 0, -5], self.cameraColumns()), [])
+
+
+if __name__ == "__main__":
+	unittest.main()
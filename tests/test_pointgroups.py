@@ -0,0 +1,196 @@
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+
+
+Checks of the grouped point cloud hierarchy: templates.pointgroups,
+core.pointcloud.mortonOrder() and the grouped output of each writer.
+
+Usage:
+	python -m unittest discover -s tests -t .
+"""
+
+import os, re, random, shutil, tempfile, unittest
+from array import array
+from collections import defaultdict
+
+from core import pointcloud, ChanConvert
+from templates import fbx_binary
+from templates.pointgroups import groupHierarchy
+from benchmarks.synthetic import makeShot
+
+
+def pythonOnly(func):
+	""" Runs func with numpy hidden from core.pointcloud """
+	def wrapper(*args, **kwargs):
+		saved = pointcloud.numpy
+		pointcloud.numpy = None
+		try:
+			return func(*args, **kwargs)
+		finally:
+			pointcloud.numpy = saved
+	return wrapper
+
+
+class TestGroupHierarchy(unittest.TestCase):
+
+	def testBalanced(self):
+		for groupSize in (2, 3, 4, 10):
+			for count in range(1, 60) + [999, 1000, 1001, 12345]:
+				groups, first = groupHierarchy(count, groupSize)
+				if count <= groupSize:
+					self.assertEqual((groups, first), ([], 0))
+					continue
+				
+				children = defaultdict(int)
+				for n, parent in enumerate(groups):
+					# parents come first, and only the top level is under the root
+					self.assertTrue(parent is None or parent < n)
+					self.assertEqual(parent is None, n < groups.count(None))
+					children[parent] += 1
+				
+				# items are split into consecutive runs of the bottom groups
+				itemGroups = [first + i * (len(groups) - first) // count for i in xrange(count)]
+				self.assertEqual(itemGroups, sorted(itemGroups))
+				self.assertEqual(set(itemGroups), set(xrange(first, len(groups))))
+				for group in itemGroups:
+					children[group] += 1
+				
+				self.assertTrue(max(children.values()) <= groupSize, (count, groupSize))
+				self.assertTrue(min(children.values()) >= 1)
+
+	def testTooSmall(self):
+		self.assertRaises(ValueError, groupHierarchy, 10, 1)
+
+
+class TestMortonOrder(unittest.TestCase):
+
+	def testCorners(self):
+		corners = [(x, y, z) for z in (0.0, 1.0) for y in (0.0, 1.0) for x in (0.0, 1.0)]
+		points = array('d')
+		for corner in reversed(corners):
+			points.extend(corner)
+		
+		expected = array('d')
+		for corner in corners:
+			expected.extend(corner)
+		self.assertEqual(pointcloud.mortonOrder(points), expected)
+		self.assertEqual(pythonOnly(pointcloud.mortonOrder)(points), expected)
+
+	def testNumpyMatchesPython(self):
+		rand = random.Random(5)
+		points = array('d')
+		for i in xrange(5000):
+			points.extend([rand.uniform(-100, 100), rand.uniform(0, 1), rand.choice((0.0, 3.0))])
+		points.extend([float('nan'), 1.0, 2.0, 1.0, float('inf'), 0.0, 5.0, 0.5, 0.0, 5.0, 0.5, 0.0])
+		
+		# compared as repr, as nan != nan
+		ordered = pointcloud.mortonOrder(points)
+		self.assertEqual(repr(pythonOnly(pointcloud.mortonOrder)(points)), repr(ordered))
+		
+		# the same points, with those that aren't finite last, in order
+		xyz = lambda values: [repr(tuple(values[i:i+3])) for i in xrange(0, len(values), 3)]
+		self.assertEqual(sorted(xyz(ordered)), sorted(xyz(points)))
+		self.assertEqual(xyz(ordered)[-2:], [repr((float('nan'), 1.0, 2.0)), repr((1.0, float('inf'), 0.0))])
+
+	def testDegenerate(self):
+		for points in ([], [1.0, 2.0, 3.0] * 4, [float('nan')] * 6):
+			self.assertEqual(repr(pointcloud.mortonOrder(points)), repr(array('d', points)))
+			self.assertEqual(repr(pythonOnly(pointcloud.mortonOrder)(points)), repr(array('d', points)))
+
+
+class TestGroupedOutput(unittest.TestCase):
+
+	GROUP_SIZE = 4
+
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp()
+		self.chanFile, self.objFile = makeShot(self.tempDir, 10, points=50)
+
+	def tearDown(self):
+		shutil.rmtree(self.tempDir)
+
+	def convert(self, outFormat, **kwargs):
+		converter = ChanConvert(self.chanFile, objFile=self.objFile, format=outFormat, 
+								pointGroup=self.GROUP_SIZE, **kwargs)
+		fh = open(converter.writeFbx(os.path.join(self.tempDir, 'out')), 'rb')
+		try:
+			return fh.read()
+		finally:
+			fh.close()
+
+	def assertTree(self, parents, root, leaf, leaves=50):
+		""" Checks a {child : parent} tree holds every leaf, under groups of at most GROUP_SIZE """
+		# only the point cloud, leaving out the camera and the cloud's own parent
+		parents = dict((child, parent) for child, parent in parents.iteritems() 
+					   if parent == root or parent.startswith('pointGroup'))
+		
+		children = defaultdict(list)
+		for child, parent in parents.iteritems():
+			children[parent].append(child)
+		
+		self.assertEqual(len([child for child in parents if re.match(leaf + r'\d', child)]), leaves)
+		self.assertTrue(0 < len(children[root]) <= self.GROUP_SIZE)
+		for parent, members in children.iteritems():
+			self.assertTrue(len(members) <= self.GROUP_SIZE, (parent, members))
+			if parent != root:
+				self.assertTrue(parent.startswith('pointGroup'), parent)
+		
+		for child in parents:
+			seen = set()
+			while child in parents:
+				self.assertFalse(child in seen)
+				seen.add(child)
+				child = parents[child]
+			self.assertEqual(child, root)
+
+	def testAscii(self):
+		for pointCloud, leaf, leaves in (('locators', 'locator', 50), ('mesh', 'pointMesh', 1)):
+			text = self.convert('fbx', pointCloud=pointCloud)
+			parents = dict(re.findall(r'Connect: "OO", "Model::(\w+)", "Model::(\w+)"', text))
+			self.assertTree(parents, 'PointCloud', leaf, leaves)
+
+	def testBinary(self):
+		nodes = dict((node.name, node) for node in fbx_binary.decodeNodes(self.convert('fbxbin')))
+		names = dict((node.props[0], node.props[1].split('\x00')[0]) 
+					 for node in nodes['Objects'].children if node.name == 'Model')
+		parents = dict((names[conn.props[1]], names.get(conn.props[2], 'Scene')) 
+					   for conn in nodes['Connections'].children 
+					   if conn.props[0] == 'OO' and conn.props[1] in names)
+		self.assertTree(parents, 'PointCloud', 'locator')
+
+	def testAction(self):
+		text = self.convert('action')
+		names = {}
+		parents = {}
+		for node in text.split('Node ')[1:]:
+			name = re.search(r'Name (\S+)', node).group(1)
+			names[re.search(r'Number (\d+)', node).group(1)] = name
+			for child in re.findall(r'\tChild (\d+)', node):
+				parents[child] = name
+		parents = dict((names[child], parent) for child, parent in parents.iteritems())
+		
+		self.assertTree(parents, 'PointCloudAxis', 'point')
+
+	def testUngrouped(self):
+		text = ChanConvert(self.chanFile, objFile=self.objFile).writeFbx(os.path.join(self.tempDir, 'flat.fbx'))
+		self.assertFalse('pointGroup' in open(text).read())
+
+
+if __name__ == "__main__":
+	unittest.main()
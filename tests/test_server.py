@@ -0,0 +1,166 @@
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+
+
+Checks of the conversion server in core.server.
+
+Usage:
+	python -m unittest discover -s tests -t .
+"""
+
+import os, json, shutil, tempfile, threading, unittest
+import httplib, socket
+
+from core import server
+from benchmarks.synthetic import makeShot
+
+
+class ServerTestCase(unittest.TestCase):
+
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp()
+		self.chanFile, self.objFile = makeShot(self.tempDir, 30, points=10)
+
+	def tearDown(self):
+		shutil.rmtree(self.tempDir)
+
+	def path(self, name):
+		return os.path.join(self.tempDir, name)
+
+
+class TestRunJob(ServerTestCase):
+
+	def testParseAddress(self):
+		self.assertEqual(server.parseAddress('8750'), (socket.AF_INET, ('127.0.0.1', 8750)))
+		self.assertEqual(server.parseAddress('0.0.0.0:80'), (socket.AF_INET, ('0.0.0.0', 80)))
+		self.assertEqual(server.parseAddress('/tmp/as.sock'), (socket.AF_UNIX, '/tmp/as.sock'))
+
+	def testConvert(self):
+		result = server._runJob({'chanFile' : self.chanFile, 'outFile' : self.path('out.fbx'),
+								 'options' : {'objFile' : self.objFile, 'cache' : False}})
+		self.assertEqual(result['files'], [self.path('out.fbx')])
+		self.assertTrue(result['started'] <= result['finished'])
+		self.assertFalse('reduction' in result)
+
+	def testCache(self):
+		cacheDir = self.path('cache')
+		previous = os.environ.get('ATOMSPLITTER_CACHE')
+		os.environ['ATOMSPLITTER_CACHE'] = cacheDir
+		try:
+			job = {'chanFile' : self.chanFile, 'outFile' : self.path('out.fbx'),
+				   'options' : {'objFile' : self.objFile, 'cache' : True}}
+			self.assertFalse('error' in server._runJob(job))
+			self.assertEqual(len(os.listdir(cacheDir)), 2)
+			
+			# a job can't choose the cache directory
+			job['options']['cache'] = self.path('elsewhere')
+			self.assertFalse('error' in server._runJob(job))
+			self.assertFalse(os.path.exists(self.path('elsewhere')))
+		finally:
+			if previous is None:
+				del os.environ['ATOMSPLITTER_CACHE']
+			else:
+				os.environ['ATOMSPLITTER_CACHE'] = previous
+		
+		# the job isn't changed, and a falsy cache is not used
+		self.assertEqual(job['options']['cache'], self.path('elsewhere'))
+		shutil.rmtree(cacheDir)
+		for cache in (False, None, 0, ''):
+			job['options']['cache'] = cache
+			self.assertFalse('error' in server._runJob(job))
+			self.assertFalse(os.path.exists(cacheDir))
+
+	def testErrors(self):
+		result = server._runJob({'chanFile' : self.path('missing.chan')})
+		self.assertTrue('does not exist' in result['error'])
+		
+		result = server._runJob({'chanFile' : self.chanFile, 'options' : {'reduce' : '1,2,3,4'}})
+		self.assertTrue('tolerances' in result['error'])
+
+
+class TestServer(ServerTestCase):
+
+	def setUp(self):
+		ServerTestCase.setUp(self)
+		self.server = server.createServer('127.0.0.1:0', jobs=1, maxQueue=2, quiet=True)
+		self.thread = threading.Thread(target=self.server.serve_forever)
+		self.thread.start()
+
+	def tearDown(self):
+		self.server.shutdown()
+		self.thread.join()
+		self.server.close()
+		ServerTestCase.tearDown(self)
+
+	def request(self, method, url, body=None):
+		""" Returns the (status, headers, body) of a request """
+		conn = httplib.HTTPConnection(*self.server.server_address)
+		try:
+			conn.request(method, url, body and json.dumps(body))
+			response = conn.getresponse()
+			return response.status, dict(response.getheaders()), response.read()
+		finally:
+			conn.close()
+
+	def testConvert(self):
+		status, headers, body = self.request('POST', '/convert', 
+			{'chanFile' : self.chanFile, 'outFile' : self.path('out.action'), 
+			 'options' : {'format' : 'action', 'reduce' : 0.01}})
+		self.assertEqual(status, 200, body)
+		
+		result = json.loads(body)
+		self.assertEqual(result['files'], [self.path('out.action')])
+		self.assertEqual(sorted(result['timing']), ['convert', 'queued', 'total'])
+		self.assertEqual(len(result['reduction']), 8)
+		
+		status, headers, body = self.request('GET', '/status')
+		status = json.loads(body)
+		self.assertEqual((status['workers'], status['completed'], status['failed']), (1, 1, 0))
+
+	def testStream(self):
+		status, headers, body = self.request('POST', '/convert', 
+			{'chanFile' : self.chanFile, 'stream' : True, 'options' : {'format' : 'fbxbin'}})
+		self.assertEqual(status, 200)
+		self.assertTrue(body.startswith('Kaydara FBX Binary'))
+		self.assertTrue('x-atomsplitter-convert' in headers)
+		self.assertFalse(os.path.exists(os.path.splitext(self.chanFile)[0] + '.fbx'))
+
+	def testStreamAlias(self):
+		status, headers, body = self.request('POST', '/convert', 
+			{'chanFile' : self.chanFile, 'stream' : True, 'options' : {'format' : 'TGD'}})
+		self.assertEqual(status, 200)
+		self.assertTrue(body.startswith('<terragen'), body[:40])
+		self.assertTrue('.tgd' in headers['content-disposition'], headers)
+
+	def testBadJobs(self):
+		for job, status in ((None, 400), ({'options' : {}}, 400),
+							({'chanFile' : self.chanFile, 'options' : {'bogus' : 1}}, 400),
+							({'chanFile' : self.chanFile, 'options' : {'cache' : '/tmp'}}, 400),
+							({'chanFile' : self.chanFile, 'stream' : True, 
+							  'options' : {'format' : 'fbx,action'}}, 400),
+							({'chanFile' : self.path('missing.chan')}, 422)):
+			code, headers, body = self.request('POST', '/convert', job)
+			self.assertEqual(code, status, body)
+			self.assertTrue(json.loads(body)['error'])
+		
+		self.assertEqual(self.request('GET', '/nothing')[0], 404)
+
+
+if __name__ == "__main__":
+	unittest.main()
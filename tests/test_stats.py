@@ -0,0 +1,153 @@
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+
+
+Checks of the conversion timings in core.stats.
+
+Usage:
+	python -m unittest discover -s tests -t .
+"""
+
+import os, json, shutil, tempfile, threading, unittest
+
+from core import ConvertStats, ChanConvert
+from core.stats import NULL_STATS
+from benchmarks.synthetic import makeShot
+from tests.test_cli import CliTestCase
+
+
+class TestConvertStats(unittest.TestCase):
+
+	def testSpans(self):
+		stats = ConvertStats()
+		ended = []
+		stats.addHook(lambda name, seconds: ended.append(name))
+		
+		with stats.span('parse', bytes=10):
+			pass
+		stats.add('parse', 1.5, bytes=5, keys=2)
+		stats.count('write', bytes=7)
+		
+		spans = stats.getSpans()
+		self.assertEqual([span['name'] for span in spans], ['parse', 'write'])
+		self.assertEqual((spans[0]['calls'], spans[0]['bytes'], spans[0]['keys']), (2, 15, 2))
+		self.assertTrue(spans[0]['seconds'] >= 1.5)
+		self.assertEqual((spans[1]['calls'], spans[1]['seconds'], spans[1]['bytes']), (0, 0.0, 7))
+		
+		# counts don't end a span
+		self.assertEqual(ended, ['parse', 'parse'])
+
+	def testSpanOnError(self):
+		stats = ConvertStats()
+		try:
+			with stats.span('fails'):
+				raise ValueError()
+		except ValueError:
+			pass
+		self.assertEqual(stats.getSpans()[0]['calls'], 1)
+
+	def testIterSpan(self):
+		stats = ConvertStats()
+		timed = stats.iterSpan('render', range(5))
+		self.assertEqual(len(timed), 5)
+		self.assertEqual(list(timed), range(5))
+		self.assertEqual(list(timed), range(5))
+		self.assertEqual(stats.getSpans()[0]['calls'], 2)
+		
+		untimed = stats.iterSpan(None, range(3))
+		self.assertEqual(list(untimed), range(3))
+		self.assertTrue(untimed.seconds >= 0)
+		self.assertEqual(len(stats.getSpans()), 1)
+
+	def testThreads(self):
+		stats = ConvertStats()
+		def run():
+			for i in xrange(1000):
+				stats.add('shared', 0.001, keys=1)
+		
+		threads = [threading.Thread(target=run) for i in xrange(8)]
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+		
+		span = stats.getSpans()[0]
+		self.assertEqual((span['calls'], span['keys']), (8000, 8000))
+		self.assertAlmostEqual(span['seconds'], 8.0)
+
+	def testNullStats(self):
+		self.assertFalse(NULL_STATS)
+		with NULL_STATS.span('x'):
+			pass
+		items = [1, 2]
+		self.assertTrue(NULL_STATS.iterSpan('x', items) is items)
+
+	def testReport(self):
+		stats = ConvertStats()
+		stats.add('parse.chan', 0.25, bytes=100)
+		report = stats.report()
+		self.assertEqual(sorted(report), ['peakMemory', 'spans', 'wall'])
+		json.dumps(report)
+		
+		lines = stats.format().splitlines()
+		self.assertTrue(lines[1].startswith('parse.chan'))
+		self.assertTrue('bytes 100' in lines[1])
+
+
+class TestConvertSpans(unittest.TestCase):
+
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.tempDir)
+
+	def testConvert(self):
+		chanFile, objFile = makeShot(self.tempDir, 100, points=50)
+		stats = ConvertStats()
+		converter = ChanConvert(chanFile, objFile=objFile, format='fbx,action', reduce=0.01, stats=stats)
+		written = converter.writeAll()
+		
+		spans = dict((span['name'], span) for span in stats.getSpans())
+		for name in ('parse.chan', 'parse.obj', 'parse.reduce', 'render.fbx', 'render.action', 
+					 'render.keys', 'render.points', 'write.fbx', 'write.action'):
+			self.assertTrue(name in spans, name)
+		
+		# a key for each channel of each frame
+		self.assertEqual(spans['parse.chan']['keys'], 700)
+		self.assertEqual(spans['parse.chan']['bytes'], os.path.getsize(chanFile))
+		self.assertEqual(spans['write.fbx']['bytes'], os.path.getsize(written[0]))
+		self.assertEqual(spans['write.action']['bytes'], os.path.getsize(written[1]))
+
+
+class TestStatsCli(CliTestCase):
+
+	def testStats(self):
+		chanFile, objFile = makeShot(self.tempDir, 50, points=10)
+		code, output = self.runCli('-o', objFile, '--stats', '--statsfile', self.path('stats.json'), chanFile)
+		self.assertEqual(code, 0, output)
+		self.assertTrue('parse.chan' in output, output)
+		
+		report = json.load(open(self.path('stats.json')))
+		names = [span['name'] for span in report['spans']]
+		self.assertTrue('render.fbx' in names and 'write.fbx' in names, names)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,175 @@
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+
+
+Checks of the GUI conversion threads and batch queue in ui. They are
+skipped without PyQt4.
+
+Usage:
+	python -m unittest discover -s tests -t .
+"""
+
+import os, time, shutil, tempfile, unittest
+
+try:
+	from PyQt4.QtCore import QObject, QCoreApplication, SIGNAL
+	from PyQt4.QtGui import QApplication
+except ImportError:
+	QObject = None
+else:
+	from ui.convertThread import ConvertThread
+	from ui.batchQueue import BatchQueue
+
+from benchmarks.synthetic import makeShot, writeChan
+
+# widgets need a display, where the worker threads don't
+HAS_DISPLAY = os.name == 'nt' or bool(os.environ.get('DISPLAY'))
+
+
+@unittest.skipIf(QObject is None, "PyQt4 is not installed")
+class TestConvertThread(unittest.TestCase):
+
+	def setUp(self):
+		self.app = QCoreApplication.instance() or QCoreApplication([])
+		self.tempDir = tempfile.mkdtemp()
+		self.chanFile, self.objFile = makeShot(self.tempDir, 100, points=50)
+		self.outFile = os.path.join(self.tempDir, 'out.fbx')
+		self.emitted = []
+
+	def tearDown(self):
+		shutil.rmtree(self.tempDir)
+
+	def record(self, thread, name):
+		""" Appends (name, args...) to emitted as the signal is emitted """
+		QObject.connect(thread, SIGNAL(name), lambda *args: self.emitted.append((name,) + args))
+
+	def makeThread(self, **kwargs):
+		""" Returns a ConvertThread recording the signals it emits """
+		thread = ConvertThread(self.chanFile, self.outFile, objFile=self.objFile, **kwargs)
+		for name in ('progress', 'converted', 'failed', 'cancelled'):
+			self.record(thread, name)
+		return thread
+
+	def testConverted(self):
+		# run on this thread, so the signals are delivered straight away
+		self.makeThread(format='fbxbin').run()
+		
+		self.assertEqual(self.emitted[-1], ('converted', self.outFile))
+		percents = [signal[2] for signal in self.emitted if signal[0] == 'progress' and signal[2] >= 0]
+		self.assertEqual(percents, sorted(percents))
+		self.assertEqual(percents[-1], 100)
+
+	def testCancelled(self):
+		for outFormat in ('fbx', 'fbxbin', 'action', 'terragen'):
+			del self.emitted[:]
+			thread = self.makeThread(format=outFormat)
+			thread.cancel()
+			thread.run()
+			
+			self.assertEqual(self.emitted[-1], ('cancelled',))
+			self.assertFalse(os.path.exists(self.outFile))
+
+	def testFailed(self):
+		self.chanFile = os.path.join(self.tempDir, 'missing.chan')
+		self.makeThread().run()
+		self.assertEqual(self.emitted[-1][0], 'failed')
+		self.assertTrue('does not exist' in self.emitted[-1][1])
+
+
+@unittest.skipIf(QObject is None or not HAS_DISPLAY, "PyQt4 or a display is not available")
+class TestBatchQueue(unittest.TestCase):
+
+	def setUp(self):
+		self.app = QApplication.instance() or QApplication([])
+		self.tempDir = tempfile.mkdtemp()
+		os.mkdir(self.path('shots'))
+		for seed, name in enumerate(('a.chan', 'b.chan', 'c.chan')):
+			writeChan(self.path('shots', name), 50, seed=seed)
+		
+		self.settings = {'format' : 'fbx'}
+		self.queue = BatchQueue(lambda: dict(self.settings), maxJobs=2)
+
+	def tearDown(self):
+		self.queue.shutdown()
+		shutil.rmtree(self.tempDir)
+
+	def path(self, *names):
+		return os.path.join(self.tempDir, *names)
+
+	def statuses(self):
+		""" Returns the status column of the queue """
+		table = self.queue.table
+		return [str(table.item(row, BatchQueue.STATUS).text()) for row in xrange(table.rowCount())]
+
+	def wait(self, timeout=30):
+		""" Processes events until the queue has finished converting """
+		end = time.time() + timeout
+		while time.time() < end and (self.queue.isRunning() or BatchQueue.QUEUED in self.statuses()):
+			self.app.processEvents()
+			time.sleep(0.01)
+		self.app.processEvents()
+
+	def testAddFiles(self):
+		self.queue.addFiles([self.path('shots')])
+		self.queue.addFiles([self.path('shots', 'a.chan')])
+		self.assertEqual(self.statuses(), [BatchQueue.QUEUED] * 3)
+		self.assertTrue(self.queue.startButton.isEnabled())
+
+	def testConvert(self):
+		self.queue.addFiles([self.path('shots')])
+		self.queue.start()
+		self.wait()
+		
+		self.assertEqual(self.statuses(), [BatchQueue.DONE] * 3)
+		for name in ('a.fbx', 'b.fbx', 'c.fbx'):
+			self.assertTrue(os.path.isfile(self.path('shots', name)))
+		
+		self.queue.clearFinished()
+		self.assertEqual(self.statuses(), [])
+
+	def testRetry(self):
+		fh = open(self.path('shots', 'b.chan'), 'w')
+		fh.write('1 2 3\n')
+		fh.close()
+		
+		self.queue.addFiles([self.path('shots')])
+		self.queue.start()
+		self.wait()
+		self.assertEqual(self.statuses(), [BatchQueue.DONE, BatchQueue.FAILED, BatchQueue.DONE])
+		self.assertTrue(self.queue.retryButton.isEnabled())
+		
+		writeChan(self.path('shots', 'b.chan'), 50)
+		self.queue.retry()
+		self.wait()
+		self.assertEqual(self.statuses(), [BatchQueue.DONE] * 3)
+		self.assertFalse(os.path.isfile(self.path('shots', 'a_1.fbx')))
+
+	def testBadSettings(self):
+		def getSettings():
+			raise ValueError("Bad settings")
+		
+		queue = BatchQueue(getSettings)
+		queue.addFiles([self.path('shots')])
+		queue.start()
+		self.assertFalse(queue.isRunning())
+		self.assertEqual(str(queue.summary.text()), "Bad settings")
+
+
+if __name__ == "__main__":
+	unittest.main()
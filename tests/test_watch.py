@@ -0,0 +1,159 @@
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+
+
+Checks of the watch folder converter in core.watch.
+
+Usage:
+	python -m unittest discover -s tests -t .
+"""
+
+import os, json, time, shutil, tempfile, unittest
+
+from core import ChanWatcher
+from benchmarks.synthetic import writeChan, writeObj
+
+
+class TestChanWatcher(unittest.TestCase):
+
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp()
+		os.makedirs(self.path('shots', 'sub'))
+		self.results = []
+
+	def tearDown(self):
+		shutil.rmtree(self.tempDir)
+
+	def path(self, *names):
+		return os.path.join(self.tempDir, *names)
+
+	def watcher(self):
+		return ChanWatcher([self.path('shots')], jobs=1, settle=0, ledger=self.path('watch.json'),
+						   callback=self.results.append)
+
+	def convert(self):
+		""" Polls a new watcher until it is idle, returning the chan files converted """
+		del self.results[:]
+		watcher = self.watcher()
+		try:
+			timeout = time.time() + 30
+			while watcher.poll():
+				self.assertTrue(time.time() < timeout, "the watcher never went idle")
+				time.sleep(0.02)
+		finally:
+			watcher.close()
+		return sorted(result[0] for result in self.results)
+
+	def touch(self, filename, offset=10):
+		""" Moves the modification time of a file forward """
+		st = os.stat(filename)
+		os.utime(filename, (st.st_atime, st.st_mtime + offset))
+
+	def testScan(self):
+		writeChan(self.path('shots', 'a.chan'), 10)
+		writeObj(self.path('shots', 'a.obj'), 5)
+		writeChan(self.path('shots', 'sub', 'b.CHAN'), 10)
+		writeObj(self.path('shots', 'sub', 'other.obj'), 5)
+		
+		found = self.watcher().scan()
+		self.assertEqual(sorted(found), [self.path('shots', 'a.chan'), self.path('shots', 'sub', 'b.CHAN')])
+		self.assertEqual(found[self.path('shots', 'a.chan')][2], self.path('shots', 'a.obj'))
+		self.assertEqual(found[self.path('shots', 'sub', 'b.CHAN')][2], '')
+
+	def testConvertOnce(self):
+		chanFile = self.path('shots', 'a.chan')
+		writeChan(chanFile, 10)
+		writeObj(self.path('shots', 'a.obj'), 5)
+		
+		self.assertEqual(self.convert(), [chanFile])
+		self.assertTrue(os.path.isfile(self.path('shots', 'a.fbx')))
+		self.assertEqual(self.results[0][1], [self.path('shots', 'a.fbx')])
+		
+		ledger = json.load(open(self.path('watch.json')))
+		self.assertEqual(sorted(ledger['files']), [chanFile])
+		
+		# unchanged files aren't converted again, across restarts
+		self.assertEqual(self.convert(), [])
+		
+		# nor touched files with the same contents
+		self.touch(chanFile)
+		self.assertEqual(self.convert(), [])
+		self.assertEqual(self.convert(), [])
+		
+		# a changed .chan or .obj file is, over the previous output
+		writeObj(self.path('shots', 'a.obj'), 6)
+		self.touch(self.path('shots', 'a.obj'), 20)
+		self.assertEqual(self.convert(), [chanFile])
+		self.assertEqual(os.listdir(self.path('shots')).count('a_1.fbx'), 0)
+
+	def testBurst(self):
+		# more files than the watcher keeps in its workers, so some wait 
+		# in its queue across several scans
+		chanFiles = [self.path('shots', 'shot%d.chan' % i) for i in xrange(8)]
+		for chanFile in chanFiles:
+			writeChan(chanFile, 10)
+		
+		self.assertEqual(self.convert(), chanFiles)
+		for chanFile in chanFiles:
+			self.assertTrue(os.path.isfile(chanFile[:-4] + 'fbx'))
+		self.assertEqual(self.convert(), [])
+
+	def testFailures(self):
+		chanFile = self.path('shots', 'bad.chan')
+		fh = open(chanFile, 'w')
+		fh.write('1 2 3\n')
+		fh.close()
+		
+		watcher = self.watcher()
+		try:
+			timeout = time.time() + 30
+			while watcher.poll() and time.time() < timeout:
+				time.sleep(0.02)
+			self.assertEqual(len(self.results), 1)
+			self.assertTrue(self.results[0][2])
+			
+			# not tried again until it changes
+			self.touch(chanFile)
+			while watcher.poll() and time.time() < timeout:
+				time.sleep(0.02)
+			self.assertEqual(len(self.results), 1)
+			
+			writeChan(chanFile, 10)
+			self.touch(chanFile, 20)
+			while watcher.poll() and time.time() < timeout:
+				time.sleep(0.02)
+			self.assertEqual(len(self.results), 2)
+			self.assertFalse(self.results[1][2])
+		finally:
+			watcher.close()
+
+	def testBadLedger(self):
+		fh = open(self.path('watch.json'), 'w')
+		fh.write('{"version" : 0, "files" : {"x" : 1}}')
+		fh.close()
+		self.assertEqual(self.watcher().ledger, {})
+		
+		fh = open(self.path('watch.json'), 'w')
+		fh.write('not json')
+		fh.close()
+		self.assertEqual(self.watcher().ledger, {})
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,448 @@
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+Written by: Justin Israel
+			justinisrael@gmail.com
+			justinfx.com
+
+"""
+
+import time
+import multiprocessing
+from os import path
+
+from PyQt4.QtCore import *
+from PyQt4.QtGui import *
+
+from core import expandChanFiles
+from core.batch import _initQueueWorker, _queueConvert
+from ui.convertThread import ConvertThread
+
+############################################################# 
+#############################################################
+######## PoolListener
+############################################################# 
+############################################################# 
+class PoolListener(QThread):
+	"""
+	PoolListener(QThread)
+	
+	Waits on the message queue of the batch queue's worker
+	processes, and passes each message on to the GUI thread.
+	Stops at a None message.
+	
+	Emits:
+		message (tuple message) - see core.batch._queueConvert()
+	"""
+	
+	def __init__(self, messages, parent=None):
+		super(PoolListener, self).__init__(parent)
+		self.messages = messages
+	
+	def run(self):
+		while True:
+			message = self.messages.get()
+			if message is None:
+				break
+			self.emit(SIGNAL("message"), message)
+
+############################################################# 
+#############################################################
+######## BatchQueue
+############################################################# 
+############################################################# 
+class BatchQueue(QWidget):
+	"""
+	BatchQueue(QWidget)
+	
+	A queue of .chan files, converted with the same settings
+	a few at a time in a pool of worker processes, so the 
+	conversions run in parallel rather than taking turns on 
+	the GUI process's interpreter. Files are added by dropping 
+	them (or folders of them) on the queue, or with Add Files. 
+	Each is written next to its source, with a same-named .obj 
+	beside it as the point cloud.
+	
+	Each row shows the file's status, conversion time and 
+	output size. Failed rows can be retried on their own.
+	"""
+	
+	FILE, STATUS, TIME, OUTPUT = range(4)
+	
+	QUEUED = "Queued"
+	RUNNING = "Converting"
+	DONE = "Done"
+	FAILED = "Failed"
+	CANCELLED = "Cancelled"
+	
+	def __init__(self, getSettings, parent=None, maxJobs=0):
+		"""
+		__init__(callable getSettings, parent=None, int maxJobs=0)
+		
+			callable getSettings - returns the ChanConvert keywords shared by every
+								   file. May raise ValueError with a message for the 
+								   user if the settings aren't valid
+			int maxJobs - files converted at once, each in a worker process. 
+						  0 uses one per cpu
+		"""
+		super(BatchQueue, self).__init__(parent)
+		
+		self.getSettings = getSettings
+		self.maxJobs = maxJobs or multiprocessing.cpu_count()
+		
+		self.__jobs = []
+		self.__settings = {}
+		self.__active = False
+		self.__prevDir = None
+		
+		# the worker processes are started with the first conversion
+		self.__pool = None
+		self.__messages = None
+		self.__cancelFlag = None
+		self.__listener = None
+		# job key -> job, of the files in a worker
+		self.__running = {}
+		self.__lastKey = 0
+		
+		self.setAcceptDrops(True)
+		
+		self.table = QTableWidget(0, 4, self)
+		self.table.setHorizontalHeaderLabels(["File", "Status", "Time", "Output"])
+		self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+		self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+		self.table.verticalHeader().hide()
+		self.table.horizontalHeader().setResizeMode(self.FILE, QHeaderView.Stretch)
+		
+		self.addButton = QPushButton("Add Files...", self)
+		self.removeButton = QPushButton("Remove", self)
+		self.retryButton = QPushButton("Retry", self)
+		self.clearButton = QPushButton("Clear Finished", self)
+		self.startButton = QPushButton("Start", self)
+		self.cancelButton = QPushButton("Cancel", self)
+		self.summary = QLabel("Drop .chan files or folders here", self)
+		self.summary.setWordWrap(True)
+		
+		buttons = QHBoxLayout()
+		buttons.setSpacing(6)
+		for button in (self.addButton, self.removeButton, self.retryButton, self.clearButton):
+			buttons.addWidget(button)
+		buttons.addStretch()
+		buttons.addWidget(self.startButton)
+		buttons.addWidget(self.cancelButton)
+		
+		layout = QVBoxLayout(self)
+		layout.setSpacing(4)
+		layout.setContentsMargins(6, 6, 6, 6)
+		layout.addWidget(self.table)
+		layout.addWidget(self.summary)
+		layout.addLayout(buttons)
+		
+		# running times are refreshed while files convert
+		self._timer = QTimer(self)
+		self._timer.setInterval(500)
+		
+		self.connect(self.addButton, SIGNAL("clicked()"), self.browse)
+		self.connect(self.removeButton, SIGNAL("clicked()"), self.removeSelected)
+		self.connect(self.retryButton, SIGNAL("clicked()"), self.retry)
+		self.connect(self.clearButton, SIGNAL("clicked()"), self.clearFinished)
+		self.connect(self.startButton, SIGNAL("clicked()"), self.start)
+		self.connect(self.cancelButton, SIGNAL("clicked()"), self.cancel)
+		self.connect(self.table, SIGNAL("itemSelectionChanged()"), self._updateButtons)
+		self.connect(self._timer, SIGNAL("timeout()"), self._updateTimes)
+		
+		self._updateButtons()
+	
+	def addFiles(self, paths):
+		""" 
+		addFiles(list paths)
+		
+		Queues the .chan files named by a list of files, globs and
+		directories, skipping those already waiting in the queue.
+		"""
+		waiting = set(job['chanFile'] for job in self.__jobs 
+					  if job['status'] in (self.QUEUED, self.RUNNING))
+		
+		for chanFile in expandChanFiles(paths):
+			chanFile = path.abspath(chanFile)
+			if chanFile in waiting:
+				continue
+			waiting.add(chanFile)
+			
+			job = {'chanFile' : chanFile, 'status' : self.QUEUED, 'key' : None, 
+				   'start' : 0, 'elapsed' : None, 'percent' : 0, 'written' : None, 'error' : None}
+			self.__jobs.append(job)
+			self.table.insertRow(self.table.rowCount())
+			self._updateRow(job)
+		
+		if self.__active:
+			self._startNext()
+		self._updateButtons()
+	
+	def browse(self):
+		""" Queues .chan files picked from a file dialog """
+		if self.__prevDir:
+			homedir = self.__prevDir
+		else:
+			homedir = QDir.toNativeSeparators( QDir.homePath() )
+		
+		filenames = [str(f) for f in QFileDialog.getOpenFileNames(self, "Add .chan files",
+																	homedir, "Chan File (*.chan)")]
+		if filenames:
+			self.__prevDir = path.dirname(filenames[0])
+			self.addFiles(filenames)
+	
+	def start(self):
+		""" Starts converting the queued files, with the current settings """
+		try:
+			self.__settings = self.getSettings()
+		except ValueError, e:
+			self.summary.setText(str(e))
+			return
+		
+		self.__active = True
+		self._startNext()
+	
+	def cancel(self):
+		""" Stops the running conversions. Queued files are left queued """
+		self.__active = False
+		if self.__running:
+			# cleared once they have all stopped
+			self.__cancelFlag.value = 1
+		self._updateButtons()
+	
+	def retry(self):
+		""" Queues the selected failed or cancelled files again, or all of them if none are selected """
+		jobs = self._selectedJobs() or self.__jobs
+		
+		for job in jobs:
+			if job['status'] in (self.FAILED, self.CANCELLED):
+				job.update(status=self.QUEUED, percent=0, elapsed=None, error=None)
+				self._updateRow(job)
+		
+		self.start()
+	
+	def removeSelected(self):
+		""" Removes the selected files that aren't converting """
+		for job in self._selectedJobs():
+			if job['status'] != self.RUNNING:
+				self._removeJob(job)
+		self._updateButtons()
+	
+	def clearFinished(self):
+		""" Removes the converted files from the queue """
+		for job in list(self.__jobs):
+			if job['status'] == self.DONE:
+				self._removeJob(job)
+		self._updateButtons()
+	
+	def isRunning(self):
+		return bool(self.__running)
+	
+	def shutdown(self):
+		""" Cancels the running conversions, and stops the worker processes """
+		self.cancel()
+		if self.__pool is None:
+			return
+		
+		self.__pool.close()
+		self.__pool.join()
+		self.__pool = None
+		
+		self.__messages.put(None)
+		self.__listener.wait()
+		self.__listener = None
+		
+		for job in self.__running.values():
+			job.update(status=self.CANCELLED, key=None, elapsed=time.time() - job['start'])
+			self._updateRow(job)
+		self.__running.clear()
+		self._updateButtons()
+	
+	def dragEnterEvent(self, event):
+		if event.mimeData().hasUrls():
+			event.acceptProposedAction()
+	
+	def dropEvent(self, event):
+		paths = [str(url.toLocalFile()) for url in event.mimeData().urls()]
+		paths = [p for p in paths if p]
+		if paths:
+			self.addFiles(paths)
+			event.acceptProposedAction()
+	
+	def _startNext(self):
+		""" Starts queued files until maxJobs are converting """
+		running = len(self.__running)
+		
+		if self.__cancelFlag is not None and self.__cancelFlag.value:
+			if running:
+				# new files would be cancelled too, until these have stopped
+				self._updateButtons()
+				return
+			self.__cancelFlag.value = 0
+		
+		for job in self.__jobs:
+			if running >= self.maxJobs:
+				break
+			if job['status'] == self.QUEUED:
+				self._run(job)
+				running += 1
+		
+		if not running:
+			self.__active = False
+			self._timer.stop()
+		
+		self._updateButtons()
+	
+	def _startPool(self):
+		""" Starts the worker processes, and the thread that listens to them """
+		self.__messages = multiprocessing.Queue()
+		self.__cancelFlag = multiprocessing.RawValue('b', 0)
+		self.__pool = multiprocessing.Pool(self.maxJobs, _initQueueWorker, 
+										   (self.__messages, self.__cancelFlag))
+		
+		self.__listener = PoolListener(self.__messages, self)
+		self.connect(self.__listener, SIGNAL("message"), self._jobMessage)
+		self.__listener.start()
+	
+	def _run(self, job):
+		""" Converts one file in a worker process """
+		if self.__pool is None:
+			self._startPool()
+		
+		options = dict(self.__settings)
+		
+		objFile = '%s.obj' % path.splitext(job['chanFile'])[0]
+		if path.isfile(objFile):
+			options['objFile'] = objFile
+		
+		self.__lastKey += 1
+		key = self.__lastKey
+		self.__running[key] = job
+		
+		job.update(status=self.RUNNING, key=key, start=time.time(), percent=0, 
+				   elapsed=None, written=None, error=None)
+		self._updateRow(job)
+		
+		self.__pool.apply_async(_queueConvert, ((key, job['chanFile'], options, ''),))
+		self._timer.start()
+	
+	def _jobMessage(self, message):
+		""" Records a message from a worker process, see core.batch._queueConvert() """
+		kind, key = message[:2]
+		job = self.__running.get(key)
+		if job is None:
+			return
+		
+		if kind == 'progress':
+			stage, fraction = message[2:]
+			start, end = ConvertThread.STAGES.get(stage, (0, 100))
+			if fraction is None:
+				job['percent'] = -1
+			else:
+				job['percent'] = int(start + (end - start) * fraction)
+			self._updateRow(job)
+			return
+		
+		if kind == 'converted':
+			job.update(status=self.DONE, written=message[2])
+		elif kind == 'failed':
+			job.update(status=self.FAILED, error=message[2])
+		else:
+			job['status'] = self.CANCELLED
+		
+		self._jobFinished(job)
+	
+	def _jobFinished(self, job):
+		""" Records a finished conversion, and starts the next queued file """
+		del self.__running[job['key']]
+		job.update(key=None, elapsed=time.time() - job['start'])
+		
+		if job in self.__jobs:
+			self._updateRow(job)
+		
+		if self.__active:
+			self._startNext()
+		else:
+			self._updateButtons()
+	
+	def _removeJob(self, job):
+		self.table.removeRow(self.__jobs.index(job))
+		self.__jobs.remove(job)
+	
+	def _selectedJobs(self):
+		rows = sorted(set(index.row() for index in self.table.selectedIndexes()))
+		return [self.__jobs[row] for row in rows]
+	
+	def _setCell(self, row, column, text, toolTip=''):
+		item = self.table.item(row, column)
+		if item is None:
+			item = QTableWidgetItem()
+			self.table.setItem(row, column, item)
+		item.setText(text)
+		item.setToolTip(toolTip)
+	
+	def _updateRow(self, job):
+		""" Shows a job's state in its row """
+		row = self.__jobs.index(job)
+		status = job['status']
+		
+		self._setCell(row, self.FILE, path.basename(job['chanFile']), job['chanFile'])
+		
+		if status == self.RUNNING:
+			if job['percent'] < 0:
+				self._setCell(row, self.STATUS, "Writing...")
+			else:
+				self._setCell(row, self.STATUS, "%s %d%%" % (status, job['percent']))
+		else:
+			self._setCell(row, self.STATUS, status, job['error'] or '')
+		
+		elapsed = job['elapsed']
+		if elapsed is None and job['key'] is not None:
+			elapsed = time.time() - job['start']
+		self._setCell(row, self.TIME, elapsed is not None and "%.1f s" % elapsed or '')
+		
+		written = job['written']
+		if written and path.isfile(written):
+			size = path.getsize(written) / (1024.0 * 1024.0)
+			self._setCell(row, self.OUTPUT, "%.2f MB" % size, written)
+		else:
+			self._setCell(row, self.OUTPUT, '')
+	
+	def _updateTimes(self):
+		for job in self.__running.values():
+			if job in self.__jobs:
+				self._updateRow(job)
+	
+	def _updateButtons(self):
+		""" Enables the buttons that apply, and updates the summary """
+		counts = dict.fromkeys((self.QUEUED, self.RUNNING, self.DONE, self.FAILED, self.CANCELLED), 0)
+		for job in self.__jobs:
+			counts[job['status']] += 1
+		
+		selected = self._selectedJobs()
+		
+		self.removeButton.setEnabled(any(job['status'] != self.RUNNING for job in selected))
+		self.retryButton.setEnabled(bool(counts[self.FAILED] or counts[self.CANCELLED]))
+		self.clearButton.setEnabled(bool(counts[self.DONE]))
+		self.startButton.setEnabled(bool(counts[self.QUEUED]) and not self.__active)
+		self.cancelButton.setEnabled(self.isRunning())
+		
+		if self.__jobs:
+			self.summary.setText("%d queued, %d converting, %d done, %d failed, %d cancelled" % 
+								 (counts[self.QUEUED], counts[self.RUNNING], counts[self.DONE], 
+								  counts[self.FAILED], counts[self.CANCELLED]))
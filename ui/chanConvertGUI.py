@@ -0,0 +1,419 @@
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+Written by: Justin Israel
+			justinisrael@gmail.com
+			justinfx.com
+
+"""
+
+from os import path
+from functools import partial
+
+from PyQt4.QtCore import *
+from PyQt4.QtGui import *
+
+from core import ChanConvert
+
+from ui.chanToFbxUI import Ui_MainWindow
+from ui.convertThread import ConvertThread
+from ui.batchQueue import BatchQueue
+
+############################################################# 
+#############################################################
+######## ChanConverGUI
+############################################################# 
+############################################################# 
+class ChanConverGUI(QMainWindow, Ui_MainWindow):
+	"""
+
+	"""
+	
+	def __init__(self, parent=None, **kwargs):
+		super(ChanConverGUI, self).__init__(parent)
+		self.setupUi(self)
+		self.setWindowTitle("AtomSplitter v%s" % ChanConvert.VERSION)
+		
+		self.__prevDir = None
+		self.__chatLoaded = False
+		self.__thread = None
+		
+		self.setStatusBar(None)
+		
+		# conversion progress, shown beside the convert button while running
+		self.progressBar = QProgressBar(self.settingsPage)
+		self.progressBar.setRange(0, 100)
+		self.progressBar.setMinimumWidth(180)
+		self.progressBar.hide()
+		self.horizontalLayout.insertWidget(1, self.progressBar)
+		
+		# batch queue page, converting many files with the settings page values
+		self.batchQueue = BatchQueue(self._getSettings)
+		self.stack.addWidget(self.batchQueue)
+		
+		self.batchBtn = QPushButton("Batch", self.buttonBar)
+		self.batchBtn.setMinimumSize(QSize(80, 54))
+		self.batchBtn.setCheckable(True)
+		self.batchBtn.setFlat(True)
+		self.batchBtn.setObjectName("batchBtn")
+		self.horizontalLayout_3.insertWidget(self.horizontalLayout_3.indexOf(self.aboutBtn) + 1, self.batchBtn)
+		
+		self.toolButtons = QButtonGroup(self)
+		self.toolButtons.addButton(self.settingsBtn)
+		self.toolButtons.addButton(self.aboutBtn)
+		self.toolButtons.addButton(self.batchBtn)
+
+		self.fileTypeButtons = QButtonGroup(self)
+		self.fileTypeButtons.addButton(self.radioFbx, 0)
+		self.fileTypeButtons.addButton(self.radioAction, 1)
+		self.fileTypeButtons.addButton(self.radioTerragen, 2)
+		
+		numValidator   = QRegExpValidator(QRegExp(r'\d+'), self)
+		floatValidator = QRegExpValidator(QRegExp(r'\d+\.?\d*'), self)
+		self.widthField.setValidator(numValidator)
+		self.heightField.setValidator(numValidator)
+		self.hfaField.setValidator(floatValidator)
+		self.vfaField.setValidator(floatValidator)
+		self.fpsField.setValidator(floatValidator)
+	
+		def focusEvent(event):
+			self._objFieldClicked()
+			QLineEdit.focusInEvent(self.objFileField, event)
+			
+		self.objFileField.focusInEvent = focusEvent
+
+
+				
+		# tool tips
+		self.__toolTips = {}
+		self.__toolTips['chan'] = "In Nuke, select your desired Camera node and press its 'export chan file' " \
+								  "button. Save this camera data as a .chan file"
+		self.__toolTips['obj'] = "In Nuke, create a WriteGeo node and connect it to the output of your pointCloud " \
+								 "node. From this node, export the pointCloud geometry to an .obj file"
+		self.__toolTips['out'] = ".fbx or .action file to be exported after conversion"
+		self.__toolTips['fbx'] = "Output filetype is FBX format"
+		self.__toolTips['action'] = "Output filetype is .action format for Flame"
+		self.__toolTips['tgd'] = "Output filetype is TGD format for Terragen"
+		self.__toolTips['scale'] = "Translation values are scaled by this number (multiplied)"
+
+		self.objFileField.mouseMoveEvent = partial(self._setInfoLine, 'obj')
+		self.objFileButton.mouseMoveEvent = partial(self._setInfoLine, 'obj')
+		self.sourceFileField.mouseMoveEvent = partial(self._setInfoLine, 'chan')
+		self.sourceFileButton.mouseMoveEvent = partial(self._setInfoLine, 'chan')
+		self.outFileField.mouseMoveEvent = partial(self._setInfoLine, 'out')
+		self.outFileButton.mouseMoveEvent = partial(self._setInfoLine, 'out')
+		
+		self.radioFbx.mouseMoveEvent = partial(self._setInfoLine, 'fbx')
+		self.radioAction.mouseMoveEvent = partial(self._setInfoLine, 'action')
+		self.radioTerragen.mouseMoveEvent = partial(self._setInfoLine, 'tgd')
+		
+		self.scaleField.mouseMoveEvent = partial(self._setInfoLine, 'scale')
+		
+		self.groupBox.mouseMoveEvent = partial(self._setInfoLine, '')
+
+	
+		# form values
+		self.sourceFileField.setText(kwargs.get('chan', ""))
+		self.widthField.setText(str(kwargs.get('width', ChanConvert.DEFAULT_WIDTH)))
+		self.heightField.setText(str(kwargs.get('height', ChanConvert.DEFAULT_HEIGHT)))
+		self.hfaField.setText(str(kwargs.get('filmWidth', ChanConvert.DEFAULT_FILMWIDTH)))
+		self.vfaField.setText(str(kwargs.get('filmHeight', ChanConvert.DEFAULT_FILMHEIGHT)))
+		self.fpsField.setText(str(kwargs.get('fps', ChanConvert.DEFAULT_FPS)))
+		self.scaleField.setText(str(kwargs.get('scaleValue', ChanConvert.DEFAULT_SCALEVALUE)))
+		
+		if kwargs.get('doAction', False):
+			self.radioAction.setChecked(True)
+		
+		# connections
+		self.connect(self.quitButton, SIGNAL("clicked()"), self.close)
+		self.connect(self.convertButton, SIGNAL("clicked()"), self.convert)
+		self.connect(self.sourceFileButton, SIGNAL("clicked()"), self.setSourceFile)
+		self.connect(self.objFileButton, SIGNAL("clicked()"), self.setObjFile)
+		self.connect(self.outFileButton, SIGNAL("clicked()"), self.setOutFile)
+		self.connect(self.sourceFileField, SIGNAL("textChanged(const QString&)"), self._syncOutFile)
+		self.connect(self.fileTypeButtons, SIGNAL("buttonClicked(int)"), self.fileTypeChanged)
+		self.connect(self.cmiSmallButton, SIGNAL("clicked()"), self._linkToCMI)
+		self.connect(self.cmiLogoButton, SIGNAL("clicked()"), self._linkToCMI)
+		
+		cbk = partial(self.stack.setCurrentIndex, 0)
+		self.connect(self.settingsBtn, SIGNAL("clicked()"), cbk)
+		cbk = partial(self.stack.setCurrentIndex, 1)
+		self.connect(self.aboutBtn, SIGNAL("clicked()"), cbk)	
+		cbk = partial(self.stack.setCurrentWidget, self.batchQueue)
+		self.connect(self.batchBtn, SIGNAL("clicked()"), cbk)	
+		
+		QTimer.singleShot(1, self._initDelayed)
+	
+			
+	def _initDelayed(self):
+		""" """
+        pass
+
+				
+	def convert(self):
+		""" """
+		# the convert button cancels while a conversion is running
+		if self.__thread is not None:
+			self.cancelConvert()
+			return
+		
+		error = ""
+		try:
+			settings = self._getSettings()
+		except ValueError, e:
+			error = str(e)
+		
+		for field in (self.sourceFileField, self.outFileField):
+			if not str(field.text()).strip():
+				error = "All fields must be filled in!"
+				break
+		
+		if not error and not path.isfile(str(self.sourceFileField.text())):
+			error = "Source .chan file does not exist!"
+
+		if error:
+			msg = QMessageBox(self)
+			msg.setText(error)
+			msg.exec_()
+			return
+		
+		if self.objFileField.text() == '[Optional]':
+			self.objFileField.clear()
+			
+		# do the convert, on a worker thread
+		self.__thread = ConvertThread(str(self.sourceFileField.text()),
+								str(self.outFileField.text()),
+								self,
+								objFile = str(self.objFileField.text()),
+								**settings)
+		
+		self.connect(self.__thread, SIGNAL("progress"), self._convertProgress)
+		self.connect(self.__thread, SIGNAL("converted"), self._convertDone)
+		self.connect(self.__thread, SIGNAL("failed"), self._convertFailed)
+		self.connect(self.__thread, SIGNAL("cancelled"), self._convertCancelled)
+		self.connect(self.__thread, SIGNAL("finished()"), self._convertFinished)
+		
+		self._setConverting(True)
+		self.__thread.start()
+	
+	def _getSettings(self):
+		"""
+		_getSettings() -> dict
+		
+		Returns the ChanConvert keywords of the settings fields, shared
+		by single and batch conversions. Raises ValueError if any are empty.
+		"""
+		for field in (self.widthField, self.heightField, 
+						self.hfaField, self.vfaField, 
+						self.fpsField, self.scaleField):
+			
+			if not str(field.text()).strip():
+				raise ValueError("All fields must be filled in!")
+		
+		format = 'fbx'
+		formatID = self.fileTypeButtons.checkedId()
+		if formatID == 1:
+			format = 'action'
+		elif formatID == 2:
+			format = 'tgd'
+		
+		return dict(fps = float(str(self.fpsField.text())),
+					width = int(str(self.widthField.text())),
+					height = int(str(self.heightField.text())),
+					filmWidth = float(str(self.hfaField.text())),
+					filmHeight = float(str(self.vfaField.text())),
+					format = format,
+					scaleValue = float(str(self.scaleField.text())))
+	
+	def cancelConvert(self):
+		""" Stops a running conversion """
+		if self.__thread is not None:
+			self.__thread.cancel()
+			self.convertButton.setEnabled(False)
+			self.progressBar.setFormat("Cancelling...")
+	
+	def closeEvent(self, event):
+		""" Stops running conversions before closing """
+		if self.__thread is not None:
+			self.__thread.cancel()
+			self.__thread.wait()
+		
+		self.batchQueue.shutdown()
+		
+		super(ChanConverGUI, self).closeEvent(event)
+	
+	def _setConverting(self, converting):
+		""" Switches the form between running a conversion and editing it """
+		self.groupBox.setEnabled(not converting)
+		self.subGroupBox.setEnabled(not converting)
+		self.convertButton.setEnabled(True)
+		
+		if converting:
+			self.convertButton.setText("Cancel")
+			self.progressBar.setRange(0, 100)
+			self.progressBar.setValue(0)
+			self.progressBar.setFormat("Reading %p%")
+			self.progressBar.show()
+		else:
+			self.convertButton.setText("Convert")
+			self.progressBar.hide()
+	
+	def _convertProgress(self, stage, percent):
+		""" """
+		if self.__thread is None or self.__thread.isCancelled():
+			return
+		
+		label = {'parse' : "Reading", 'render' : "Rendering", 'write' : "Writing"}.get(stage, stage)
+		
+		if percent < 0:
+			# writing as it renders, with no known end. Shows as busy
+			self.progressBar.setRange(0, 0)
+		else:
+			self.progressBar.setRange(0, 100)
+			self.progressBar.setValue(percent)
+		
+		self.progressBar.setFormat("%s %%p%%" % label)
+	
+	def _convertDone(self, written):
+		""" """
+		self._convertFinished()
+		
+		msg = QMessageBox(self)
+		msg.setText("Wrote out:\n\n%s" % written)
+		msg.exec_()
+	
+	def _convertFailed(self, error):
+		""" """
+		self._convertFinished()
+		
+		msg = QMessageBox(self)
+		msg.setText("Failed with the following:\n\n%s" % error)
+		msg.exec_()
+	
+	def _convertCancelled(self):
+		""" """
+		self._convertFinished()
+		self.infoLine.setText("Conversion cancelled")
+	
+	def _convertFinished(self):
+		""" """
+		if self.__thread is None:
+			return
+		
+		self.__thread.wait()
+		self.__thread.deleteLater()
+		self.__thread = None
+		self._setConverting(False)
+					
+		
+	def fileTypeChanged(self, id):
+		""" """
+		val = str(self.outFileField.text())
+
+		self.objFileField.setEnabled(True)
+		self.objFileButton.setEnabled(True)
+			
+		if id == 0:
+			out = "%s.fbx" % path.splitext(val)[0]
+		elif id == 1:
+			out = "%s.action" % path.splitext(val)[0]	
+		else:
+			self.objFileField.setEnabled(False)
+			self.objFileButton.setEnabled(False)
+			out = "%s.tgd" % path.splitext(val)[0]		
+		
+		if val:
+			self.outFileField.setText(out)
+		
+	def setSourceFile(self):
+		""" """
+		
+		if self.__prevDir:
+			homedir = self.__prevDir
+		else:
+			homedir = QDir.toNativeSeparators( QDir.homePath() )
+			
+		filename = QFileDialog.getOpenFileName(self, "Source .chan file",
+												homedir, "Chan File (*.chan)")
+		
+		self.__prevDir = path.dirname(str(filename))
+		
+		if filename:
+			self.sourceFileField.setText(filename)
+
+	def setObjFile(self):
+		""" """
+		
+		if self.__prevDir:
+			homedir = self.__prevDir
+		else:
+			homedir = QDir.toNativeSeparators( QDir.homePath() )
+			
+		filename = QFileDialog.getOpenFileName(self, "Source PointCloud .obj file",
+												homedir, "Nuke Obj File (*.obj)")
+		
+		self.__prevDir = path.dirname(str(filename))
+		
+		if filename:
+			self.objFileField.setText(filename)
+					
+	def setOutFile(self):
+		""" """
+		filterStr = "FBX (*.fbx)"
+		if self.radioAction.isChecked():
+			filterStr = "Action (*.action)"
+		elif self.radioTerragen.isChecked():
+			filterStr = "Terragen (*.tgd)"
+					
+		if self.__prevDir:
+			homedir = self.__prevDir
+		else:
+			homedir = ""
+				
+		filename = QFileDialog.getSaveFileName(self, "Output file",
+												homedir, filterStr)
+		
+		self.outFileField.setText(filename)
+
+	def _objFieldClicked(self):
+		""" """
+		if self.objFileField.text() == '[Optional]':
+			self.objFileField.clear()
+
+	def _linkToCMI(self):
+		""" """
+		
+		service = QDesktopServices()
+		service.openUrl(QUrl("http://cmivfx.com/"))
+			
+	def _syncOutFile(self):
+		""" """
+		val = str(self.sourceFileField.text())
+		
+		if self.radioAction.isChecked():
+			out = "%s.action" % path.splitext(val)[0]
+		elif self.radioTerragen.isChecked():
+			out = "%s.tgd" % path.splitext(val)[0]
+		else:
+			out = "%s.fbx" % path.splitext(val)[0]
+			
+		self.outFileField.setText(out)
+
+	def _setInfoLine(self, typeName, *args, **kwargs):
+		""" """
+		self.infoLine.setText(self.__toolTips.get(typeName, ''))
@@ -0,0 +1,99 @@
+"""
+Copyright (c) 2010 cmiVFX.com <info@cmivfx.com>
+
+This file is part of AtomSplitter.
+
+AtomSplitter is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+AtomSplitter is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with AtomSplitter.  If not, see <http://www.gnu.org/licenses/>.
+
+Written by: Justin Israel
+			justinisrael@gmail.com
+			justinfx.com
+
+"""
+
+from PyQt4.QtCore import *
+
+from core import ChanConvert, ConvertCancelled
+
+############################################################# 
+#############################################################
+######## ConvertThread
+############################################################# 
+############################################################# 
+class ConvertThread(QThread):
+	"""
+	ConvertThread(QThread)
+	
+	Runs a conversion off the GUI thread, so the window stays
+	responsive while large files are written.
+	
+	Emits:
+		progress (str stage, int percent) - percent of the whole conversion,
+											or -1 while it isn't known
+		converted (str fileWritten)
+		failed (str error)
+		cancelled ()
+	"""
+	
+	# stage -> (start, end) percent of the whole conversion
+	STAGES = {'parse' : (0, 40), 'render' : (40, 50), 'write' : (50, 100)}
+	
+	def __init__(self, chanFile, outFile, parent=None, **kwargs):
+		"""
+		__init__(str chanFile, str outFile, parent=None, **kwargs)
+		
+		Keywords are passed to ChanConvert.
+		"""
+		super(ConvertThread, self).__init__(parent)
+		
+		self.chanFile = chanFile
+		self.outFile = outFile
+		self.options = kwargs
+		
+		self.__cancelled = False
+		self.__lastProgress = None
+	
+	def cancel(self):
+		""" Stops the conversion at its next progress report, or frame or object written """
+		self.__cancelled = True
+	
+	def isCancelled(self):
+		return self.__cancelled
+	
+	def run(self):
+		try:
+			converter = ChanConvert(self.chanFile, **self.options)
+			written = converter.writeFbx(self.outFile, progress=self._progress, cancelled=self.isCancelled)
+		except ConvertCancelled:
+			self.emit(SIGNAL("cancelled"))
+		except Exception, e:
+			self.emit(SIGNAL("failed"), str(e) or e.__class__.__name__)
+		else:
+			self.emit(SIGNAL("converted"), written)
+	
+	def _progress(self, stage, fraction):
+		""" ChanConvert progress callback. Called on this thread """
+		if self.__cancelled:
+			raise ConvertCancelled()
+		
+		start, end = self.STAGES.get(stage, (0, 100))
+		if fraction is None:
+			percent = -1
+		else:
+			percent = int(start + (end - start) * fraction)
+		
+		# only changes are sent, rather than flooding the GUI's event queue
+		if (stage, percent) != self.__lastProgress:
+			self.__lastProgress = (stage, percent)
+			self.emit(SIGNAL("progress"), stage, percent)